@@ -1,6 +1,7 @@
-import React, { useState } from "react";
+import React, { useState, useEffect } from "react";
 import { Link, useNavigate } from "react-router-dom";
 import { useAuth } from "../../context/AuthContext";
+import { notificationAPI } from "../../services/api";
 import {
   FiSearch,
   FiHome,
@@ -16,8 +17,19 @@ import { CgAddR } from "react-icons/cg";
 const Navbar = () => {
   const { user, logout } = useAuth();
   const [showDropdown, setShowDropdown] = useState(false);
+  const [unreadCount, setUnreadCount] = useState(0);
   const navigate = useNavigate();
 
+  useEffect(() => {
+    if (!user) return;
+    notificationAPI
+      .getUnreadCount()
+      .then((response) => setUnreadCount(response.data.unread_count || 0))
+      .catch((error) =>
+        console.error("Failed to fetch unread notifications:", error)
+      );
+  }, [user]);
+
   const handleLogout = () => {
     logout();
     navigate("/login");
@@ -48,7 +60,7 @@ const Navbar = () => {
 
         <NavIcon to="/notifications" title="Notifications">
           <FiBell />
-          <Badge>5</Badge>
+          {unreadCount > 0 && <Badge>{unreadCount}</Badge>}
         </NavIcon>
 
         <UserMenu>
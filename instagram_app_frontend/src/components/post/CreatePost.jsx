@@ -1,6 +1,6 @@
 import React, { useState } from "react";
 import { useAuth } from "../../context/AuthContext";
-import { postAPI } from "../../services/api";
+import { mediaAPI, postAPI } from "../../services/api";
 
 
 
@@ -16,9 +16,15 @@ const CreatePost = ({ onPostCreated }) => {
 
     setLoading(true);
     try {
+      let imageUrl = null;
+      if (image) {
+        const upload = await mediaAPI.upload(image);
+        imageUrl = mediaAPI.url(upload.data.media.url);
+      }
+
       const postData = {
         content: content.trim(),
-        image_url: image ? URL.createObjectURL(image) : null,
+        image_url: imageUrl,
       };
 
       const response = await postAPI.create(postData);
@@ -9,7 +9,7 @@ import Comment from "././Comment";
 const Post = ({ post, onDelete }) => {
   const { user } = useAuth();
   const [showMenu, setShowMenu] = useState(false);
-  const [liked, setLiked] = useState(post.is_liked);
+  const [liked, setLiked] = useState(post.liked_by_me);
   const [likesCount, setLikesCount] = useState(post.likes_count);
   const [showComments, setShowComments] = useState(false);
 
@@ -100,6 +100,16 @@ const Post = ({ post, onDelete }) => {
         </ActionButton>
       </PostActions>
 
+      {!showComments &&
+        (post.latest_comments || []).map((comment) => (
+          <Comment
+            key={comment.id}
+            comment={comment}
+            onUpdate={() => {}}
+            onDelete={() => {}}
+          />
+        ))}
+
       {showComments && <CommentSection postId={post.id} />}
     </PostContainer>
   );
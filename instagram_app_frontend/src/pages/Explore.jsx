@@ -1,6 +1,6 @@
 
 import React, { useState, useEffect } from "react";
-import { userAPI, postAPI } from "../services/api";
+import { userAPI, postAPI, trendingAPI } from "../services/api";
 import UserCard from "../components/user/UserCard";
 import Post from "../components/post/Post";
 import Loader from "../components/common/Loader";
@@ -28,7 +28,7 @@ const Explore = () => {
   const fetchUsers = async () => {
     setLoading((prev) => ({ ...prev, users: true }));
     try {
-      const response = await userAPI.search("");
+      const response = await userAPI.getSuggestions();
       setUsers(response.data.users || []);
     } catch (error) {
       console.error("Failed to fetch users:", error);
@@ -40,7 +40,7 @@ const Explore = () => {
   const fetchPosts = async () => {
     setLoading((prev) => ({ ...prev, posts: true }));
     try {
-      const response = await postAPI.getAll();
+      const response = await postAPI.getExplore();
       setPosts(response.data.posts || []);
     } catch (error) {
       console.error("Failed to fetch posts:", error);
@@ -52,15 +52,14 @@ const Explore = () => {
   const fetchTrending = async () => {
     setLoading((prev) => ({ ...prev, trending: true }));
     try {
-      // Mock trending data
-      const mockTrending = [
-        { id: 1, title: "#SocialMedia", posts: "2.5K posts" },
-        { id: 2, title: "#ReactJS", posts: "1.8K posts" },
-        { id: 3, title: "#WebDevelopment", posts: "3.2K posts" },
-        { id: 4, title: "#AI", posts: "4.1K posts" },
-        { id: 5, title: "#TechNews", posts: "1.5K posts" },
-      ];
-      setTrending(mockTrending);
+      const response = await trendingAPI.getHashtags();
+      setTrending(
+        (response.data.trending || []).map((item) => ({
+          id: item.tag,
+          title: `#${item.tag}`,
+          meta: `Trending score ${item.score}`,
+        }))
+      );
     } catch (error) {
       console.error("Failed to fetch trending:", error);
     } finally {
@@ -173,7 +172,7 @@ const Explore = () => {
               <TrendingRank>#{index + 1}</TrendingRank>
               <TrendingContent>
                 <TrendingTitle>{item.title}</TrendingTitle>
-                <TrendingMeta>{item.posts}</TrendingMeta>
+                <TrendingMeta>{item.meta}</TrendingMeta>
               </TrendingContent>
             </TrendingItem>
           ))}
@@ -16,17 +16,73 @@ api.interceptors.request.use(
     if (token) {
       config.headers.Authorization = `Bearer ${token}`;
     }
+    // Keeps our reads on the primary database until our writes replicate,
+    // whichever server worker answers
+    const lastWrite = localStorage.getItem("last_write");
+    if (lastWrite) {
+      config.headers["X-Last-Write"] = lastWrite;
+    }
     return config;
   },
   (error) => Promise.reject(error)
 );
 
+// Access tokens are short-lived, so one refresh is shared by every request
+// that fails with 401 while it is in flight
+let refreshRequest = null;
+
+const refreshAccessToken = () => {
+  if (!refreshRequest) {
+    const refreshToken = localStorage.getItem("refresh_token");
+    refreshRequest = axios
+      .post(
+        `${import.meta.env.VITE_API_URL}/auth/refresh`,
+        {},
+        { headers: { Authorization: `Bearer ${refreshToken}` } }
+      )
+      .then((response) => {
+        // Refresh tokens are single use, so keep the replacement
+        localStorage.setItem("token", response.data.token);
+        localStorage.setItem("refresh_token", response.data.refresh_token);
+        return response.data.token;
+      })
+      .finally(() => {
+        refreshRequest = null;
+      });
+  }
+  return refreshRequest;
+};
+
 // Response interceptor
 api.interceptors.response.use(
-  (response) => response,
-  (error) => {
+  (response) => {
+    const lastWrite = response.headers["x-last-write"];
+    if (lastWrite) {
+      localStorage.setItem("last_write", lastWrite);
+    }
+    return response;
+  },
+  async (error) => {
+    const original = error.config;
+    if (
+      error.response?.status === 401 &&
+      original &&
+      !original._retried &&
+      localStorage.getItem("refresh_token")
+    ) {
+      original._retried = true;
+      try {
+        const token = await refreshAccessToken();
+        original.headers.Authorization = `Bearer ${token}`;
+        return api(original);
+      } catch (refreshError) {
+        // Fall through to logging out below
+      }
+    }
+
     if (error.response?.status === 401) {
       localStorage.removeItem("token");
+      localStorage.removeItem("refresh_token");
       window.location.href = "/login";
     }
     return Promise.reject(error);
@@ -35,8 +91,13 @@ api.interceptors.response.use(
 
 // Post API
 export const postAPI = {
-  getAll: (page = 1) => api.get(`/posts?page=${page}`),
+  // Each post comes with its two newest comments, so cards need no
+  // request of their own
+  getAll: (page = 1) => api.get(`/posts?page=${page}&comments_preview=2`),
+  getExplore: (cursor) =>
+    api.get(`/posts/explore${cursor ? `?cursor=${cursor}` : ""}`),
   getById: (id) => api.get(`/posts/${id}`),
+  getMany: (ids) => api.get(`/posts/batch?ids=${ids.join(",")}`),
   create: (postData) => api.post("/posts", postData),
   update: (id, postData) => api.put(`/posts/${id}`, postData),
   delete: (id) => api.delete(`/posts/${id}`),
@@ -46,9 +107,13 @@ export const postAPI = {
 // User API
 export const userAPI = {
   getById: (id) => api.get(`/users/${id}`),
+  getMany: (ids) => api.get(`/users/batch?ids=${ids.join(",")}`),
   update: (id, userData) => api.put(`/users/${id}`, userData),
-  getPosts: (id, page = 1) => api.get(`/users/${id}/posts?page=${page}`),
+  getPosts: (id, page = 1) =>
+    api.get(`/users/${id}/posts?page=${page}&comments_preview=2`),
   search: (query) => api.get(`/users?q=${query}`),
+  getSuggestions: (cursor) =>
+    api.get(`/users/suggestions${cursor ? `?cursor=${cursor}` : ""}`),
 };
 
 // Comment API
@@ -70,4 +135,26 @@ export const followAPI = {
     api.get(`/follow/${userId}/following?page=${page}`),
 };
 
+// Media API
+export const mediaAPI = {
+  // The file is sent as the raw body so the server can stream it to disk
+  upload: (file) =>
+    api.post("/media", file, { headers: { "Content-Type": file.type } }),
+  url: (path) => `${import.meta.env.VITE_API_URL}${path}`,
+};
+
+// Notification API
+export const notificationAPI = {
+  getAll: (cursor) =>
+    api.get(`/notifications${cursor ? `?cursor=${cursor}` : ""}`),
+  getUnreadCount: () => api.get("/notifications/unread-count"),
+  // Without ids every notification is marked read
+  markRead: (ids) => api.post("/notifications/read", ids ? { ids } : {}),
+};
+
+// Trending API
+export const trendingAPI = {
+  getHashtags: (limit = 10) => api.get(`/trending?limit=${limit}`),
+};
+
 export default api;
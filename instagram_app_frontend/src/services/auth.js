@@ -7,6 +7,7 @@ export const authService = {
 
       if (response.data.token) {
         localStorage.setItem("token", response.data.token);
+        localStorage.setItem("refresh_token", response.data.refresh_token);
         localStorage.setItem("user", JSON.stringify(response.data.user));
         api.defaults.headers.common[
           "Authorization"
@@ -25,6 +26,7 @@ export const authService = {
 
       if (response.data.token) {
         localStorage.setItem("token", response.data.token);
+        localStorage.setItem("refresh_token", response.data.refresh_token);
         localStorage.setItem("user", JSON.stringify(response.data.user));
         api.defaults.headers.common[
           "Authorization"
@@ -37,8 +39,15 @@ export const authService = {
     }
   },
 
-  logout: () => {
+  logout: async () => {
+    const refreshToken = localStorage.getItem("refresh_token");
+    try {
+      await api.post("/auth/logout", { refresh_token: refreshToken });
+    } catch (error) {
+      // The tokens are dropped locally either way
+    }
     localStorage.removeItem("token");
+    localStorage.removeItem("refresh_token");
     localStorage.removeItem("user");
     delete api.defaults.headers.common["Authorization"];
   },
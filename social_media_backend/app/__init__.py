@@ -0,0 +1,85 @@
+import os
+from flask import Flask
+from app.config import config
+from app.extensions import db, jwt, cors, migrate
+
+
+def create_app(config_name=None, overrides=None):
+    """Application factory
+
+    config_name picks an entry of app.config.config (FLASK_CONFIG or
+    'default' when omitted); overrides are applied on top of it before any
+    extension reads the configuration.
+    """
+    config_name = config_name or os.getenv('FLASK_CONFIG', 'default')
+    config_class = config[config_name]
+    
+    app = Flask(__name__)
+    app.config.from_object(config_class)
+    if overrides:
+        app.config.update(overrides)
+    config_class.init_app(app)
+    
+    # Extensions
+    db.init_app(app)
+    jwt.init_app(app)
+    cors.init_app(app)
+    migrate.init_app(app, db)
+    
+    # Register every model with SQLAlchemy before the first query
+    from app import models  # noqa: F401
+    
+    # Services
+    from app.services import cache, compression, db_routing, instrumentation, trending
+    from app.utils import json_provider
+    from app.services.follow_graph import follow_graph
+    from app.services.likes import like_counts
+    from app.services.media import media_store
+    from app.services.outbox import outbox
+    from app.services.passwords import password_hasher
+    from app.services.token_blocklist import token_blocklist
+    
+    cache.init_app(app)
+    db_routing.init_app(app)
+    # Registered before instrumentation so inline dispatch runs after the
+    # request's statements are counted and is not held to its budget
+    outbox.init_app(app)
+    instrumentation.init_app(app)
+    # Registered after instrumentation so it runs first and is measured
+    compression.init_app(app)
+    json_provider.init_app(app)
+    trending.init_app(app)
+    like_counts.init_app(app)
+    follow_graph.init_app(app)
+    media_store.init_app(app)
+    password_hasher.init_app(app)
+    token_blocklist.init_app(app)
+    
+    # Blueprints
+    from app.routes.auth_routes import auth_bp
+    from app.routes.post_routes import post_bp
+    from app.routes.user_routes import user_bp
+    from app.routes.comment_routes import comment_bp
+    from app.routes.follow_routes import follow_bp
+    from app.routes.trending_routes import trending_bp
+    from app.routes.system_routes import system_bp
+    from app.routes.metrics_routes import metrics_bp
+    from app.routes.media_routes import media_bp
+    from app.routes.notification_routes import notification_bp
+    
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(post_bp)
+    app.register_blueprint(user_bp, url_prefix='/users')
+    app.register_blueprint(comment_bp, url_prefix='/comments')
+    app.register_blueprint(follow_bp, url_prefix='/follow')
+    app.register_blueprint(trending_bp)
+    app.register_blueprint(system_bp)
+    app.register_blueprint(metrics_bp)
+    app.register_blueprint(media_bp)
+    app.register_blueprint(notification_bp)
+    
+    # CLI commands
+    from app.commands import register_commands
+    register_commands(app)
+    
+    return app
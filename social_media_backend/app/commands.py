@@ -0,0 +1,129 @@
+import click
+from flask.cli import with_appcontext
+from app.extensions import db
+from app.models.user import User
+from app.services import counters, ranking, suggestions, timeline
+from app.services.outbox import DEFAULT_BATCH_SIZE as OUTBOX_BATCH_SIZE, outbox
+from app.services.synthetic import DEFAULT_BATCH_SIZE, DEFAULT_PASSWORD, SCALES, SyntheticGraph
+from app.services.token_blocklist import token_blocklist
+
+
+@click.command('rebuild-timelines')
+@click.option('--user-id', type=int, default=None, help='Rebuild a single user instead of everyone.')
+@with_appcontext
+def rebuild_timelines_command(user_id):
+    """Recompute materialized home timelines from the follow graph"""
+    if user_id is not None:
+        user_ids = [user_id]
+    else:
+        user_ids = [row[0] for row in db.session.query(User.id).order_by(User.id)]
+    
+    for uid in user_ids:
+        timeline.rebuild_timeline(uid)
+        db.session.commit()
+    
+    click.echo(f'Rebuilt {len(user_ids)} timeline(s)')
+
+
+@click.command('reconcile-counters')
+@with_appcontext
+def reconcile_counters_command():
+    """Repair drift in denormalized like/comment/post/follow counters"""
+    repaired = counters.reconcile_counters()
+    for name, rows in repaired.items():
+        click.echo(f'{name}: {rows} row(s) repaired')
+
+
+@click.command('rank-posts')
+@with_appcontext
+def rank_posts_command():
+    """Recompute every post's Explore score from its counters"""
+    updated = ranking.rebuild_hot_scores()
+    click.echo(f'Ranked {updated} post(s)')
+
+
+@click.command('purge-revoked-tokens')
+@with_appcontext
+def purge_revoked_tokens_command():
+    """Delete revoked tokens that have expired"""
+    purged = token_blocklist.purge_expired()
+    click.echo(f'Purged {purged} expired revoked token(s)')
+
+
+@click.command('seed-graph')
+@click.option('--scale', type=click.Choice(list(SCALES)), default='small', show_default=True,
+              help='Preset of roughly 10k/100k/1M/10M rows; the options below override it.')
+@click.option('--users', type=int, default=None)
+@click.option('--avg-follows', type=int, default=None)
+@click.option('--posts-per-user', type=int, default=None)
+@click.option('--likes-per-post', type=int, default=5, show_default=True)
+@click.option('--comments-per-post', type=int, default=1, show_default=True)
+@click.option('--alpha', type=float, default=1.1, show_default=True, help='Zipf exponent of the follower distribution.')
+@click.option('--viral-fraction', type=float, default=0.01, show_default=True)
+@click.option('--viral-boost', type=int, default=100, show_default=True)
+@click.option('--password', default=DEFAULT_PASSWORD, show_default=True, help='Password of every generated account.')
+@click.option('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, show_default=True)
+@click.option('--seed', type=int, default=None, help='Random seed for a reproducible graph.')
+@click.option('--no-timelines', is_flag=True, help='Skip materializing home timelines.')
+@with_appcontext
+def seed_graph_command(scale, users, avg_follows, posts_per_user, no_timelines, **options):
+    """Fill the database with a synthetic power-law social graph"""
+    preset = SCALES[scale]
+    graph = SyntheticGraph(
+        users=users or preset['users'],
+        avg_follows=avg_follows or preset['avg_follows'],
+        posts_per_user=posts_per_user or preset['posts_per_user'],
+        **options
+    )
+    counts = graph.run(timelines=not no_timelines)
+    for table, rows in counts.items():
+        click.echo(f'{table}: {rows} row(s)')
+    click.echo(f'Total: {sum(counts.values())} row(s)')
+
+
+@click.command('compute-suggestions')
+@click.option('--limit', type=click.IntRange(min=1), default=suggestions.DEFAULT_LIMIT, show_default=True,
+              help='Suggestions kept per user.')
+@click.option('--min-mutuals', type=click.IntRange(min=1), default=suggestions.DEFAULT_MIN_MUTUALS, show_default=True)
+@click.option('--chunk-size', type=click.IntRange(min=1), default=suggestions.DEFAULT_CHUNK_SIZE, show_default=True,
+              help='Users per sparse matrix product.')
+@click.option('--engine', type=click.Choice(['auto', 'sparse', 'python']), default='auto', show_default=True,
+              help='sparse needs numpy and scipy; auto uses them when installed.')
+@with_appcontext
+def compute_suggestions_command(limit, min_mutuals, chunk_size, engine):
+    """Recompute people-you-may-know suggestions from the follow graph"""
+    stats = suggestions.compute_suggestions(limit, min_mutuals, chunk_size, engine)
+    click.echo(
+        f"{stats['suggestions']} suggestion(s) for {stats['users']} user(s) "
+        f"from {stats['edges']} follow(s) in {stats['seconds']}s ({stats['engine']})"
+    )
+
+
+@click.command('outbox-worker')
+@click.option('--batch-size', type=click.IntRange(min=1), default=OUTBOX_BATCH_SIZE, show_default=True,
+              help='Events claimed per transaction.')
+@click.option('--interval', type=float, default=1.0, show_default=True, help='Seconds to wait when no event is due.')
+@click.option('--once', is_flag=True, help='Dispatch the events that are due now, then exit.')
+@with_appcontext
+def outbox_worker_command(batch_size, interval, once):
+    """Run the handlers of pending outbox events"""
+    if once:
+        dispatched = outbox.drain(batch_size)
+        click.echo(f'Dispatched {dispatched} event(s)')
+        return
+    
+    click.echo(f'Outbox worker started (batch size {batch_size})')
+    try:
+        outbox.run(batch_size, interval, report=click.echo)
+    except KeyboardInterrupt:
+        click.echo(f'Stopped after {outbox.dispatched} event(s)')
+
+
+def register_commands(app):
+    app.cli.add_command(rebuild_timelines_command)
+    app.cli.add_command(reconcile_counters_command)
+    app.cli.add_command(rank_posts_command)
+    app.cli.add_command(purge_revoked_tokens_command)
+    app.cli.add_command(seed_graph_command)
+    app.cli.add_command(compute_suggestions_command)
+    app.cli.add_command(outbox_worker_command)
@@ -9,26 +9,145 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'postgresql:///social_media.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Connection pool, per worker process: keep workers * (DB_POOL_SIZE +
+    # DB_MAX_OVERFLOW) below the database's max_connections
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    DB_STATEMENT_TIMEOUT = int(os.getenv('DB_STATEMENT_TIMEOUT', 30000))  # milliseconds
+    
+    # Read replicas (comma-separated URLs); read-only paths use them, and a
+    # user's own reads stay on the primary for REPLICA_STICKY_SECONDS after
+    # they write
+    SQLALCHEMY_REPLICA_URIS = [uri.strip() for uri in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if uri.strip()]
+    REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 5))
+    # Lets the frontend read the last write time it has to send back
+    CORS_EXPOSE_HEADERS = ['X-Last-Write']
+    
     # JWT Configuration
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY')
-    JWT_ACCESS_TOKEN_EXPIRES = timedelta(seconds=int(os.getenv('JWT_ACCESS_TOKEN_EXPIRES', 604800)))
+    JWT_ACCESS_TOKEN_EXPIRES = timedelta(seconds=int(os.getenv('JWT_ACCESS_TOKEN_EXPIRES', 900)))
+    JWT_REFRESH_TOKEN_EXPIRES = timedelta(seconds=int(os.getenv('JWT_REFRESH_TOKEN_EXPIRES', 2592000)))
+    
+    # Revoked token blocklist
+    TOKEN_BLOCKLIST_CAPACITY = int(os.getenv('TOKEN_BLOCKLIST_CAPACITY', 100000))
+    TOKEN_BLOCKLIST_ERROR_RATE = float(os.getenv('TOKEN_BLOCKLIST_ERROR_RATE', 0.001))
+    TOKEN_BLOCKLIST_SYNC_INTERVAL = float(os.getenv('TOKEN_BLOCKLIST_SYNC_INTERVAL', 5.0))
+    
+    # Password hashing (PASSWORD_HASH_WORKERS=0 hashes inline)
+    BCRYPT_LOG_ROUNDS = int(os.getenv('BCRYPT_LOG_ROUNDS', 12))
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', 16))
+    PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', 10.0))
+    
+    # Home timeline configuration
+    TIMELINE_FANOUT_THRESHOLD = int(os.getenv('TIMELINE_FANOUT_THRESHOLD', 10000))
+    TIMELINE_BACKFILL_LIMIT = int(os.getenv('TIMELINE_BACKFILL_LIMIT', 200))
+    
+    # Most ids accepted by the /users/batch and /posts/batch lookups
+    BATCH_LOOKUP_MAX = int(os.getenv('BATCH_LOOKUP_MAX', 100))
+    
+    # User search configuration
+    USER_SEARCH_INDEX_TTL = int(os.getenv('USER_SEARCH_INDEX_TTL', 300))
+    
+    # Trending hashtags configuration
+    TRENDING_CAPACITY = int(os.getenv('TRENDING_CAPACITY', 1000))
+    TRENDING_HALF_LIFE = int(os.getenv('TRENDING_HALF_LIFE', 6 * 60 * 60))
+    # Each worker folds in hashtags used on any worker every
+    # TRENDING_SYNC_INTERVAL seconds, once they are TRENDING_SETTLE_SECONDS old
+    TRENDING_SYNC_INTERVAL = int(os.getenv('TRENDING_SYNC_INTERVAL', 10))
+    TRENDING_SETTLE_SECONDS = int(os.getenv('TRENDING_SETTLE_SECONDS', 2))
+    
+    # Cache configuration ('memory' per process, or 'redis' shared by all workers)
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory')
+    CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    PROFILE_CACHE_TTL = int(os.getenv('PROFILE_CACHE_TTL', 60))
+    PROFILE_CACHE_SIZE = int(os.getenv('PROFILE_CACHE_SIZE', 10000))
+    
+    # Like count write coalescing
+    LIKE_BUFFER_ENABLED = os.getenv('LIKE_BUFFER_ENABLED', 'true').lower() == 'true'
+    LIKE_FLUSH_INTERVAL = float(os.getenv('LIKE_FLUSH_INTERVAL', 1.0))
+    LIKE_FLUSH_MAX_PENDING = int(os.getenv('LIKE_FLUSH_MAX_PENDING', 1000))
+    
+    # In-process follow graph index, rebuilt every refresh interval seconds
+    FOLLOW_GRAPH_ENABLED = os.getenv('FOLLOW_GRAPH_ENABLED', 'true').lower() == 'true'
+    FOLLOW_GRAPH_REFRESH_INTERVAL = int(os.getenv('FOLLOW_GRAPH_REFRESH_INTERVAL', 60))
+    
+    # Transactional outbox: side effects of writes are committed as events
+    # and run by `flask outbox-worker`, or right after the request when
+    # OUTBOX_DISPATCH_INLINE is set
+    OUTBOX_DISPATCH_INLINE = os.getenv('OUTBOX_DISPATCH_INLINE', 'false').lower() == 'true'
+    OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', 100))
+    OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', 10))
+    OUTBOX_RETENTION = int(os.getenv('OUTBOX_RETENTION', 24 * 60 * 60))
+    
+    # Likes, comments and follows on one target within a bucket of this
+    # many seconds share a single notification
+    NOTIFICATION_BUCKET_SECONDS = int(os.getenv('NOTIFICATION_BUCKET_SECONDS', 6 * 60 * 60))
+    
+    # Request instrumentation: Server-Timing header, N+1 warnings, and a
+    # per-request SQL statement budget (0 disables it): the statement past
+    # it raises, so the request fails before anything is committed
+    SERVER_TIMING_ENABLED = os.getenv('SERVER_TIMING_ENABLED', 'true').lower() == 'true'
+    N_PLUS_ONE_THRESHOLD = int(os.getenv('N_PLUS_ONE_THRESHOLD', 5))
+    SQL_QUERY_BUDGET = int(os.getenv('SQL_QUERY_BUDGET', 0))
+    
+    # Response encoding: JSON_PROVIDER is auto (orjson when installed),
+    # orjson or default; bodies of at least COMPRESS_MIN_SIZE bytes are
+    # compressed with brotli (when installed) or gzip
+    JSON_PROVIDER = os.getenv('JSON_PROVIDER', 'auto')
+    COMPRESS_ENABLED = os.getenv('COMPRESS_ENABLED', 'true').lower() == 'true'
+    COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 1024))
+    COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', 5))
+    COMPRESS_BROTLI_QUALITY = int(os.getenv('COMPRESS_BROTLI_QUALITY', 4))
     
     # File upload configuration
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+    # Uploads are stored under MEDIA_ROOT (instance/media by default);
+    # resized variants are made by MEDIA_WORKERS processes (0: inline)
+    MEDIA_ROOT = os.getenv('MEDIA_ROOT')
+    MEDIA_WORKERS = int(os.getenv('MEDIA_WORKERS', 2))
+    MEDIA_VARIANT_WIDTHS = (320, 640, 1080)
+    # Let the front proxy send files (X-Sendfile / X-Accel-Redirect)
+    USE_X_SENDFILE = os.getenv('USE_X_SENDFILE', 'false').lower() == 'true'
     
     @staticmethod
     def init_app(app):
-        pass
+        from app.services.db_pool import engine_options
+        from app.services.db_routing import replica_binds
+        app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config))
+        app.config['SQLALCHEMY_BINDS'] = {**replica_binds(app.config), **app.config.get('SQLALCHEMY_BINDS', {})}
 
 class DevelopmentConfig(Config):
     DEBUG = True
+    OUTBOX_DISPATCH_INLINE = os.getenv('OUTBOX_DISPATCH_INLINE', 'true').lower() == 'true'
+
+class TestingConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = os.getenv('TEST_DATABASE_URL', 'sqlite://')
+    JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'testing-secret-key-not-for-production')
+    BCRYPT_LOG_ROUNDS = 4
+    PASSWORD_HASH_WORKERS = 0
+    LIKE_BUFFER_ENABLED = False
+    FOLLOW_GRAPH_ENABLED = False
+    MEDIA_WORKERS = 0
+    OUTBOX_DISPATCH_INLINE = True
+    TRENDING_SYNC_INTERVAL = 0
+    TRENDING_SETTLE_SECONDS = 0
 
 class ProductionConfig(Config):
     DEBUG = False
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 5))
+    DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 10))
+    DB_STATEMENT_TIMEOUT = int(os.getenv('DB_STATEMENT_TIMEOUT', 10000))
 
 config = {
     'development': DevelopmentConfig,
+    'testing': TestingConfig,
     'production': ProductionConfig,
     'default': DevelopmentConfig
 }
\ No newline at end of file
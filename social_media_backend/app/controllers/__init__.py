@@ -0,0 +1,8 @@
+from app.controllers.auth_controller import AuthController
+from app.controllers.comment_controller import CommentController
+from app.controllers.follow_controller import FollowController
+from app.controllers.media_controller import MediaController
+from app.controllers.post_controller import PostController
+from app.controllers.system_controller import SystemController
+from app.controllers.trending_controller import TrendingController
+from app.controllers.user_controller import UserController
@@ -1,7 +1,15 @@
 from flask import request, jsonify
-from flask_jwt_extended import create_access_token
+from datetime import datetime
+from flask_jwt_extended import decode_token, get_jwt
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt.exceptions import PyJWTError
 from app.models.user import User
 from app.extensions import db
+from app.services import user_search
+from app.services.db_routing import mark_recent_writer, replica_reads
+from app.services.passwords import PasswordHasherBusy
+from app.services.token_blocklist import FAMILY_CLAIM, token_blocklist
+from app.utils.fields import InvalidFields, requested_fields
 
 class AuthController:
     
@@ -31,16 +39,22 @@ class AuthController:
             
             db.session.add(user)
             db.session.commit()
+            mark_recent_writer(user.id)
+            user_search.ngram_index.add(user.id, user.username)
             
-            # Create token
-            access_token = create_access_token(identity=str(user.id))
+            # Create tokens
+            access_token, refresh_token = token_blocklist.create_tokens(user.id)
             
             return jsonify({
                 'message': 'User registered successfully',
                 'token': access_token,
+                'refresh_token': refresh_token,
                 'user': user.to_dict()
             }), 201
             
+        except PasswordHasherBusy as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
         except Exception as e:
             db.session.rollback()
             return jsonify({'error': str(e)}), 500
@@ -58,25 +72,111 @@ class AuthController:
             if not user or not user.check_password(data['password']):
                 return jsonify({'error': 'Invalid credentials'}), 401
             
-            # Create token
-            access_token = create_access_token(identity=str(user.id))
+            # Upgrade hashes made with an old work factor
+            if user.password_needs_rehash():
+                user.set_password(data['password'])
+                db.session.commit()
+            
+            # Create tokens
+            access_token, refresh_token = token_blocklist.create_tokens(user.id)
             
             return jsonify({
                 'token': access_token,
+                'refresh_token': refresh_token,
                 'user': user.to_dict()
             }), 200
             
+        except PasswordHasherBusy as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
     @staticmethod
+    @replica_reads
     def get_current_user(current_user_id):
         try:
+            fields = requested_fields(User)
             user = User.query.get(current_user_id)
             if not user:
                 return jsonify({'error': 'User not found'}), 404
             
-            return jsonify({'user': user.to_dict()}), 200
+            return jsonify({'user': user.to_dict(fields)}), 200
+            
+        except InvalidFields as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @staticmethod
+    def refresh_token(current_user_id):
+        try:
+            # Refresh tokens are single use: the presented one is revoked and
+            # replaced, so a stolen copy stops working once either side uses it
+            claims = get_jwt()
+            family = claims.get(FAMILY_CLAIM)
+            first_use = token_blocklist.revoke(
+                claims['jti'],
+                claims['type'],
+                current_user_id,
+                datetime.utcfromtimestamp(claims['exp'])
+            )
+            if not first_use:
+                # A concurrent request already used it, so it was copied
+                token_blocklist.revoke_family(family, current_user_id)
+                db.session.commit()
+                return jsonify({'error': 'Refresh token has already been used'}), 401
+            db.session.commit()
+            
+            access_token, refresh_token = token_blocklist.create_tokens(current_user_id, family)
+            return jsonify({
+                'token': access_token,
+                'refresh_token': refresh_token
+            }), 200
+            
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 500
+    
+    @staticmethod
+    def logout():
+        try:
+            claims = get_jwt()
+            user_id = int(claims['sub'])
+            token_blocklist.revoke(
+                claims['jti'],
+                claims['type'],
+                user_id,
+                datetime.utcfromtimestamp(claims['exp'])
+            )
+            
+            # Also revoke the refresh token if the client sends it; one that is
+            # malformed, expired or already revoked is skipped, and the access
+            # token is revoked regardless
+            data = request.get_json(silent=True) or {}
+            refresh_revoked = False
+            if data.get('refresh_token'):
+                try:
+                    refresh_claims = decode_token(data['refresh_token'])
+                except (PyJWTError, JWTExtendedException):
+                    refresh_claims = None
+                if refresh_claims is not None and refresh_claims.get('type') == 'refresh' \
+                        and int(refresh_claims['sub']) == user_id:
+                    token_blocklist.revoke(
+                        refresh_claims['jti'],
+                        refresh_claims['type'],
+                        user_id,
+                        datetime.utcfromtimestamp(refresh_claims['exp'])
+                    )
+                    refresh_revoked = True
+            
+            db.session.commit()
+            
+            return jsonify({
+                'message': 'Logged out successfully',
+                'refresh_token_revoked': refresh_revoked
+            }), 200
             
         except Exception as e:
+            db.session.rollback()
             return jsonify({'error': str(e)}), 500
\ No newline at end of file
@@ -1,7 +1,14 @@
 from flask import request, jsonify
+from sqlalchemy.orm import joinedload
 from app.models.comment import Comment
 from app.models.post import Post
 from app.extensions import db
+from app.services import counters
+from app.services.db_routing import replica_reads
+from app.services.outbox import outbox
+from app.utils.fields import InvalidFields, requested_fields
+from app.utils.http_cache import comment_version, last_modified, make_etag, not_modified, with_validators
+from app.utils.pagination import InvalidCursor, keyset_paginate
 
 class CommentController:
     
@@ -23,6 +30,9 @@ class CommentController:
             )
             
             db.session.add(comment)
+            db.session.flush()
+            counters.increment(Post, post_id, comments_count=1)
+            outbox.emit('comment.created', comment_id=comment.id, post_id=post_id, user_id=current_user_id)
             db.session.commit()
             
             return jsonify({
@@ -35,24 +45,33 @@ class CommentController:
             return jsonify({'error': str(e)}), 500
     
     @staticmethod
+    @replica_reads
     def get_post_comments(post_id):
         try:
-            page = request.args.get('page', 1, type=int)
-            per_page = request.args.get('per_page', 20, type=int)
+            comments = keyset_paginate(
+                Comment.query.options(joinedload(Comment.author)).filter_by(post_id=post_id),
+                [Comment.created_at, Comment.id],
+                default_per_page=20,
+                descending=False
+            )
             
-            comments = Comment.query.filter_by(post_id=post_id)\
-                .order_by(Comment.created_at.asc())\
-                .paginate(page=page, per_page=per_page, error_out=False)
+            fields = requested_fields(Comment)
+            etag = make_etag([comment_version(comment) for comment in comments.items], comments.meta(), fields)
+            modified = last_modified(*[comment.updated_at for comment in comments.items])
+            cached = not_modified(etag, weak=True, modified=modified)
+            if cached is not None:
+                return cached
             
-            comments_data = [comment.to_dict() for comment in comments.items]
+            comments_data = [comment.to_dict(fields) for comment in comments.items]
             
-            return jsonify({
+            response = jsonify({
                 'comments': comments_data,
-                'total': comments.total,
-                'pages': comments.pages,
-                'current_page': page
-            }), 200
+                **comments.meta()
+            })
+            return with_validators(response, etag, weak=True, modified=modified), 200
             
+        except (InvalidCursor, InvalidFields) as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
@@ -89,6 +108,8 @@ class CommentController:
                 return jsonify({'error': 'Unauthorized'}), 403
             
             db.session.delete(comment)
+            counters.increment(Post, comment.post_id, comments_count=-1)
+            outbox.emit('comment.deleted', comment_id=comment.id, post_id=comment.post_id, user_id=comment.user_id)
             db.session.commit()
             
             return jsonify({'message': 'Comment deleted successfully'}), 200
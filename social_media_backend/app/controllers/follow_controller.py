@@ -1,7 +1,17 @@
-from flask import request, jsonify
+from flask import jsonify
+from sqlalchemy.orm import joinedload
 from app.models.follow import Follow
 from app.models.user import User
 from app.extensions import db
+from app.services import counters
+from app.services.cache import profile_cache
+from app.services.follow_graph import follow_graph
+from app.services.outbox import outbox
+from app.services.db_routing import replica_reads
+from app.services.hydration import following_ids, hydrate_users
+from app.utils.fields import InvalidFields, requested_fields, wants
+from app.utils.http_cache import last_modified, make_etag, not_modified, user_version, with_validators
+from app.utils.pagination import InvalidCursor, keyset_paginate
 
 class FollowController:
     
@@ -22,6 +32,8 @@ class FollowController:
             
             if existing_follow:
                 db.session.delete(existing_follow)
+                counters.increment(User, current_user_id, following_count=-1)
+                counters.increment(User, user_id, follower_count=-1)
                 action = 'unfollowed'
                 following = False
             else:
@@ -30,10 +42,17 @@ class FollowController:
                     followed_id=user_id
                 )
                 db.session.add(follow)
+                counters.increment(User, current_user_id, following_count=1)
+                counters.increment(User, user_id, follower_count=1)
                 action = 'followed'
                 following = True
             
+            # The follower's timeline and the followed user's notifications
+            # are updated by the outbox worker
+            outbox.emit('follow.changed', follower_id=current_user_id, followed_id=user_id, following=following)
             db.session.commit()
+            profile_cache.invalidate(current_user_id, user_id)
+            follow_graph.record(current_user_id, user_id, following)
             
             return jsonify({
                 'message': f'User {action}',
@@ -45,51 +64,87 @@ class FollowController:
             return jsonify({'error': str(e)}), 500
     
     @staticmethod
-    def get_followers(user_id):
+    @replica_reads
+    def get_followers(user_id, current_user_id):
         try:
-            page = request.args.get('page', 1, type=int)
-            per_page = request.args.get('per_page', 20, type=int)
+            # Load the users of the whole page in the same query
+            followers = keyset_paginate(
+                Follow.query.filter_by(followed_id=user_id)
+                    .options(joinedload(Follow.follower)),
+                [Follow.created_at, Follow.id],
+                default_per_page=20
+            )
             
-            followers = Follow.query.filter_by(followed_id=user_id)\
-                .order_by(Follow.created_at.desc())\
-                .paginate(page=page, per_page=per_page, error_out=False)
+            fields = requested_fields(User)
+            users = [follow.follower for follow in followers.items]
+            followed = following_ids(current_user_id, [user.id for user in users]) if wants(fields, 'is_following') else set()
+            
+            etag = make_etag(
+                [(follow.id, follow.created_at) + user_version(user) for follow, user in zip(followers.items, users)],
+                followers.meta(), sorted(followed), fields
+            )
+            modified = last_modified(*[user.updated_at for user in users])
+            cached = not_modified(etag, weak=True, modified=modified)
+            if cached is not None:
+                return cached
+            
+            users_data = hydrate_users(users, current_user_id, followed, fields)
             
             followers_data = [{
-                'user': follow.follower.to_dict(),
+                'user': user_data,
                 'followed_at': follow.created_at.isoformat()
-            } for follow in followers.items]
+            } for follow, user_data in zip(followers.items, users_data)]
             
-            return jsonify({
+            response = jsonify({
                 'followers': followers_data,
-                'total': followers.total,
-                'pages': followers.pages,
-                'current_page': page
-            }), 200
+                **followers.meta()
+            })
+            return with_validators(response, etag, weak=True, modified=modified), 200
             
+        except (InvalidCursor, InvalidFields) as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
     @staticmethod
-    def get_following(user_id):
+    @replica_reads
+    def get_following(user_id, current_user_id):
         try:
-            page = request.args.get('page', 1, type=int)
-            per_page = request.args.get('per_page', 20, type=int)
+            # Load the users of the whole page in the same query
+            following = keyset_paginate(
+                Follow.query.filter_by(follower_id=user_id)
+                    .options(joinedload(Follow.followed)),
+                [Follow.created_at, Follow.id],
+                default_per_page=20
+            )
             
-            following = Follow.query.filter_by(follower_id=user_id)\
-                .order_by(Follow.created_at.desc())\
-                .paginate(page=page, per_page=per_page, error_out=False)
+            fields = requested_fields(User)
+            users = [follow.followed for follow in following.items]
+            followed = following_ids(current_user_id, [user.id for user in users]) if wants(fields, 'is_following') else set()
+            
+            etag = make_etag(
+                [(follow.id, follow.created_at) + user_version(user) for follow, user in zip(following.items, users)],
+                following.meta(), sorted(followed), fields
+            )
+            modified = last_modified(*[user.updated_at for user in users])
+            cached = not_modified(etag, weak=True, modified=modified)
+            if cached is not None:
+                return cached
+            
+            users_data = hydrate_users(users, current_user_id, followed, fields)
             
             following_data = [{
-                'user': follow.followed.to_dict(),
+                'user': user_data,
                 'followed_at': follow.created_at.isoformat()
-            } for follow in following.items]
+            } for follow, user_data in zip(following.items, users_data)]
             
-            return jsonify({
+            response = jsonify({
                 'following': following_data,
-                'total': following.total,
-                'pages': following.pages,
-                'current_page': page
-            }), 200
+                **following.meta()
+            })
+            return with_validators(response, etag, weak=True, modified=modified), 200
             
+        except (InvalidCursor, InvalidFields) as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': str(e)}), 500
\ No newline at end of file
@@ -0,0 +1,58 @@
+from flask import current_app, jsonify, request, send_file
+from werkzeug.exceptions import RequestEntityTooLarge
+from app.extensions import db
+from app.services.media import UnsupportedMedia, media_store
+
+# Names are content hashes, so a URL never changes meaning
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+class MediaController:
+    
+    @staticmethod
+    def upload_media(current_user_id):
+        try:
+            # The raw body is the file; reading request.stream never buffers
+            # it, unlike request.files
+            if request.mimetype.startswith('multipart/'):
+                return jsonify({'error': 'Send the file as the raw request body, not multipart'}), 400
+            
+            media, created = media_store.save_stream(
+                request.stream, current_user_id, current_app.config['ALLOWED_EXTENSIONS']
+            )
+            
+            return jsonify({
+                'message': 'Media uploaded successfully' if created else 'Media already uploaded',
+                'media': media.to_dict()
+            }), 201 if created else 200
+            
+        except UnsupportedMedia as e:
+            return jsonify({'error': str(e)}), 415
+        except RequestEntityTooLarge:
+            return jsonify({'error': 'File too large'}), 413
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 500
+    
+    @staticmethod
+    def get_media(filename):
+        try:
+            located = media_store.locate(filename)
+            if located is None:
+                return jsonify({'error': 'Media not found'}), 404
+            path, content_type = located
+            
+            # send_file hands the open file to the server's file wrapper
+            # (sendfile), and conditional=True answers Range and
+            # If-None-Match requests; USE_X_SENDFILE offloads it entirely
+            response = send_file(
+                path,
+                mimetype=content_type,
+                conditional=True,
+                etag=filename,
+                max_age=IMMUTABLE_MAX_AGE
+            )
+            response.headers['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+            return response
+            
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
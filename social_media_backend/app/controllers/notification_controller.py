@@ -0,0 +1,77 @@
+from flask import request, jsonify
+from sqlalchemy.orm import joinedload
+from app.models.notification import Notification
+from app.extensions import db
+from app.services import notifications
+from app.services.db_routing import replica_reads
+from app.utils.http_cache import make_etag, not_modified, with_validators
+from app.utils.pagination import InvalidCursor, keyset_paginate
+
+class NotificationController:
+    
+    @staticmethod
+    @replica_reads
+    def get_notifications(current_user_id):
+        try:
+            # Newest first, one row per aggregated notification. Keyed on
+            # created_at, which later activity does not move, so no row can
+            # jump past a cursor while the client pages
+            page = keyset_paginate(
+                Notification.query.filter_by(user_id=current_user_id)
+                    .options(joinedload(Notification.last_actor)),
+                [Notification.created_at, Notification.id],
+                default_per_page=20,
+                count=False
+            )
+            unread = notifications.unread_count(current_user_id)
+            
+            etag = make_etag(
+                [(item.id, item.updated_at, item.actor_count, item.last_actor_id, item.read_at) for item in page.items],
+                page.meta(), unread
+            )
+            cached = not_modified(etag, weak=True)
+            if cached is not None:
+                return cached
+            
+            response = jsonify({
+                'notifications': [item.to_dict() for item in page.items],
+                'unread_count': unread,
+                **page.meta()
+            })
+            return with_validators(response, etag, weak=True), 200
+            
+        except InvalidCursor as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @staticmethod
+    @replica_reads
+    def get_unread_count(current_user_id):
+        try:
+            return jsonify({'unread_count': notifications.unread_count(current_user_id)}), 200
+            
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @staticmethod
+    def mark_read(current_user_id):
+        try:
+            data = request.get_json(silent=True) or {}
+            ids = data.get('ids')
+            
+            if ids is not None and (not isinstance(ids, list) or not all(isinstance(item, int) for item in ids)):
+                return jsonify({'error': 'ids must be a list of notification ids'}), 400
+            
+            # Without ids everything is marked read
+            marked = notifications.mark_read(current_user_id, ids)
+            db.session.commit()
+            
+            return jsonify({
+                'marked_read': marked,
+                'unread_count': notifications.unread_count(current_user_id)
+            }), 200
+            
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 500
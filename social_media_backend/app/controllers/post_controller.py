@@ -1,9 +1,19 @@
 from flask import request, jsonify
+from sqlalchemy.orm import joinedload
 from app.models.post import Post
-from app.models.like import Like
 from app.models.user import User
-from app.models.follow import Follow
 from app.extensions import db
+from app.controllers.comment_controller import CommentController
+from app.services import counters, timeline, trending
+from app.services.cache import profile_cache
+from app.services.db_routing import replica_reads
+from app.services.hydration import hydrate_posts, resolve_comment_previews, resolve_viewer_state
+from app.services.likes import like_counts, toggle_like
+from app.services.outbox import outbox
+from app.utils.batch import InvalidIds, order_by_ids, parse_ids
+from app.utils.fields import InvalidFields, requested_fields
+from app.utils.http_cache import last_modified, make_etag, not_modified, post_version, previews_version, with_validators
+from app.utils.pagination import InvalidCursor, keyset_paginate
 
 class PostController:
     
@@ -22,11 +32,18 @@ class PostController:
             )
             
             db.session.add(post)
+            db.session.flush()
+            counters.increment(User, current_user_id, post_count=1)
+            timeline.add_own_post(post)
+            # Followers' timelines are written by the outbox worker
+            outbox.emit('post.created', post_id=post.id)
+            trending.record_post(post)
             db.session.commit()
+            profile_cache.invalidate(current_user_id)
             
             return jsonify({
                 'message': 'Post created successfully',
-                'post': post.to_dict(current_user_id)
+                'post': hydrate_posts([post], current_user_id)[0]
             }), 201
             
         except Exception as e:
@@ -34,40 +51,116 @@ class PostController:
             return jsonify({'error': str(e)}), 500
     
     @staticmethod
+    @replica_reads
     def get_all_posts(current_user_id):
         try:
-            page = request.args.get('page', 1, type=int)
-            per_page = request.args.get('per_page', 10, type=int)
+            # Read the materialized timeline of the current user
+            fields = requested_fields(Post)
+            posts, page = timeline.read_timeline(current_user_id, default_per_page=10)
+            viewer_state = resolve_viewer_state(posts, current_user_id, fields)
+            previews = resolve_comment_previews(posts)
+            
+            # Polling clients get a 304 before anything is serialized
+            etag = make_etag(
+                [post_version(post) for post in posts], page.meta(), current_user_id, viewer_state, fields,
+                previews_version(previews)
+            )
+            modified = last_modified(*[post.updated_at for post in posts])
+            cached = not_modified(etag, weak=True, modified=modified)
+            if cached is not None:
+                return cached
             
-            # Get posts from users the current user follows
-            followed_ids = db.session.query(Follow.followed_id)\
-                .filter(Follow.follower_id == current_user_id)\
-                .subquery()
+            posts_data = hydrate_posts(posts, current_user_id, viewer_state, fields, previews)
             
-            posts = Post.query.filter(
-                (Post.user_id == current_user_id) | 
-                (Post.user_id.in_(followed_ids))
-            ).order_by(Post.created_at.desc())\
-             .paginate(page=page, per_page=per_page, error_out=False)
+            response = jsonify({
+                'posts': posts_data,
+                **page.meta()
+            })
+            return with_validators(response, etag, weak=True, modified=modified), 200
             
-            posts_data = [post.to_dict(current_user_id) for post in posts.items]
+        except (InvalidCursor, InvalidFields) as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @staticmethod
+    @replica_reads
+    def get_explore_posts(current_user_id):
+        try:
+            # Walks ix_posts_hot, so a page costs the same at any depth
+            fields = requested_fields(Post)
+            posts = keyset_paginate(
+                Post.query.options(joinedload(Post.author)),
+                [Post.hot_score, Post.id],
+                default_per_page=10,
+                count=False
+            )
+            viewer_state = resolve_viewer_state(posts.items, current_user_id, fields)
+            previews = resolve_comment_previews(posts.items)
             
-            return jsonify({
+            etag = make_etag(
+                [post_version(post) for post in posts.items], posts.meta(), current_user_id, viewer_state, fields,
+                previews_version(previews)
+            )
+            modified = last_modified(*[post.updated_at for post in posts.items])
+            cached = not_modified(etag, weak=True, modified=modified)
+            if cached is not None:
+                return cached
+            
+            posts_data = hydrate_posts(posts.items, current_user_id, viewer_state, fields, previews)
+            
+            response = jsonify({
                 'posts': posts_data,
-                'total': posts.total,
-                'pages': posts.pages,
-                'current_page': page
-            }), 200
+                **posts.meta()
+            })
+            return with_validators(response, etag, weak=True, modified=modified), 200
             
+        except (InvalidCursor, InvalidFields) as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
     @staticmethod
+    @replica_reads
     def get_post(post_id, current_user_id):
         try:
-            post = Post.query.get_or_404(post_id)
-            return jsonify({'post': post.to_dict(current_user_id)}), 200
+            fields = requested_fields(Post)
+            post = Post.query.options(joinedload(Post.author)).get_or_404(post_id)
+            viewer_state = resolve_viewer_state([post], current_user_id, fields)
+            previews = resolve_comment_previews([post])
+            
+            etag = make_etag(post_version(post), current_user_id, viewer_state, fields, previews_version(previews))
+            modified = last_modified(post.updated_at, post.author.updated_at)
+            cached = not_modified(etag, modified=modified)
+            if cached is not None:
+                return cached
+            
+            response = jsonify({'post': hydrate_posts([post], current_user_id, viewer_state, fields, previews)[0]})
+            return with_validators(response, etag, modified=modified), 200
+            
+        except InvalidFields as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @staticmethod
+    @replica_reads
+    def get_posts_batch(current_user_id):
+        try:
+            ids = parse_ids()
+            fields = requested_fields(Post)
+            posts, missing = order_by_ids(
+                Post.query.options(joinedload(Post.author)).filter(Post.id.in_(ids)).all(),
+                ids
+            )
+            
+            return jsonify({
+                'posts': hydrate_posts(posts, current_user_id, fields=fields),
+                'missing': missing
+            }), 200
             
+        except (InvalidIds, InvalidFields) as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
@@ -81,7 +174,9 @@ class PostController:
             
             data = request.get_json()
             
+            # Only hashtags added by the edit count towards trending
             if 'content' in data:
+                trending.record_tags(trending.extract_hashtags(data['content']) - trending.extract_hashtags(post.content))
                 post.content = data['content']
             
             if 'image_url' in data:
@@ -91,7 +186,7 @@ class PostController:
             
             return jsonify({
                 'message': 'Post updated successfully',
-                'post': post.to_dict(current_user_id)
+                'post': hydrate_posts([post], current_user_id)[0]
             }), 200
             
         except Exception as e:
@@ -106,8 +201,11 @@ class PostController:
             if post.user_id != current_user_id:
                 return jsonify({'error': 'Unauthorized'}), 403
             
+            timeline.remove_post(post.id)
+            counters.increment(User, current_user_id, post_count=-1)
             db.session.delete(post)
             db.session.commit()
+            profile_cache.invalidate(current_user_id)
             
             return jsonify({'message': 'Post deleted successfully'}), 200
             
@@ -118,33 +216,34 @@ class PostController:
     @staticmethod
     def like_post(post_id, current_user_id):
         try:
-            # Check if already liked
-            existing_like = Like.query.filter_by(
-                user_id=current_user_id,
-                post_id=post_id
-            ).first()
-            
-            if existing_like:
-                db.session.delete(existing_like)
-                action = 'unliked'
-                liked = False
-            else:
-                like = Like(user_id=current_user_id, post_id=post_id)
-                db.session.add(like)
-                action = 'liked'
-                liked = True
-            
+            # Toggle atomically on the unique_like constraint
+            liked, delta = toggle_like(current_user_id, post_id)
+            action = 'liked' if liked else 'unliked'
+            if delta:
+                outbox.emit('post.liked' if liked else 'post.unliked', user_id=current_user_id, post_id=post_id)
             db.session.commit()
             
-            # Get updated like count
-            post = Post.query.get(post_id)
+            # Count changes are buffered and flushed in batches
+            like_counts.add(post_id, delta)
+            
+            likes_count = db.session.query(Post.likes_count)\
+                .filter(Post.id == post_id)\
+                .scalar() or 0
             
             return jsonify({
                 'message': f'Post {action}',
                 'liked': liked,
-                'likes_count': len(post.likes)
+                'likes_count': likes_count + like_counts.pending(post_id)
             }), 200
             
         except Exception as e:
             db.session.rollback()
-            return jsonify({'error': str(e)}), 500
\ No newline at end of file
+            return jsonify({'error': str(e)}), 500
+    
+    @staticmethod
+    def add_comment(post_id, current_user_id):
+        return CommentController.create_comment(post_id, current_user_id)
+    
+    @staticmethod
+    def get_post_comments(post_id):
+        return CommentController.get_post_comments(post_id)
\ No newline at end of file
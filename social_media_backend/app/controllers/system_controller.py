@@ -0,0 +1,51 @@
+from flask import Response, jsonify
+from sqlalchemy import text
+from app.extensions import db
+from app.services.cache import profile_cache
+from app.services.db_pool import pool_stats
+from app.services.likes import like_counts
+from app.services.metrics import registry
+
+class SystemController:
+    
+    @staticmethod
+    def health():
+        try:
+            db.session.execute(text('SELECT 1'))
+            return jsonify({'status': 'ok'}), 200
+            
+        except Exception as e:
+            return jsonify({'status': 'unavailable', 'error': str(e)}), 503
+    
+    @staticmethod
+    def get_pool_stats():
+        try:
+            engines = {bind or 'default': pool_stats(engine) for bind, engine in db.engines.items()}
+            return jsonify({'pools': engines}), 200
+            
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @staticmethod
+    def get_like_buffer_stats():
+        try:
+            return jsonify({'like_buffer': like_counts.stats()}), 200
+            
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @staticmethod
+    def get_cache_stats():
+        try:
+            return jsonify({'caches': {'profile': profile_cache.stats()}}), 200
+            
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @staticmethod
+    def get_metrics():
+        try:
+            return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+            
+        except Exception as e:
+            return Response(f'# error: {e}\n', status=500, mimetype='text/plain')
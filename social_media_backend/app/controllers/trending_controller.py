@@ -0,0 +1,15 @@
+from flask import request, jsonify
+from app.services import trending
+
+class TrendingController:
+    
+    @staticmethod
+    def get_trending():
+        try:
+            limit = request.args.get('limit', 10, type=int)
+            limit = max(1, min(limit, 50))
+            
+            return jsonify({'trending': trending.top_hashtags(limit)}), 200
+            
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
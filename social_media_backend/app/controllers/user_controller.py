@@ -1,32 +1,61 @@
 from flask import request, jsonify
 from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import exists
+from sqlalchemy.orm import joinedload
 from app.models.user import User
 from app.models.post import Post
 from app.models.follow import Follow
+from app.models.suggestion import UserSuggestion
 from app.extensions import db
+from app.services.db_routing import primary_reads, replica_reads
+from app.services.hydration import following_ids, hydrate_posts, hydrate_users, resolve_comment_previews, resolve_viewer_state
+from app.services import user_search
+from app.services.cache import profile_cache
+from app.utils.batch import InvalidIds, order_by_ids, parse_ids
+from app.utils.fields import InvalidFields, requested_fields, wants
+from app.utils.http_cache import last_modified, make_etag, not_modified, post_version, previews_version, with_validators
+from app.utils.pagination import InvalidCursor, keyset_paginate
 
 class UserController:
     
     @staticmethod
+    @replica_reads
     def get_user(user_id, current_user_id):
         try:
-            user = User.query.get_or_404(user_id)
+            fields = requested_fields(User)
+            
+            # The viewer-independent part of the profile is cached, and filled
+            # from the primary so a lagging replica cannot refill it with the
+            # counts an invalidation just dropped
+            cached = profile_cache.get(user_id)
+            if cached is None:
+                with primary_reads():
+                    cached = User.query.get_or_404(user_id).to_dict()
+                profile_cache.set(user_id, cached)
             
             # Check if current user is following this user
             is_following = False
-            if current_user_id != user_id:
-                follow = Follow.query.filter_by(
-                    follower_id=current_user_id,
-                    followed_id=user_id
-                ).first()
-                is_following = follow is not None
+            if current_user_id != user_id and wants(fields, 'is_following'):
+                is_following = user_id in following_ids(current_user_id, [user_id])
             
-            user_data = user.to_dict()
-            user_data['is_following'] = is_following
-            user_data['is_self'] = current_user_id == user_id
+            is_self = current_user_id == user_id
             
-            return jsonify({'user': user_data}), 200
+            # The cached profile is the representation, so it is the version
+            etag = make_etag(cached, is_following, is_self, fields)
+            cached_response = not_modified(etag)
+            if cached_response is not None:
+                return cached_response
             
+            user_data = {name: value for name, value in cached.items() if wants(fields, name)}
+            if wants(fields, 'is_following'):
+                user_data['is_following'] = is_following
+            if wants(fields, 'is_self'):
+                user_data['is_self'] = is_self
+            
+            return with_validators(jsonify({'user': user_data}), etag), 200
+            
+        except InvalidFields as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
@@ -67,6 +96,8 @@ class UserController:
                 user.profile_picture = data['profile_picture']
             
             db.session.commit()
+            profile_cache.invalidate(user.id)
+            user_search.ngram_index.add(user.id, user.username)
             
             return jsonify({
                 'message': 'User updated successfully',
@@ -78,42 +109,133 @@ class UserController:
             return jsonify({'error': str(e)}), 500
     
     @staticmethod
+    @replica_reads
     def get_user_posts(user_id, current_user_id):
         try:
-            page = request.args.get('page', 1, type=int)
-            per_page = request.args.get('per_page', 10, type=int)
+            posts = keyset_paginate(
+                Post.query.filter_by(user_id=user_id),
+                [Post.created_at, Post.id],
+                default_per_page=10
+            )
+            
+            fields = requested_fields(Post)
+            viewer_state = resolve_viewer_state(posts.items, current_user_id, fields)
+            previews = resolve_comment_previews(posts.items)
+            
+            etag = make_etag(
+                [post_version(post) for post in posts.items], posts.meta(), current_user_id, viewer_state, fields,
+                previews_version(previews)
+            )
+            modified = last_modified(*[post.updated_at for post in posts.items])
+            cached = not_modified(etag, weak=True, modified=modified)
+            if cached is not None:
+                return cached
+            
+            posts_data = hydrate_posts(posts.items, current_user_id, viewer_state, fields, previews)
+            
+            response = jsonify({
+                'posts': posts_data,
+                **posts.meta()
+            })
+            return with_validators(response, etag, weak=True, modified=modified), 200
             
-            posts = Post.query.filter_by(user_id=user_id)\
-                .order_by(Post.created_at.desc())\
-                .paginate(page=page, per_page=per_page, error_out=False)
+        except (InvalidCursor, InvalidFields) as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @staticmethod
+    @replica_reads
+    def get_users_batch(current_user_id):
+        try:
+            ids = parse_ids()
+            fields = requested_fields(User)
+            users, missing = order_by_ids(User.query.filter(User.id.in_(ids)).all(), ids)
             
-            posts_data = [post.to_dict(current_user_id) for post in posts.items]
+            users_data = hydrate_users(users, current_user_id, fields=fields)
+            if wants(fields, 'is_self'):
+                for user_data in users_data:
+                    user_data['is_self'] = user_data['id'] == current_user_id
             
-            return jsonify({
-                'posts': posts_data,
-                'total': posts.total,
-                'pages': posts.pages,
-                'current_page': page
-            }), 200
+            return jsonify({'users': users_data, 'missing': missing}), 200
             
+        except (InvalidIds, InvalidFields) as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
     @staticmethod
-    def search_users():
+    @replica_reads
+    def search_users(current_user_id):
         try:
             query = request.args.get('q', '')
             if not query:
                 return jsonify({'users': []}), 200
             
-            users = User.query.filter(
-                User.username.ilike(f'%{query}%') | 
-                User.email.ilike(f'%{query}%')
-            ).limit(20).all()
-            
-            users_data = [user.to_dict() for user in users]
+            fields = requested_fields(User)
+            users = user_search.search_users(query)
+            users_data = hydrate_users(users, current_user_id, fields=fields)
             
             return jsonify({'users': users_data}), 200
             
+        except InvalidFields as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @staticmethod
+    @replica_reads
+    def get_suggestions(current_user_id):
+        try:
+            fields = requested_fields(User)
+            already_followed = exists().where(
+                Follow.follower_id == current_user_id,
+                Follow.followed_id == UserSuggestion.suggested_user_id
+            )
+            # Only if some are left once follows made since are skipped, so a
+            # user who followed them all falls back to popular accounts
+            has_suggestions = db.session.query(
+                exists().where(UserSuggestion.user_id == current_user_id, ~already_followed)
+            ).scalar()
+            
+            if has_suggestions:
+                # Precomputed by compute-suggestions; follows made since are skipped
+                suggestions = keyset_paginate(
+                    UserSuggestion.query
+                        .filter(UserSuggestion.user_id == current_user_id, ~already_followed)
+                        .options(joinedload(UserSuggestion.suggested_user)),
+                    [UserSuggestion.score, UserSuggestion.suggested_user_id],
+                    default_per_page=20
+                )
+                users = [suggestion.suggested_user for suggestion in suggestions.items]
+                scores = [suggestion.score for suggestion in suggestions.items]
+                source = 'mutuals'
+            else:
+                # Nothing in common yet: suggest the most followed accounts
+                suggestions = keyset_paginate(
+                    User.query.filter(
+                        User.id != current_user_id,
+                        ~exists().where(Follow.follower_id == current_user_id, Follow.followed_id == User.id)
+                    ),
+                    [User.follower_count, User.id],
+                    default_per_page=20
+                )
+                users = suggestions.items
+                scores = [0] * len(users)
+                source = 'popular'
+            
+            # Followed accounts were filtered out above
+            users_data = hydrate_users(users, current_user_id, followed=set(), fields=fields)
+            for user_data, score in zip(users_data, scores):
+                user_data['mutual_count'] = score
+            
+            return jsonify({
+                'users': users_data,
+                'source': source,
+                **suggestions.meta()
+            }), 200
+            
+        except (InvalidCursor, InvalidFields) as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': str(e)}), 500
\ No newline at end of file
@@ -0,0 +1,11 @@
+from app.models.user import User
+from app.models.post import Post
+from app.models.like import Like
+from app.models.comment import Comment
+from app.models.follow import Follow
+from app.models.timeline import TimelineEntry
+from app.models.revoked_token import RevokedToken
+from app.models.suggestion import UserSuggestion
+from app.models.media import MediaFile
+from app.models.outbox import OutboxEvent, OutboxDelivery
+from app.models.notification import Notification, NotificationActor
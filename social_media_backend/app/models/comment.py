@@ -11,15 +11,23 @@ class Comment(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    def to_dict(self):
+    # Serialized fields in output order; to_dict(fields=...) only computes
+    # the requested ones
+    SERIALIZERS = {
+        'id': lambda comment: comment.id,
+        'content': lambda comment: comment.content,
+        'user_id': lambda comment: comment.user_id,
+        'username': lambda comment: comment.author.username,
+        'profile_picture': lambda comment: comment.author.profile_picture,
+        'post_id': lambda comment: comment.post_id,
+        'created_at': lambda comment: comment.created_at.isoformat()
+    }
+    
+    def to_dict(self, fields=None):
         return {
-            'id': self.id,
-            'content': self.content,
-            'user_id': self.user_id,
-            'username': self.author.username,
-            'profile_picture': self.author.profile_picture,
-            'post_id': self.post_id,
-            'created_at': self.created_at.isoformat()
+            name: serialize(self)
+            for name, serialize in self.SERIALIZERS.items()
+            if fields is None or name in fields
         }
     
     def __repr__(self):
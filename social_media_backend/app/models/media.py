@@ -0,0 +1,47 @@
+from app.extensions import db
+from datetime import datetime
+
+class MediaFile(db.Model):
+    __tablename__ = 'media_files'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    # Files are stored and served under their content hash
+    sha256 = db.Column(db.String(64), unique=True, nullable=False)
+    extension = db.Column(db.String(10), nullable=False)
+    content_type = db.Column(db.String(50), nullable=False)
+    size = db.Column(db.Integer, nullable=False)
+    width = db.Column(db.Integer)
+    height = db.Column(db.Integer)
+    # Comma-separated widths of the resized variants, once generated
+    variants = db.Column(db.String(100), nullable=False, default='', server_default='')
+    status = db.Column(db.String(20), nullable=False, default='processing')
+    uploaded_by = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    @property
+    def filename(self):
+        return f'{self.sha256}.{self.extension}'
+    
+    def variant_widths(self):
+        return [int(width) for width in self.variants.split(',') if width]
+    
+    def to_dict(self):
+        """Convert media file to dictionary"""
+        return {
+            'id': self.id,
+            'sha256': self.sha256,
+            'url': f'/media/{self.filename}',
+            'content_type': self.content_type,
+            'size': self.size,
+            'width': self.width,
+            'height': self.height,
+            'variants': {
+                str(width): f'/media/{self.sha256}_{width}.{self.extension}'
+                for width in self.variant_widths()
+            },
+            'status': self.status,
+            'created_at': self.created_at.isoformat()
+        }
+    
+    def __repr__(self):
+        return f'<MediaFile {self.filename}>'
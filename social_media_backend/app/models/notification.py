@@ -0,0 +1,66 @@
+from app.extensions import db
+from datetime import datetime
+
+class Notification(db.Model):
+    __tablename__ = 'notifications'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    # Recipient
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    # like, comment or follow
+    kind = db.Column(db.String(20), nullable=False)
+    # The liked or commented post, or the followed user for follows
+    target_id = db.Column(db.Integer, nullable=False)
+    # Activity on one target within one time bucket is a single row
+    bucket = db.Column(db.Integer, nullable=False)
+    # Distinct users in notification_actors
+    actor_count = db.Column(db.Integer, nullable=False, default=0)
+    last_actor_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'))
+    # Time of the first activity; the inbox is ordered by it, since it never
+    # changes and a bucket keeps later activity close to it
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # Time of the latest activity
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    read_at = db.Column(db.DateTime)
+    
+    last_actor = db.relationship('User', foreign_keys=[last_actor_id])
+    
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'kind', 'target_id', 'bucket', name='unique_notification'),
+        db.Index('ix_notification_user_created', 'user_id', 'created_at', 'id'),
+    )
+    
+    def to_dict(self):
+        actor = self.last_actor
+        return {
+            'id': self.id,
+            'type': self.kind,
+            'actor': {
+                'id': actor.id,
+                'username': actor.username,
+                'profile_picture': actor.profile_picture
+            } if actor is not None else None,
+            'actor_count': self.actor_count,
+            'others_count': max(self.actor_count - 1, 0),
+            'target_id': self.target_id,
+            'read': self.read_at is not None,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat()
+        }
+    
+    def __repr__(self):
+        return f'<Notification {self.kind} {self.target_id} for User {self.user_id}>'
+
+class NotificationActor(db.Model):
+    __tablename__ = 'notification_actors'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    notification_id = db.Column(db.Integer, db.ForeignKey('notifications.id', ondelete='CASCADE'), nullable=False)
+    actor_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    # Each user counts once per notification however often they act
+    __table_args__ = (db.UniqueConstraint('notification_id', 'actor_id', name='unique_notification_actor'),)
+    
+    def __repr__(self):
+        return f'<NotificationActor User {self.actor_id} on Notification {self.notification_id}>'
@@ -0,0 +1,38 @@
+from app.extensions import db
+from datetime import datetime
+
+class OutboxEvent(db.Model):
+    __tablename__ = 'outbox_events'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    topic = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.JSON, nullable=False)
+    # pending until every handler succeeded, dead after too many attempts
+    status = db.Column(db.String(10), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    available_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    processed_at = db.Column(db.DateTime, index=True)
+    
+    __table_args__ = (
+        # The worker's scan: pending events that are due, oldest first
+        db.Index('ix_outbox_pending', 'status', 'available_at', 'id'),
+    )
+    
+    def __repr__(self):
+        return f'<OutboxEvent {self.id} {self.topic} {self.status}>'
+
+class OutboxDelivery(db.Model):
+    __tablename__ = 'outbox_deliveries'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.Integer, db.ForeignKey('outbox_events.id', ondelete='CASCADE'), nullable=False)
+    handler = db.Column(db.String(100), nullable=False)
+    delivered_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    # One row per handler that finished an event, so a retry skips it
+    __table_args__ = (db.UniqueConstraint('event_id', 'handler', name='unique_outbox_delivery'),)
+    
+    def __repr__(self):
+        return f'<OutboxDelivery {self.event_id} {self.handler}>'
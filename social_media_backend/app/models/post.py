@@ -8,28 +8,58 @@ class Post(db.Model):
     content = db.Column(db.Text, nullable=False)
     image_url = db.Column(db.String(500))
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    likes_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    comments_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Explore ranking, kept current by app.services.ranking
+    hot_score = db.Column(db.Float, nullable=False, default=0.0, server_default='0')
     
     # Relationships
-    author = db.relationship('User', backref='posts', lazy=True)
+    author = db.relationship('User', back_populates='posts', lazy=True)
     likes = db.relationship('Like', backref='post', lazy=True, cascade='all, delete-orphan')
     comments = db.relationship('Comment', backref='post', lazy=True, cascade='all, delete-orphan')
     
-    def to_dict(self):
-        """Convert post object to dictionary"""
-        return {
-            'id': self.id,
-            'content': self.content,
-            'image_url': self.image_url,
-            'user_id': self.user_id,
-            'username': self.author.username if self.author else None,
-            'profile_picture': self.author.profile_picture if self.author else None,
-            'likes_count': len(self.likes),
-            'comments_count': len(self.comments),
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+    __table_args__ = (
+        db.Index('ix_posts_user_created', 'user_id', 'created_at'),
+        db.Index('ix_posts_hot', 'hot_score', 'id'),
+    )
+    
+    # Serialized fields in output order; to_dict(fields=...) only computes
+    # the requested ones, so leaving out username and profile_picture never
+    # touches the author
+    SERIALIZERS = {
+        'id': lambda post: post.id,
+        'content': lambda post: post.content,
+        'image_url': lambda post: post.image_url,
+        'user_id': lambda post: post.user_id,
+        'username': lambda post: post.author.username if post.author else None,
+        'profile_picture': lambda post: post.author.profile_picture if post.author else None,
+        'likes_count': lambda post: post.likes_count,
+        'comments_count': lambda post: post.comments_count,
+        'created_at': lambda post: post.created_at.isoformat(),
+        'updated_at': lambda post: post.updated_at.isoformat() if post.updated_at else None
+    }
+    VIEWER_FIELDS = ('is_owner', 'liked_by_me', 'is_following_author')
+    
+    def to_dict(self, current_user_id=None, viewer_state=None, fields=None):
+        """Convert post object to dictionary
+
+        viewer_state holds the per-viewer fields resolved for a whole page by
+        app.services.hydration.resolve_viewer_state.
+        """
+        data = {
+            name: serialize(self)
+            for name, serialize in self.SERIALIZERS.items()
+            if fields is None or name in fields
         }
+        
+        if current_user_id is not None and (fields is None or 'is_owner' in fields):
+            data['is_owner'] = self.user_id == current_user_id
+        if viewer_state is not None:
+            data.update(viewer_state)
+        
+        return data
     
     def __repr__(self):
         return f'<Post {self.id} by User {self.user_id}>'
\ No newline at end of file
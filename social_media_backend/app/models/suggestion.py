@@ -0,0 +1,22 @@
+from app.extensions import db
+from datetime import datetime
+
+class UserSuggestion(db.Model):
+    __tablename__ = 'user_suggestions'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    suggested_user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    # Number of accounts the user follows that follow the suggested user
+    score = db.Column(db.Integer, nullable=False)
+    computed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    suggested_user = db.relationship('User', foreign_keys=[suggested_user_id])
+    
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'suggested_user_id', name='unique_user_suggestion'),
+        db.Index('ix_suggestion_user_score', 'user_id', 'score', 'suggested_user_id'),
+    )
+    
+    def __repr__(self):
+        return f'<UserSuggestion User {self.suggested_user_id} for User {self.user_id}>'
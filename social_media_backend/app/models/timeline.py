@@ -0,0 +1,21 @@
+from app.extensions import db
+from datetime import datetime
+
+class TimelineEntry(db.Model):
+    __tablename__ = 'timeline_entries'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    post_id = db.Column(db.Integer, db.ForeignKey('posts.id', ondelete='CASCADE'), nullable=False, index=True)
+    author_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    # Copy of Post.created_at so a feed page is a single range scan on the index below
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'post_id', name='unique_timeline_entry'),
+        db.Index('ix_timeline_user_created', 'user_id', 'created_at', 'post_id'),
+        db.Index('ix_timeline_user_author', 'user_id', 'author_id'),
+    )
+    
+    def __repr__(self):
+        return f'<TimelineEntry Post {self.post_id} for User {self.user_id}>'
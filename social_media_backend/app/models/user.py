@@ -1,6 +1,7 @@
 from app.extensions import db
 from datetime import datetime
-import bcrypt
+from sqlalchemy import DDL, event
+from app.services.passwords import password_hasher
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -11,11 +12,16 @@ class User(db.Model):
     password_hash = db.Column(db.String(200), nullable=False)
     profile_picture = db.Column(db.String(200))
     bio = db.Column(db.Text)
+    post_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    follower_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    following_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Unread rows in notifications, kept by the notification handlers
+    unread_notifications_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
-    posts = db.relationship('Post', backref='author', lazy=True, cascade='all, delete-orphan')
+    posts = db.relationship('Post', back_populates='author', lazy=True, cascade='all, delete-orphan')
     likes = db.relationship('Like', backref='user', lazy=True, cascade='all, delete-orphan')
     comments = db.relationship('Comment', backref='author', lazy=True, cascade='all, delete-orphan')
     followers = db.relationship('Follow', foreign_keys='Follow.followed_id', 
@@ -25,24 +31,61 @@ class User(db.Model):
                                backref='follower', lazy='dynamic',
                                cascade='all, delete-orphan')
     
+    __table_args__ = (
+        # Most followed accounts first, for suggestions with nothing in common
+        db.Index('ix_users_follower_count', 'follower_count', 'id'),
+    )
+    
     def set_password(self, password):
-        self.password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
-        return bcrypt.checkpw(password.encode('utf-8'), self.password_hash.encode('utf-8'))
+        return password_hasher.verify(password, self.password_hash)
+    
+    def password_needs_rehash(self):
+        return password_hasher.needs_rehash(self.password_hash)
+    
+    # Serialized fields in output order; to_dict(fields=...) only computes
+    # the requested ones
+    SERIALIZERS = {
+        'id': lambda user: user.id,
+        'username': lambda user: user.username,
+        'email': lambda user: user.email,
+        'profile_picture': lambda user: user.profile_picture,
+        'bio': lambda user: user.bio,
+        'created_at': lambda user: user.created_at.isoformat(),
+        'post_count': lambda user: user.post_count,
+        'follower_count': lambda user: user.follower_count,
+        'following_count': lambda user: user.following_count
+    }
+    # Added per viewer by the controllers
+    VIEWER_FIELDS = ('is_following', 'is_self')
     
-    def to_dict(self):
+    def to_dict(self, fields=None):
         return {
-            'id': self.id,
-            'username': self.username,
-            'email': self.email,
-            'profile_picture': self.profile_picture,
-            'bio': self.bio,
-            'created_at': self.created_at.isoformat(),
-            'post_count': len(self.posts),
-            'follower_count': self.followers.count(),
-            'following_count': self.following.count()
+            name: serialize(self)
+            for name, serialize in self.SERIALIZERS.items()
+            if fields is None or name in fields
         }
     
     def __repr__(self):
-        return f'<User {self.username}>'
\ No newline at end of file
+        return f'<User {self.username}>'
+
+
+# Trigram index serving substring username search on PostgreSQL, and a
+# btree serving prefixes too short for trigrams. Other databases use the
+# in-process index in app.services.user_search instead.
+event.listen(
+    User.__table__, 'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql')
+)
+event.listen(
+    User.__table__, 'after_create',
+    DDL('CREATE INDEX IF NOT EXISTS ix_users_username_trgm '
+        'ON users USING gin (lower(username) gin_trgm_ops)').execute_if(dialect='postgresql')
+)
+event.listen(
+    User.__table__, 'after_create',
+    DDL('CREATE INDEX IF NOT EXISTS ix_users_username_prefix '
+        'ON users (lower(username) text_pattern_ops)').execute_if(dialect='postgresql')
+)
\ No newline at end of file
@@ -13,9 +13,11 @@ def follow_user(user_id):
 @follow_bp.route('/<int:user_id>/followers', methods=['GET'])
 @jwt_required()
 def get_followers(user_id):
-    return FollowController.get_followers(user_id)
+    current_user_id = int(get_jwt_identity())
+    return FollowController.get_followers(user_id, current_user_id)
 
 @follow_bp.route('/<int:user_id>/following', methods=['GET'])
 @jwt_required()
 def get_following(user_id):
-    return FollowController.get_following(user_id)
\ No newline at end of file
+    current_user_id = int(get_jwt_identity())
+    return FollowController.get_following(user_id, current_user_id)
\ No newline at end of file
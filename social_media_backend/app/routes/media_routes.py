@@ -0,0 +1,18 @@
+from flask import Blueprint
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.controllers.media_controller import MediaController
+
+media_bp = Blueprint('media', __name__, url_prefix='/media')
+
+# Upload an image as the raw request body
+@media_bp.route('', methods=['POST'])
+@jwt_required()
+def upload_media():
+    current_user_id = int(get_jwt_identity())
+    return MediaController.upload_media(current_user_id)
+
+# Serve an uploaded image or one of its resized variants; public so <img>
+# tags can load it without a token
+@media_bp.route('/<filename>', methods=['GET'])
+def get_media(filename):
+    return MediaController.get_media(filename)
@@ -0,0 +1,9 @@
+from flask import Blueprint
+from app.controllers.system_controller import SystemController
+
+metrics_bp = Blueprint('metrics', __name__)
+
+# Prometheus scrape target; expose it on the internal network only
+@metrics_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    return SystemController.get_metrics()
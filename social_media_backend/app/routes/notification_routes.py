@@ -0,0 +1,26 @@
+from flask import Blueprint
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.controllers.notification_controller import NotificationController
+
+notification_bp = Blueprint('notifications', __name__, url_prefix='/notifications')
+
+# Inbox of the current user, newest activity first
+@notification_bp.route('', methods=['GET'])
+@jwt_required()
+def get_notifications():
+    current_user_id = int(get_jwt_identity())
+    return NotificationController.get_notifications(current_user_id)
+
+# Number of unread notifications, for the badge
+@notification_bp.route('/unread-count', methods=['GET'])
+@jwt_required()
+def get_unread_count():
+    current_user_id = int(get_jwt_identity())
+    return NotificationController.get_unread_count(current_user_id)
+
+# Mark the notifications in {"ids": [...]}, or all of them, read
+@notification_bp.route('/read', methods=['POST'])
+@jwt_required()
+def mark_read():
+    current_user_id = int(get_jwt_identity())
+    return NotificationController.mark_read(current_user_id)
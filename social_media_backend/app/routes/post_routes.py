@@ -18,6 +18,20 @@ def get_all_posts():
     current_user_id = int(get_jwt_identity())
     return PostController.get_all_posts(current_user_id)
 
+# Get the engagement-ranked Explore feed
+@post_bp.route('/explore', methods=['GET'])
+@jwt_required()
+def get_explore_posts():
+    current_user_id = int(get_jwt_identity())
+    return PostController.get_explore_posts(current_user_id)
+
+# Get several posts by id in one request
+@post_bp.route('/batch', methods=['GET'])
+@jwt_required()
+def get_posts_batch():
+    current_user_id = int(get_jwt_identity())
+    return PostController.get_posts_batch(current_user_id)
+
 # Get a single post
 @post_bp.route('/<int:post_id>', methods=['GET'])
 @jwt_required()
@@ -0,0 +1,29 @@
+from flask import Blueprint
+from app.controllers.system_controller import SystemController
+from app.utils.auth import admin_required
+
+system_bp = Blueprint('system', __name__, url_prefix='/system')
+
+# Liveness/readiness check for the load balancer
+@system_bp.route('/health', methods=['GET'])
+def health():
+    return SystemController.health()
+
+# Connection pool usage and checkout waits
+@system_bp.route('/db-pool', methods=['GET'])
+@admin_required
+def get_pool_stats():
+    return SystemController.get_pool_stats()
+
+# Cache hit/miss statistics
+@system_bp.route('/cache', methods=['GET'])
+@admin_required
+def get_cache_stats():
+    return SystemController.get_cache_stats()
+
+
+# Buffered like count statistics
+@system_bp.route('/like-buffer', methods=['GET'])
+@admin_required
+def get_like_buffer_stats():
+    return SystemController.get_like_buffer_stats()
\ No newline at end of file
@@ -0,0 +1,11 @@
+from flask import Blueprint
+from flask_jwt_extended import jwt_required
+from app.controllers.trending_controller import TrendingController
+
+trending_bp = Blueprint('trending', __name__, url_prefix='/trending')
+
+# Get trending hashtags
+@trending_bp.route('/', methods=['GET'])
+@jwt_required()
+def get_trending():
+    return TrendingController.get_trending()
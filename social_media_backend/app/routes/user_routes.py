@@ -7,7 +7,20 @@ user_bp = Blueprint('users', __name__)
 @user_bp.route('/', methods=['GET'])
 @jwt_required()
 def search_users():
-    return UserController.search_users()
+    current_user_id = int(get_jwt_identity())
+    return UserController.search_users(current_user_id)
+
+@user_bp.route('/batch', methods=['GET'])
+@jwt_required()
+def get_users_batch():
+    current_user_id = int(get_jwt_identity())
+    return UserController.get_users_batch(current_user_id)
+
+@user_bp.route('/suggestions', methods=['GET'])
+@jwt_required()
+def get_suggestions():
+    current_user_id = int(get_jwt_identity())
+    return UserController.get_suggestions(current_user_id)
 
 @user_bp.route('/<int:user_id>', methods=['GET'])
 @jwt_required()
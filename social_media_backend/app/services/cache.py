@@ -0,0 +1,138 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_TTL = 60
+DEFAULT_MAX_SIZE = 10000
+
+
+class MemoryBackend:
+    """Thread-safe in-process LRU cache with per-entry TTL"""
+    
+    def __init__(self, max_size=DEFAULT_MAX_SIZE):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+    
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+    
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def size(self):
+        return len(self._entries)
+
+
+class RedisBackend:
+    """Cache shared by all workers, stored in Redis as JSON"""
+    
+    def __init__(self, url):
+        # Optional dependency, only needed when CACHE_BACKEND=redis
+        import redis
+        self._client = redis.Redis.from_url(url)
+    
+    def get(self, key):
+        raw = self._client.get(key)
+        return json.loads(raw) if raw is not None else None
+    
+    def set(self, key, value, ttl):
+        self._client.set(key, json.dumps(value), ex=max(int(ttl), 1))
+    
+    def delete(self, *keys):
+        if keys:
+            self._client.delete(*keys)
+    
+    def clear(self):
+        pass
+    
+    def size(self):
+        return None
+
+
+class Cache:
+    """Read-through cache namespace with hit/miss accounting"""
+    
+    def __init__(self, namespace, ttl=DEFAULT_TTL, backend=None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.backend = backend or MemoryBackend()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+    
+    def _key(self, key):
+        return f'{self.namespace}:{key}'
+    
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+    
+    def get(self, key):
+        value = self.backend.get(self._key(key))
+        self._count('hits' if value is not None else 'misses')
+        return value
+    
+    def set(self, key, value):
+        self.backend.set(self._key(key), value, self.ttl)
+    
+    def get_or_set(self, key, loader):
+        """Return the cached value, calling loader() to fill a miss"""
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            self.set(key, value)
+        return value
+    
+    def invalidate(self, *keys):
+        self.backend.delete(*[self._key(key) for key in keys])
+        self._count('invalidations', len(keys))
+    
+    def clear(self):
+        self.backend.clear()
+    
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else None
+        stats['size'] = self.backend.size()
+        stats['backend'] = type(self.backend).__name__
+        return stats
+
+
+def create_backend(app, max_size):
+    if app.config.get('CACHE_BACKEND', 'memory') == 'redis':
+        return RedisBackend(app.config['CACHE_REDIS_URL'])
+    return MemoryBackend(max_size)
+
+
+# Viewer-independent part of User.to_dict, keyed by user id
+profile_cache = Cache('profile')
+
+
+def init_app(app):
+    profile_cache.ttl = app.config.get('PROFILE_CACHE_TTL', DEFAULT_TTL)
+    profile_cache.backend = create_backend(app, app.config.get('PROFILE_CACHE_SIZE', DEFAULT_MAX_SIZE))
@@ -0,0 +1,61 @@
+import gzip
+import time
+from flask import request
+from app.utils.json_provider import record_serialization_cpu
+
+try:
+    # Optional dependency; without it only gzip is offered
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'text/plain', 'text/html'}
+DEFAULT_MIN_SIZE = 1024
+DEFAULT_GZIP_LEVEL = 5
+DEFAULT_BROTLI_QUALITY = 4
+
+
+def _encodings():
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def init_app(app):
+    """Compress large responses with brotli or gzip per Accept-Encoding"""
+    if not app.config.get('COMPRESS_ENABLED', True):
+        return
+    
+    min_size = app.config.get('COMPRESS_MIN_SIZE', DEFAULT_MIN_SIZE)
+    gzip_level = app.config.get('COMPRESS_LEVEL', DEFAULT_GZIP_LEVEL)
+    brotli_quality = app.config.get('COMPRESS_BROTLI_QUALITY', DEFAULT_BROTLI_QUALITY)
+    
+    @app.after_request
+    def compress_response(response):
+        if (response.status_code != 200 or response.direct_passthrough
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES
+                or 'Content-Encoding' in response.headers):
+            return response
+    
+        response.vary.add('Accept-Encoding')
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+    
+        encoding = request.accept_encodings.best_match(_encodings())
+        if encoding is None:
+            return response
+    
+        started = time.thread_time()
+        if encoding == 'br':
+            data = brotli.compress(data, quality=brotli_quality)
+        else:
+            data = gzip.compress(data, compresslevel=gzip_level)
+        record_serialization_cpu(time.thread_time() - started)
+    
+        response.set_data(data)
+        response.headers['Content-Encoding'] = encoding
+    
+        # The bytes now depend on the encoding, so a strong ETag would lie
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
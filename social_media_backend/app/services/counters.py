@@ -0,0 +1,69 @@
+from sqlalchemy import bindparam, func, select, update
+from app.extensions import db
+from app.models.comment import Comment
+from app.models.follow import Follow
+from app.models.like import Like
+from app.models.notification import Notification, NotificationActor
+from app.models.post import Post
+from app.models.user import User
+
+
+def increment(model, object_id, **deltas):
+    """Atomically add deltas to counter columns of a single row"""
+    values = {getattr(model, name): getattr(model, name) + delta for name, delta in deltas.items()}
+    # Counter changes are not edits, so keep updated_at's onupdate from firing
+    values[model.updated_at] = model.updated_at
+    db.session.execute(
+        update(model).where(model.id == object_id).values(values)
+    )
+
+
+def increment_many(model, name, deltas):
+    """Add {id: delta} to one counter column of many rows in one executemany UPDATE"""
+    rows = [{'object_id': object_id, 'delta': delta} for object_id, delta in sorted(deltas.items()) if delta]
+    if not rows:
+        return
+    table = model.__table__
+    db.session.execute(
+        update(table)
+        .where(table.c.id == bindparam('object_id'))
+        .values({name: table.c[name] + bindparam('delta'), 'updated_at': table.c.updated_at}),
+        rows
+    )
+
+
+# (model, counter column, source table column counted per row, extra
+# conditions on the counted rows)
+COUNTERS = [
+    (Post, Post.likes_count, Like.post_id),
+    (Post, Post.comments_count, Comment.post_id),
+    (User, User.post_count, Post.user_id),
+    (User, User.follower_count, Follow.followed_id),
+    (User, User.following_count, Follow.follower_id),
+    (User, User.unread_notifications_count, Notification.user_id, Notification.read_at.is_(None)),
+    (Notification, Notification.actor_count, NotificationActor.notification_id),
+]
+
+
+def reconcile_counters():
+    """Recompute every stored counter and fix rows that drifted
+    
+    Returns a dict of counter name to number of repaired rows.
+    """
+    repaired = {}
+    for model, counter, source, *conditions in COUNTERS:
+        actual = select(func.count())\
+            .where(source == model.id, *conditions)\
+            .correlate(model)\
+            .scalar_subquery()
+    
+        result = db.session.execute(
+            update(model)
+            .where(counter != actual)
+            .values({counter: actual, model.updated_at: model.updated_at})
+            .execution_options(synchronize_session=False)
+        )
+        repaired[f'{model.__tablename__}.{counter.key}'] = result.rowcount
+    
+    db.session.commit()
+    return repaired
@@ -0,0 +1,110 @@
+import threading
+import time
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+# Upper bounds, in seconds, of the checkout wait histogram
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+class PoolWaitStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.buckets = [0] * (len(WAIT_BUCKETS) + 1)
+    
+    def record(self, waited, timed_out=False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+            for index, bound in enumerate(WAIT_BUCKETS):
+                if waited <= bound:
+                    self.buckets[index] += 1
+                    break
+            else:
+                self.buckets[-1] += 1
+    
+    def snapshot(self):
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'wait_total_seconds': round(self.wait_total, 6),
+                'wait_avg_seconds': round(self.wait_total / self.checkouts, 6) if self.checkouts else 0.0,
+                'wait_max_seconds': round(self.wait_max, 6),
+                'wait_buckets': dict(zip([str(bound) for bound in WAIT_BUCKETS] + ['+Inf'], self.buckets))
+            }
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+    
+    def recreate(self):
+        pool = super().recreate()
+        pool.wait_stats = self.wait_stats
+        return pool
+    
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.wait_stats.record(time.perf_counter() - started, timed_out=True)
+            raise
+        self.wait_stats.record(time.perf_counter() - started)
+        return connection
+
+
+def engine_options(config, uri=None):
+    """Build engine options for uri (the primary by default) from the DB_* settings"""
+    uri = uri or config.get('SQLALCHEMY_DATABASE_URI') or ''
+    options = {'pool_pre_ping': config.get('DB_POOL_PRE_PING', True)}
+    
+    # SQLite uses its own single-file pools; the sizing knobs do not apply
+    if uri.startswith('sqlite'):
+        return options
+    
+    options.update({
+        'poolclass': TimedQueuePool,
+        'pool_size': config.get('DB_POOL_SIZE', 5),
+        'max_overflow': config.get('DB_MAX_OVERFLOW', 10),
+        'pool_timeout': config.get('DB_POOL_TIMEOUT', 30),
+        'pool_recycle': config.get('DB_POOL_RECYCLE', 1800),
+    })
+    
+    statement_timeout = config.get('DB_STATEMENT_TIMEOUT')
+    if statement_timeout and uri.startswith('postgresql'):
+        options['connect_args'] = {'options': f'-c statement_timeout={int(statement_timeout)}'}
+    
+    return options
+
+
+def pool_stats(engine):
+    """Describe an engine's pool usage and checkout waits"""
+    pool = engine.pool
+    stats = {'pool': type(pool).__name__, 'url': engine.url.render_as_string(hide_password=True)}
+    
+    if isinstance(pool, QueuePool):
+        stats.update({
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': pool.overflow(),
+            'timeout': pool.timeout()
+        })
+    
+    wait_stats = getattr(pool, 'wait_stats', None)
+    if wait_stats is not None:
+        stats.update(wait_stats.snapshot())
+    return stats
@@ -0,0 +1,167 @@
+import random
+import time
+from contextlib import contextmanager
+from functools import wraps
+from flask import current_app, g, has_request_context, request
+from flask_jwt_extended import get_jwt_identity
+from itsdangerous import BadSignature, Signer
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql.selectable import CompoundSelect, Select
+from app.services.cache import Cache, create_backend
+from app.services.db_pool import engine_options
+
+REPLICA_PREFIX = 'replica_'
+DEFAULT_STICKY_SECONDS = 5
+# Echoed back by the client, so the time of its last write reaches every
+# worker even when recent_writers is per process
+LAST_WRITE_HEADER = 'X-Last-Write'
+
+# Users who wrote recently read from the primary until their writes
+# replicate, keyed by user id with the time of the write
+recent_writers = Cache('sticky', ttl=DEFAULT_STICKY_SECONDS)
+
+
+def replica_binds(config):
+    """Build one SQLALCHEMY_BINDS entry per SQLALCHEMY_REPLICA_URIS entry"""
+    binds = {}
+    for index, uri in enumerate(config.get('SQLALCHEMY_REPLICA_URIS') or []):
+        binds[f'{REPLICA_PREFIX}{index}'] = {'url': uri, **engine_options(config, uri)}
+    return binds
+
+
+def _signer():
+    return Signer(current_app.config['JWT_SECRET_KEY'], salt='last-write')
+
+
+def mark_recent_writer(user_id):
+    """Keep user_id's reads on the primary for the sticky window"""
+    now = time.time()
+    recent_writers.set(str(user_id), now)
+    if has_request_context():
+        g.last_write = (str(user_id), now)
+
+
+def last_write_at(user_id):
+    """Time of user_id's latest write known to this worker or sent by the client"""
+    times = [recent_writers.get(str(user_id))]
+    token = request.headers.get(LAST_WRITE_HEADER) if has_request_context() else None
+    if token:
+        try:
+            writer, written_at = _signer().unsign(token).decode().rsplit(':', 1)
+            if writer == str(user_id):
+                times.append(float(written_at))
+        except (BadSignature, ValueError):
+            pass
+    times = [written_at for written_at in times if written_at is not None]
+    return max(times) if times else None
+
+
+def wrote_recently(user_id):
+    written_at = last_write_at(user_id)
+    return written_at is not None and time.time() - written_at < recent_writers.ttl
+
+
+def _is_read(clause):
+    if not isinstance(clause, (Select, CompoundSelect)):
+        return False
+    return getattr(clause, '_for_update_arg', None) is None
+
+
+def _current_identity():
+    try:
+        return get_jwt_identity()
+    except RuntimeError:
+        return None
+
+
+class RoutingSession(Session):
+    """Session that sends SELECTs from replica_reads paths to a replica bind
+    
+    Everything else (flushes, UPDATE/DELETE, SELECT ... FOR UPDATE, raw text)
+    goes to the primary, and so does every statement once the session has
+    flushed. The replica is picked once per session so a request does not
+    mix replicas with different lag.
+    """
+    
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and _is_read(clause) and self._replica_allowed():
+            replica = self._replica()
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+    
+    def _replica_allowed(self):
+        if self.info.get('wrote') or self._flushing:
+            return False
+        return has_request_context() and g.get('db_use_replica', False)
+    
+    def _replica(self):
+        engines = self._db.engines
+        key = self.info.get('replica')
+        if key is None:
+            keys = [name for name in engines if name and name.startswith(REPLICA_PREFIX)]
+            if not keys:
+                return None
+            key = self.info['replica'] = random.choice(keys)
+        return engines[key]
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_write(session, flush_context):
+    session.info['wrote'] = True
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _make_writer_sticky(session):
+    if not session.info.pop('wrote', False) or not has_request_context():
+        return
+    identity = _current_identity()
+    if identity is not None:
+        mark_recent_writer(identity)
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _forget_write(session):
+    session.info.pop('wrote', None)
+
+
+def replica_reads(f):
+    """Let a read-only controller path read from a replica
+    
+    Falls back to the primary while the current user's own recent writes may
+    not have replicated yet (REPLICA_STICKY_SECONDS).
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        previous = g.get('db_use_replica', False)
+        identity = _current_identity()
+        g.db_use_replica = identity is None or not wrote_recently(identity)
+        try:
+            return f(*args, **kwargs)
+        finally:
+            g.db_use_replica = previous
+    return decorated
+
+
+@contextmanager
+def primary_reads():
+    """Read from the primary inside a replica_reads path, e.g. to fill a cache"""
+    previous = g.get('db_use_replica', False)
+    g.db_use_replica = False
+    try:
+        yield
+    finally:
+        g.db_use_replica = previous
+
+
+def init_app(app):
+    recent_writers.ttl = app.config.get('REPLICA_STICKY_SECONDS', DEFAULT_STICKY_SECONDS)
+    recent_writers.backend = create_backend(app, app.config.get('PROFILE_CACHE_SIZE', 10000))
+    
+    @app.after_request
+    def send_last_write(response):
+        last_write = g.pop('last_write', None)
+        if last_write is not None:
+            response.headers[LAST_WRITE_HEADER] = _signer().sign(':'.join(map(str, last_write))).decode()
+        return response
@@ -0,0 +1,312 @@
+import logging
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from itertools import chain
+from sqlalchemy import func
+from app.extensions import db
+from app.models.follow import Follow
+from app.services.db_routing import last_write_at
+from app.services.per_process import per_process_thread
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REFRESH_INTERVAL = 60
+BUILD_CHUNK_SIZE = 50000
+
+
+class _Adjacency:
+    """Immutable CSR adjacency of one direction of the follow graph
+    
+    ``neighbors[offsets[u]:offsets[u + 1]]`` are the sorted ids adjacent to
+    user u. Ids are dense integers, so offsets is indexed by user id.
+    """
+    
+    __slots__ = ('offsets', 'neighbors')
+    
+    def __init__(self, offsets, neighbors):
+        self.offsets = offsets
+        self.neighbors = neighbors
+    
+    def _bounds(self, user_id):
+        if user_id < 0 or user_id + 1 >= len(self.offsets):
+            return 0, 0
+        return self.offsets[user_id], self.offsets[user_id + 1]
+    
+    def degree(self, user_id):
+        lo, hi = self._bounds(user_id)
+        return hi - lo
+    
+    def contains(self, user_id, other_id):
+        lo, hi = self._bounds(user_id)
+        index = bisect_left(self.neighbors, other_id, lo, hi)
+        return index < hi and self.neighbors[index] == other_id
+    
+    def list(self, user_id):
+        lo, hi = self._bounds(user_id)
+        return self.neighbors[lo:hi].tolist()
+    
+    def nbytes(self):
+        return (len(self.offsets) * self.offsets.itemsize
+                + len(self.neighbors) * self.neighbors.itemsize)
+
+
+_EMPTY = _Adjacency(array('q', [0]), array('i'))
+
+
+def _build_numpy(rows):
+    """Build both adjacencies from (follower_id, followed_id) rows with numpy
+    
+    Counting and placing edges runs in C, so a large rebuild does not hold
+    the GIL in a Python loop per edge while requests wait.
+    """
+    import numpy as np
+    
+    pairs = np.fromiter(chain.from_iterable(rows), dtype=np.int64)
+    sources, targets = pairs[0::2].astype(np.int32), pairs[1::2].astype(np.int32)
+    size = (int(pairs.max()) if len(pairs) else 0) + 2
+    
+    following_offsets = np.zeros(size, dtype=np.int64)
+    followers_offsets = np.zeros(size, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=size - 1), out=following_offsets[1:])
+    np.cumsum(np.bincount(targets, minlength=size - 1), out=followers_offsets[1:])
+    # A stable sort by followed id keeps each followers list sorted
+    followers_neighbors = sources[np.argsort(targets, kind='stable')]
+    
+    return (
+        _Adjacency(array('q', following_offsets.tobytes()), array('i', targets.tobytes())),
+        _Adjacency(array('q', followers_offsets.tobytes()), array('i', followers_neighbors.tobytes()))
+    )
+
+
+def _build_python(rows):
+    """Same result as _build_numpy, for installs without numpy"""
+    max_id = 0
+    sources = array('i')
+    targets = array('i')
+    for follower_id, followed_id in rows:
+        sources.append(follower_id)
+        targets.append(followed_id)
+        max_id = max(max_id, follower_id, followed_id)
+    
+    following_offsets = array('q', bytes(8 * (max_id + 2)))
+    followers_offsets = array('q', bytes(8 * (max_id + 2)))
+    for follower_id, followed_id in zip(sources, targets):
+        following_offsets[follower_id + 1] += 1
+        followers_offsets[followed_id + 1] += 1
+    for index in range(1, max_id + 2):
+        following_offsets[index] += following_offsets[index - 1]
+        followers_offsets[index] += followers_offsets[index - 1]
+    
+    # Following neighbors are the targets in order; followers are
+    # placed with a counting sort
+    followers_neighbors = array('i', bytes(4 * len(sources)))
+    cursor = array('q', followers_offsets)
+    for follower_id, followed_id in zip(sources, targets):
+        followers_neighbors[cursor[followed_id]] = follower_id
+        cursor[followed_id] += 1
+    
+    return _Adjacency(following_offsets, targets), _Adjacency(followers_offsets, followers_neighbors)
+
+
+class FollowGraph:
+    """In-process index of the follow graph for relationship lookups
+    
+    The graph is loaded from ``follows`` into two CSR adjacencies, following
+    and followers, each a sorted int32 neighbor array with an int64 offset
+    per user id. Every edge is stored once per direction, so the footprint
+    is 8 bytes per edge plus 16 bytes per user id: about 8 MB per million
+    follows, plus 16 MB per million users. Lookups are a bisect within one
+    user's slice.
+    
+    Follows made in this process are applied to an overlay immediately and
+    the index is rebuilt every ``refresh_interval`` seconds, when the table
+    changed, which is how changes made by other worker processes arrive.
+    Viewers whose last write (db_routing.last_write_at) is newer than the
+    loaded snapshot are answered from the database until the next build.
+    """
+    
+    def __init__(self, refresh_interval=DEFAULT_REFRESH_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self.app = None
+        self._lock = threading.Lock()
+        self._following = _EMPTY
+        self._followers = _EMPTY
+        # (follower_id, followed_id) -> (following, monotonic time of change)
+        self._overlay = {}
+        # user id -> overlay edges touching it
+        self._touched = {}
+        self._built_at = None
+        # Wall time the loaded snapshot was read, and the table's
+        # (row count, highest id) then
+        self._loaded_at = None
+        self._signature = None
+        self._refresher = per_process_thread(self._run, 'follow-graph-refresher')
+        self.builds = 0
+        self.build_seconds = None
+    
+    def init_app(self, app):
+        self.refresh_interval = app.config.get('FOLLOW_GRAPH_REFRESH_INTERVAL', DEFAULT_REFRESH_INTERVAL)
+        if app.config.get('FOLLOW_GRAPH_ENABLED', True):
+            self.app = app
+    
+    @property
+    def enabled(self):
+        return self.app is not None
+    
+    @property
+    def ready(self):
+        return self._built_at is not None
+    
+    def _run(self):
+        while True:
+            if self.ready:
+                time.sleep(self.refresh_interval)
+            try:
+                with self.app.app_context():
+                    try:
+                        self.rebuild()
+                    finally:
+                        db.session.remove()
+            except Exception:
+                logger.exception('Failed to build the follow graph')
+                time.sleep(self.refresh_interval)
+    
+    def can_answer(self, viewer_id=None):
+        """Whether lookups for viewer_id may be served from the index
+    
+        False until the first build finishes, and for viewers who wrote
+        since the index was loaded, since a write made on another worker
+        only reaches this one with the next build.
+        """
+        if not self.enabled:
+            return False
+        self._refresher.get()
+        if not self.ready:
+            return False
+        if viewer_id is None:
+            return True
+        written_at = last_write_at(viewer_id)
+        return written_at is None or written_at < self._loaded_at
+    
+    def rebuild(self, force=False):
+        """Load the follow graph from the database and swap it in
+    
+        Skipped while the follows table has the same row count and highest
+        id as at the last build; returns the number of edges loaded, or None
+        when skipped.
+        """
+        started = time.monotonic()
+        loaded_at = time.time()
+        signature = tuple(db.session.query(func.count(Follow.id), func.max(Follow.id)).one())
+        if not force and self.ready and signature == self._signature:
+            with self._lock:
+                self._loaded_at = self._built_at = loaded_at
+            return None
+    
+        # Ordered by follower then followed, so following lists come out
+        # sorted, and so do followers lists when filled in this order
+        rows = db.session.query(Follow.follower_id, Follow.followed_id)\
+            .order_by(Follow.follower_id, Follow.followed_id)\
+            .yield_per(BUILD_CHUNK_SIZE)
+        try:
+            following, followers = _build_numpy(rows)
+        except ImportError:
+            following, followers = _build_python(rows)
+    
+        with self._lock:
+            self._following, self._followers = following, followers
+            # Changes made after the load started may be missing from it
+            self._overlay = {edge: change for edge, change in self._overlay.items() if change[1] >= started}
+            self._touched = {}
+            for edge in self._overlay:
+                self._touched.setdefault(edge[0], set()).add(edge)
+                self._touched.setdefault(edge[1], set()).add(edge)
+            self._signature = signature
+            self._loaded_at = loaded_at
+            self._built_at = time.time()
+    
+        self.builds += 1
+        self.build_seconds = round(time.monotonic() - started, 3)
+        return len(following.neighbors)
+    
+    def record(self, follower_id, followed_id, following):
+        """Apply a committed follow or unfollow to this process's index"""
+        edge = (follower_id, followed_id)
+        with self._lock:
+            self._overlay[edge] = (following, time.monotonic())
+            self._touched.setdefault(follower_id, set()).add(edge)
+            self._touched.setdefault(followed_id, set()).add(edge)
+    
+    def _has_edge(self, follower_id, followed_id):
+        # Callers hold the lock
+        change = self._overlay.get((follower_id, followed_id))
+        if change is not None:
+            return change[0]
+        return self._following.contains(follower_id, followed_id)
+    
+    def is_following(self, follower_id, followed_id):
+        with self._lock:
+            return self._has_edge(follower_id, followed_id)
+    
+    def following_ids(self, follower_id, user_ids):
+        """Get the subset of user_ids that follower_id follows"""
+        with self._lock:
+            return {user_id for user_id in set(user_ids) if self._has_edge(follower_id, user_id)}
+    
+    def _neighbors(self, user_id, position):
+        with self._lock:
+            adjacency = self._following if position == 0 else self._followers
+            ids = set(adjacency.list(user_id))
+            for edge in self._touched.get(user_id, ()):
+                if edge[position] != user_id:
+                    continue
+                if self._overlay[edge][0]:
+                    ids.add(edge[1 - position])
+                else:
+                    ids.discard(edge[1 - position])
+        return sorted(ids)
+    
+    def following(self, user_id):
+        return self._neighbors(user_id, 0)
+    
+    def followers(self, user_id):
+        return self._neighbors(user_id, 1)
+    
+    def mutuals(self, user_id):
+        """Get ids of users that user_id follows and who follow back"""
+        followers = set(self.followers(user_id))
+        return [other for other in self.following(user_id) if other in followers]
+    
+    def _degree(self, user_id, position):
+        with self._lock:
+            adjacency = self._following if position == 0 else self._followers
+            count = adjacency.degree(user_id)
+            for edge in self._touched.get(user_id, ()):
+                if edge[position] == user_id:
+                    count += int(self._overlay[edge][0]) - int(self._following.contains(*edge))
+        return count
+    
+    def following_count(self, user_id):
+        return self._degree(user_id, 0)
+    
+    def follower_count(self, user_id):
+        return self._degree(user_id, 1)
+    
+    def stats(self):
+        with self._lock:
+            following, followers, overlay = self._following, self._followers, len(self._overlay)
+        return {
+            'ready': self.ready,
+            'users': len(following.offsets) - 1,
+            'edges': len(following.neighbors),
+            'overlay': overlay,
+            'bytes': following.nbytes() + followers.nbytes(),
+            'builds': self.builds,
+            'build_seconds': self.build_seconds,
+            'age_seconds': round(time.time() - self._built_at, 1) if self._built_at else None
+        }
+
+
+follow_graph = FollowGraph()
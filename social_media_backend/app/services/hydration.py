@@ -0,0 +1,140 @@
+from flask import request
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload
+from app.extensions import db
+from app.models.comment import Comment
+from app.models.follow import Follow
+from app.models.like import Like
+from app.services.follow_graph import follow_graph
+from app.utils.fields import wants
+
+MAX_COMMENTS_PREVIEW = 10
+
+
+def following_ids(viewer_id, user_ids):
+    """Get the subset of user_ids the viewer follows, in one query"""
+    if not viewer_id or not user_ids:
+        return set()
+    if follow_graph.can_answer(viewer_id):
+        return follow_graph.following_ids(viewer_id, user_ids)
+    
+    rows = db.session.query(Follow.followed_id)\
+        .filter(
+            Follow.follower_id == viewer_id,
+            Follow.followed_id.in_(set(user_ids))
+        ).all()
+    return {row[0] for row in rows}
+
+
+def hydrate_users(users, viewer_id=None, followed=None, fields=None):
+    """Serialize a page of users with a viewer-relative is_following flag
+    
+    Pass followed (from following_ids) when it was already resolved, e.g.
+    to compute an ETag. With a fields projection that leaves out
+    is_following, the follow lookup is skipped.
+    """
+    with_following = wants(fields, 'is_following')
+    if followed is None and with_following:
+        followed = following_ids(viewer_id, [user.id for user in users])
+    
+    users_data = []
+    for user in users:
+        user_data = user.to_dict(fields)
+        if with_following:
+            user_data['is_following'] = user.id in followed
+        users_data.append(user_data)
+    return users_data
+
+
+def liked_post_ids(viewer_id, post_ids):
+    """Get the subset of post_ids the viewer has liked, in one query"""
+    if not viewer_id or not post_ids:
+        return set()
+    
+    rows = db.session.query(Like.post_id)\
+        .filter(
+            Like.user_id == viewer_id,
+            Like.post_id.in_(set(post_ids))
+        ).all()
+    return {row[0] for row in rows}
+
+
+def resolve_viewer_state(posts, viewer_id, fields=None):
+    """Resolve liked_by_me and is_following_author for a page of posts
+    
+    Costs one query for likes and one for follows regardless of page size,
+    and none for a flag a fields projection leaves out.
+    """
+    state = {post.id: {} for post in posts}
+    
+    if wants(fields, 'liked_by_me'):
+        liked = liked_post_ids(viewer_id, [post.id for post in posts])
+        for post in posts:
+            state[post.id]['liked_by_me'] = post.id in liked
+    
+    if wants(fields, 'is_following_author'):
+        followed = following_ids(viewer_id, [post.user_id for post in posts])
+        for post in posts:
+            state[post.id]['is_following_author'] = post.user_id in followed
+    
+    return state
+
+
+def latest_comments(post_ids, limit):
+    """Get the newest limit comments of each post, authors loaded, in one query
+    
+    Returns a dict of post id to comments, newest first. Comments are
+    ranked with ROW_NUMBER() OVER (PARTITION BY post_id), so the cost
+    follows the page size rather than the number of comments per post.
+    """
+    if not post_ids or limit <= 0:
+        return {}
+    
+    rank = func.row_number().over(
+        partition_by=Comment.post_id,
+        order_by=(Comment.created_at.desc(), Comment.id.desc())
+    ).label('rank')
+    ranked = select(Comment.id, rank)\
+        .where(Comment.post_id.in_(set(post_ids)))\
+        .subquery()
+    
+    comments = Comment.query\
+        .join(ranked, ranked.c.id == Comment.id)\
+        .filter(ranked.c.rank <= limit)\
+        .options(joinedload(Comment.author))\
+        .order_by(Comment.post_id, ranked.c.rank)\
+        .all()
+    
+    previews = {post_id: [] for post_id in post_ids}
+    for comment in comments:
+        previews[comment.post_id].append(comment)
+    return previews
+
+
+def resolve_comment_previews(posts):
+    """Load the ?comments_preview=N newest comments of a page of posts
+    
+    Returns None when no preview was asked for.
+    """
+    limit = min(request.args.get('comments_preview', 0, type=int), MAX_COMMENTS_PREVIEW)
+    if limit <= 0:
+        return None
+    return latest_comments([post.id for post in posts], limit)
+
+
+def hydrate_posts(posts, viewer_id=None, viewer_state=None, fields=None, previews=None):
+    """Serialize a page of posts with the viewer's like and follow state
+    
+    With previews from resolve_comment_previews, each post also gets its
+    latest_comments.
+    """
+    if viewer_state is None:
+        viewer_state = resolve_viewer_state(posts, viewer_id, fields)
+    
+    posts_data = []
+    for post in posts:
+        post_data = post.to_dict(viewer_id, viewer_state[post.id], fields)
+        if previews is not None:
+            post_data['latest_comments'] = [comment.to_dict() for comment in previews.get(post.id, [])]
+        posts_data.append(post_data)
+    return posts_data
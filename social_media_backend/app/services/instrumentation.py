@@ -0,0 +1,221 @@
+import logging
+import re
+import time
+from collections import Counter
+from flask import g, has_request_context, jsonify, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.extensions import db
+from app.services.cache import profile_cache
+from app.services.db_pool import pool_stats
+from app.services.db_routing import recent_writers
+from app.services.follow_graph import follow_graph
+from app.services.likes import like_counts
+from app.services.outbox import outbox
+from app.services.metrics import BYTE_BUCKETS, CPU_BUCKETS, QUERY_COUNT_BUCKETS, registry
+from app.services.passwords import password_hasher
+from app.services.token_blocklist import token_blocklist
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_N_PLUS_ONE_THRESHOLD = 5
+
+request_duration = registry.histogram(
+    'http_request_duration_seconds', 'Request latency by route',
+    labels=('method', 'route', 'status')
+)
+request_queries = registry.histogram(
+    'db_queries_per_request', 'SQL statements executed per request',
+    labels=('method', 'route'), buckets=QUERY_COUNT_BUCKETS
+)
+request_db_time = registry.counter(
+    'db_query_seconds_total', 'Time spent executing SQL statements',
+    labels=('method', 'route')
+)
+n_plus_one = registry.counter(
+    'db_n_plus_one_total', 'Requests that repeated one SQL statement at least the N+1 threshold',
+    labels=('method', 'route')
+)
+response_bytes = registry.histogram(
+    'http_response_bytes', 'Response body size as sent, after compression',
+    labels=('method', 'route', 'encoding'), buckets=BYTE_BUCKETS
+)
+serialization_cpu = registry.histogram(
+    'http_serialization_cpu_seconds', 'CPU time spent encoding and compressing the response body',
+    labels=('method', 'route'), buckets=CPU_BUCKETS
+)
+budget_exceeded = registry.counter(
+    'db_query_budget_exceeded_total', 'Requests failed for exceeding SQL_QUERY_BUDGET',
+    labels=('method', 'route')
+)
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r'\((?:\s*\?\s*,)+\s*\?\s*\)')
+# psycopg2 %(name)s / sqlite ? / named :param placeholders
+_PARAM_RE = re.compile(r'%\(\w+\)s|%s|:\w+|\?')
+
+
+def fingerprint(statement):
+    """Normalize a statement so repeats with different parameters compare equal"""
+    statement = _WHITESPACE_RE.sub(' ', statement).strip()
+    statement = _PARAM_RE.sub('?', statement)
+    statement = _LITERAL_RE.sub('?', statement)
+    return _IN_LIST_RE.sub('(?)', statement)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class RequestQueries:
+    """SQL statements executed while handling one request"""
+    
+    def __init__(self, budget=0):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+        self.budget = budget
+        self.exceeded = False
+    
+    def check_budget(self, statement):
+        """Raise before running a statement past the budget"""
+        # Let a failed transaction roll back
+        if not self.budget or self.count < self.budget or statement.lstrip().upper().startswith('ROLLBACK'):
+            return
+        self.exceeded = True
+        raise QueryBudgetExceeded(f'SQL query budget exceeded: more than {self.budget} statements')
+    
+    def record(self, statement, duration):
+        self.count += 1
+        self.duration += duration
+        self.fingerprints[fingerprint(statement)] += 1
+    
+    def repeated(self, threshold):
+        return [(sql, count) for sql, count in self.fingerprints.most_common() if count >= threshold]
+
+
+def current_queries():
+    """Get the RequestQueries of the current request, if any"""
+    if not has_request_context():
+        return None
+    return g.get('sql_queries')
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    queries = current_queries()
+    if queries is not None:
+        queries.check_budget(statement)
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    pending = conn.info.get('query_started')
+    if not pending:
+        return
+    started = pending.pop()
+    queries = current_queries()
+    if queries is not None:
+        queries.record(statement, time.perf_counter() - started)
+
+
+def _route():
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+@registry.collector
+def service_gauges():
+    """Expose the statistics the services already keep"""
+    gauges = []
+    for name, cache in (('profile', profile_cache), ('sticky', recent_writers)):
+        stats = cache.stats()
+        for key in ('hits', 'misses', 'invalidations', 'size'):
+            gauges.append((f'cache_{key}', f'Cache {key} since start', {'cache': name}, stats[key]))
+    
+    for bind, engine in db.engines.items():
+        stats = pool_stats(engine)
+        labels = {'bind': bind or 'default'}
+        for key in ('size', 'checked_out', 'overflow', 'checkouts', 'timeouts', 'wait_total_seconds', 'wait_max_seconds'):
+            gauges.append((f'db_pool_{key}', f'Connection pool {key}', labels, stats.get(key)))
+    
+    like_stats = like_counts.stats()
+    gauges.append(('like_buffer_pending_posts', 'Posts with unflushed like count changes', None, like_stats['pending_posts']))
+    gauges.append(('like_buffer_flushes', 'Like count flushes since start', None, like_stats['flushes']))
+    
+    graph_stats = follow_graph.stats()
+    gauges.append(('follow_graph_edges', 'Follows in the in-process graph index', None, graph_stats['edges']))
+    gauges.append(('follow_graph_bytes', 'Memory held by the graph index arrays', None, graph_stats['bytes']))
+    gauges.append(('follow_graph_age_seconds', 'Seconds since the graph index was rebuilt', None, graph_stats['age_seconds']))
+    
+    outbox_stats = outbox.stats()
+    gauges.append(('outbox_pending', 'Outbox events waiting for their handlers', None, outbox_stats['pending']))
+    gauges.append(('outbox_dead', 'Outbox events given up on', None, outbox_stats['dead']))
+    gauges.append(('outbox_oldest_pending_seconds', 'Age of the oldest pending outbox event', None, outbox_stats['oldest_pending_seconds']))
+    gauges.append(('outbox_processed_last_minute', 'Outbox events processed by all workers in the last minute', None, outbox_stats['processed_last_minute']))
+    
+    hasher_stats = password_hasher.stats()
+    gauges.append(('password_hash_workers', 'Password hashing processes', None, hasher_stats['workers']))
+    gauges.append(('password_hash_rejected', 'Hashes rejected with 503 because the pool was full', None, hasher_stats['rejected']))
+    
+    for key, value in token_blocklist.stats().items():
+        gauges.append((f'token_blocklist_{key}', f'Token blocklist {key}', None, value))
+    return gauges
+
+
+def init_app(app):
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    
+    threshold = app.config.get('N_PLUS_ONE_THRESHOLD', DEFAULT_N_PLUS_ONE_THRESHOLD)
+    budget = app.config.get('SQL_QUERY_BUDGET', 0)
+    server_timing = app.config.get('SERVER_TIMING_ENABLED', True)
+    
+    @app.before_request
+    def start_request_instrumentation():
+        g.request_started = time.perf_counter()
+        g.sql_queries = RequestQueries(budget)
+    
+    @app.after_request
+    def finish_request_instrumentation(response):
+        queries = g.pop('sql_queries', None)
+        if queries is None:
+            return response
+        route, method = _route(), request.method
+    
+        repeated = queries.repeated(threshold)
+        if repeated:
+            n_plus_one.inc(method=method, route=route)
+            for sql, count in repeated:
+                logger.warning('Possible N+1 on %s %s: %d x %s', method, route, count, sql)
+    
+        # The statement past the budget raised, so whatever the view made of
+        # that is replaced, and nothing it wrote was committed
+        if queries.exceeded:
+            budget_exceeded.inc(method=method, route=route)
+            response = jsonify({
+                'error': f'SQL query budget exceeded: more than {budget} statements',
+                'repeated': [{'statement': sql, 'count': count} for sql, count in repeated]
+            })
+            response.status_code = 500
+    
+        elapsed = time.perf_counter() - g.pop('request_started')
+        request_duration.observe(elapsed, method=method, route=route, status=response.status_code)
+        request_queries.observe(queries.count, method=method, route=route)
+        request_db_time.inc(queries.duration, method=method, route=route)
+    
+        encode_cpu = g.pop('serialization_cpu', 0.0)
+        serialization_cpu.observe(encode_cpu, method=method, route=route)
+        if not response.direct_passthrough:
+            response_bytes.observe(
+                response.calculate_content_length() or 0,
+                method=method, route=route, encoding=response.headers.get('Content-Encoding', 'identity')
+            )
+    
+        if server_timing:
+            response.headers.add(
+                'Server-Timing',
+                f'db;dur={queries.duration * 1000:.1f};desc="{queries.count} queries", '
+                f'ser;dur={encode_cpu * 1000:.1f}, app;dur={elapsed * 1000:.1f}'
+            )
+        return response
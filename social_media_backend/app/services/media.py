@@ -0,0 +1,214 @@
+import hashlib
+import logging
+import os
+import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy.exc import IntegrityError
+from app.extensions import db
+from app.models.media import MediaFile
+from app.services.per_process import PerProcess
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+DEFAULT_VARIANT_WIDTHS = (320, 640, 1080)
+
+# Leading bytes of each accepted format; the client's Content-Type is ignored
+SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'png', 'image/png'),
+    (b'\xff\xd8\xff', 'jpg', 'image/jpeg'),
+    (b'GIF87a', 'gif', 'image/gif'),
+    (b'GIF89a', 'gif', 'image/gif'),
+)
+SNIFF_BYTES = max(len(signature) for signature, _, _ in SIGNATURES)
+CONTENT_TYPES = {extension: content_type for _, extension, content_type in SIGNATURES}
+# <sha256>.<ext> for originals, <sha256>_<width>.<ext> for variants
+FILENAME_RE = re.compile(r'^(?P<sha256>[0-9a-f]{64})(?:_(?P<width>\d{1,5}))?\.(?P<extension>[a-z]{3,4})$')
+
+
+class UnsupportedMedia(ValueError):
+    pass
+
+
+def sniff(head, allowed):
+    """Get (extension, content_type) of the file starting with head"""
+    for signature, extension, content_type in SIGNATURES:
+        if head.startswith(signature) and (extension in allowed or (extension == 'jpg' and 'jpeg' in allowed)):
+            return extension, content_type
+    raise UnsupportedMedia(f"Unsupported file type; allowed: {', '.join(sorted(allowed))}")
+
+
+def _make_variants(path, base, extension, widths):
+    """Write downscaled copies of an image; runs in a worker process
+    
+    Returns (width, height, [variant widths]). Pillow is optional: without
+    it the original is served alone.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return None, None, []
+    
+    created = []
+    with Image.open(path) as image:
+        width, height = image.size
+        targets = [target for target in sorted(widths, reverse=True) if target < width]
+        if targets:
+            # Lets the JPEG decoder skip most of the full-size decode
+            image.draft(image.mode, (targets[0], height * targets[0] // width))
+        variant = image
+        # Largest first, each one resized from the previous
+        for target in targets:
+            variant = variant.copy()
+            variant.thumbnail((target, height))
+            destination = f'{base}_{target}.{extension}'
+            with tempfile.NamedTemporaryFile(dir=os.path.dirname(destination), delete=False) as tmp:
+                variant.save(tmp, format=image.format)
+            os.replace(tmp.name, destination)
+            created.append(target)
+    return width, height, sorted(created)
+
+
+class MediaStore:
+    """Content-addressed media files on local disk
+    
+    Uploads are streamed to a temporary file in chunks while being hashed,
+    then renamed to ``<root>/<aa>/<bb>/<sha256>.<ext>``. A file that already
+    exists is not stored twice. Resized variants are produced by a pool of
+    ``workers`` processes, or inline when it is 0.
+    """
+    
+    def __init__(self):
+        self.root = None
+        self.chunk_size = DEFAULT_CHUNK_SIZE
+        self.widths = DEFAULT_VARIANT_WIDTHS
+        self.workers = 0
+        self.app = None
+        self._executor = PerProcess(lambda: ProcessPoolExecutor(max_workers=self.workers))
+    
+    def init_app(self, app):
+        self.app = app
+        self.root = app.config.get('MEDIA_ROOT') or os.path.join(app.instance_path, 'media')
+        self.chunk_size = app.config.get('MEDIA_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+        self.widths = tuple(app.config.get('MEDIA_VARIANT_WIDTHS', DEFAULT_VARIANT_WIDTHS))
+        self.workers = app.config.get('MEDIA_WORKERS', 0)
+    
+    def path(self, sha256, extension, width=None):
+        name = f'{sha256}_{width}.{extension}' if width else f'{sha256}.{extension}'
+        return os.path.join(self.root, sha256[:2], sha256[2:4], name)
+    
+    def save_stream(self, stream, user_id, allowed):
+        """Store an upload read from stream; returns (media, created)"""
+        tmp_dir = os.path.join(self.root, 'tmp')
+        os.makedirs(tmp_dir, exist_ok=True)
+    
+        digest = hashlib.sha256()
+        size = 0
+        head = b''
+        with tempfile.NamedTemporaryFile(dir=tmp_dir, delete=False) as tmp:
+            try:
+                while True:
+                    chunk = stream.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    if len(head) < SNIFF_BYTES:
+                        head += chunk[:SNIFF_BYTES]
+                    digest.update(chunk)
+                    tmp.write(chunk)
+                    size += len(chunk)
+            except BaseException:
+                tmp.close()
+                os.unlink(tmp.name)
+                raise
+    
+        try:
+            if not size:
+                raise UnsupportedMedia('Empty upload')
+            extension, content_type = sniff(head, allowed)
+            sha256 = digest.hexdigest()
+    
+            existing = MediaFile.query.filter_by(sha256=sha256).first()
+            if existing is not None:
+                return existing, False
+    
+            destination = self.path(sha256, extension)
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            # Same filesystem as tmp, so this is an atomic rename, not a copy
+            os.replace(tmp.name, destination)
+        finally:
+            if os.path.exists(tmp.name):
+                os.unlink(tmp.name)
+    
+        media = MediaFile(
+            sha256=sha256,
+            extension=extension,
+            content_type=content_type,
+            size=size,
+            uploaded_by=user_id
+        )
+        db.session.add(media)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # A concurrent upload of the same bytes won the insert
+            db.session.rollback()
+            return MediaFile.query.filter_by(sha256=sha256).one(), False
+    
+        self._process(media.id, sha256, extension)
+        return media, True
+    
+    def _process(self, media_id, sha256, extension):
+        path = self.path(sha256, extension)
+        args = (path, os.path.splitext(path)[0], extension, self.widths)
+        if not self.workers:
+            try:
+                result = _make_variants(*args)
+            except Exception:
+                logger.exception('Failed to resize media %s', media_id)
+                result = None
+            self._store_result(media_id, result)
+            return
+    
+        future = self._executor.get().submit(_make_variants, *args)
+        future.add_done_callback(lambda done: self._finished(media_id, done))
+    
+    def _finished(self, media_id, future):
+        # Runs on the pool's result thread, outside any request
+        try:
+            result = future.result()
+        except Exception:
+            logger.exception('Failed to resize media %s', media_id)
+            result = None
+        with self.app.app_context():
+            try:
+                self._store_result(media_id, result)
+            finally:
+                db.session.remove()
+    
+    def _store_result(self, media_id, result):
+        if result is None:
+            values = {'status': 'failed'}
+        else:
+            width, height, widths = result
+            values = {
+                'width': width,
+                'height': height,
+                'variants': ','.join(str(variant) for variant in widths),
+                'status': 'ready'
+            }
+        MediaFile.query.filter_by(id=media_id).update(values)
+        db.session.commit()
+    
+    def locate(self, filename):
+        """Get (path, content_type) of a stored file name, or None"""
+        match = FILENAME_RE.match(filename)
+        if match is None or match['extension'] not in CONTENT_TYPES:
+            return None
+        path = self.path(match['sha256'], match['extension'], match['width'])
+        if not os.path.isfile(path):
+            return None
+        return path, CONTENT_TYPES[match['extension']]
+
+
+media_store = MediaStore()
@@ -0,0 +1,220 @@
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import delete, insert, tuple_
+from app.extensions import db
+from app.models.comment import Comment
+from app.models.follow import Follow
+from app.models.like import Like
+from app.models.notification import Notification, NotificationActor
+from app.models.post import Post
+from app.models.user import User
+from app.services import counters
+from app.services.outbox import outbox
+from app.utils.sql import insert_ignore
+
+DEFAULT_BUCKET_SECONDS = 6 * 60 * 60
+BUCKET_EPOCH = datetime(1970, 1, 1)
+NOTIFICATION_KEY = ['user_id', 'kind', 'target_id', 'bucket']
+
+
+def bucket_seconds():
+    return current_app.config.get('NOTIFICATION_BUCKET_SECONDS', DEFAULT_BUCKET_SECONDS)
+
+
+def bucket_of(moment):
+    """Index of the time bucket activity at moment is grouped into"""
+    return int((moment - BUCKET_EPOCH).total_seconds()) // bucket_seconds()
+
+
+# Rows that make a user an actor of each kind of notification, as
+# (actor column, target column)
+SOURCES = {
+    'like': (Like.user_id, Like.post_id),
+    'comment': (Comment.user_id, Comment.post_id),
+    'follow': (Follow.follower_id, Follow.followed_id),
+}
+
+
+def _changes(kind, events):
+    """Get {(actor, target): time of its latest event} for one kind's events"""
+    latest = {}
+    for event in events:
+        payload = event.payload
+        if kind == 'follow':
+            actor, target = payload['follower_id'], payload['followed_id']
+        else:
+            actor, target = payload.get('user_id'), payload['post_id']
+        if actor is not None:
+            pair = (actor, target)
+            latest[pair] = max(latest.get(pair, event.created_at), event.created_at)
+    return latest
+
+
+def _recipients(kind, targets):
+    if kind == 'follow':
+        return {target: target for target in targets}
+    # Posts deleted since have nobody to notify
+    return dict(db.session.query(Post.id, Post.user_id).filter(Post.id.in_(targets)))
+
+
+def _current(kind, pairs):
+    """Get the (actor, target) pairs that still like, comment on or follow"""
+    actor, target = SOURCES[kind]
+    return set(
+        db.session.query(actor, target)
+        .filter(tuple_(actor, target).in_(pairs))
+        .distinct()
+    )
+
+
+def record(kind, events):
+    """Apply a batch of like, comment or follow events to the notifications
+    
+    Events only say which (actor, target) pairs changed; whether the actor
+    still likes, comments on or follows the target is read from those
+    tables, so an unlike or unfollow retracts the actor, and redelivered
+    or out-of-order events settle on the same result. All of a batch's
+    activity on one target within one time bucket lands on one row, and
+    notification_actors keeps each user from counting twice on it.
+    """
+    latest = _changes(kind, events)
+    if not latest:
+        return 0
+    recipients = _recipients(kind, {target for _, target in latest})
+    present = _current(kind, list(latest))
+    
+    added = {}
+    removed = []
+    for (actor, target), moment in latest.items():
+        recipient = recipients.get(target)
+        if recipient is None or recipient == actor:
+            continue
+        if (actor, target) in present:
+            key = (recipient, kind, target, bucket_of(moment))
+            added.setdefault(key, {})[actor] = moment
+        else:
+            removed.append((recipient, target, actor))
+    
+    unread = {}
+    _add_actors(added, unread)
+    _remove_actors(kind, removed, unread)
+    counters.increment_many(User, 'unread_notifications_count', unread)
+    return len(added) + len(removed)
+
+
+def _load(keys):
+    # Locks the rows so concurrent workers add actors one at a time
+    key = tuple_(Notification.user_id, Notification.kind, Notification.target_id, Notification.bucket)
+    return {
+        (notification.user_id, notification.kind, notification.target_id, notification.bucket): notification
+        for notification in Notification.query.filter(key.in_(keys)).with_for_update()
+    }
+
+
+def _add_actors(added, unread):
+    if not added:
+        return
+    notifications = _load(list(added))
+    
+    missing = [key for key in added if key not in notifications]
+    if missing:
+        stmt = insert_ignore(Notification, NOTIFICATION_KEY)
+        db.session.execute(stmt if stmt is not None else insert(Notification), [{
+            **dict(zip(NOTIFICATION_KEY, key)),
+            'actor_count': 0,
+            'created_at': min(added[key].values()),
+            'updated_at': min(added[key].values())
+        } for key in missing])
+        notifications.update(_load(missing))
+    
+    actor_ids = {actor for actors in added.values() for actor in actors}
+    known = set(
+        db.session.query(NotificationActor.notification_id, NotificationActor.actor_id)
+        .filter(
+            NotificationActor.notification_id.in_([notification.id for notification in notifications.values()]),
+            NotificationActor.actor_id.in_(actor_ids)
+        )
+    )
+    
+    rows = []
+    for key, actors in added.items():
+        notification = notifications[key]
+        fresh = sorted((moment, actor) for actor, moment in actors.items() if (notification.id, actor) not in known)
+        if not fresh:
+            continue
+        rows.extend({'notification_id': notification.id, 'actor_id': actor, 'created_at': moment} for moment, actor in fresh)
+        # A new row, or one read already, becomes unread
+        if notification.actor_count == 0 or notification.read_at is not None:
+            unread[notification.user_id] = unread.get(notification.user_id, 0) + 1
+        notification.actor_count += len(fresh)
+        notification.last_actor_id = fresh[-1][1]
+        notification.updated_at = max(notification.updated_at, fresh[-1][0])
+        notification.read_at = None
+    if rows:
+        db.session.execute(insert(NotificationActor), rows)
+    db.session.flush()
+
+
+def _remove_actors(kind, removed, unread):
+    if not removed:
+        return
+    rows = db.session.query(NotificationActor.id, NotificationActor.actor_id, Notification)\
+        .join(Notification, Notification.id == NotificationActor.notification_id)\
+        .filter(
+            Notification.kind == kind,
+            tuple_(Notification.user_id, Notification.target_id, NotificationActor.actor_id).in_(removed)
+        ).with_for_update()\
+        .all()
+    if not rows:
+        return
+    
+    retracted = {}
+    for _, actor_id, notification in rows:
+        retracted.setdefault(notification, set()).add(actor_id)
+    db.session.execute(delete(NotificationActor).where(NotificationActor.id.in_([row[0] for row in rows])))
+    
+    for notification, actors in retracted.items():
+        notification.actor_count -= len(actors)
+        if notification.actor_count <= 0:
+            if notification.read_at is None:
+                unread[notification.user_id] = unread.get(notification.user_id, 0) - 1
+            db.session.delete(notification)
+        elif notification.last_actor_id in actors:
+            notification.last_actor_id = db.session.query(NotificationActor.actor_id)\
+                .filter(NotificationActor.notification_id == notification.id)\
+                .order_by(NotificationActor.created_at.desc(), NotificationActor.id.desc())\
+                .limit(1)\
+                .scalar()
+    db.session.flush()
+
+
+@outbox.handler('post.liked', batch=True)
+@outbox.handler('post.unliked', batch=True)
+def notify_likes(events):
+    record('like', events)
+
+
+@outbox.handler('comment.created', batch=True)
+@outbox.handler('comment.deleted', batch=True)
+def notify_comments(events):
+    record('comment', events)
+
+
+@outbox.handler('follow.changed', batch=True)
+def notify_follows(events):
+    record('follow', events)
+
+
+def mark_read(user_id, notification_ids=None):
+    """Mark some or all of a user's notifications read; returns how many changed"""
+    query = Notification.query.filter(Notification.user_id == user_id, Notification.read_at.is_(None))
+    if notification_ids is not None:
+        query = query.filter(Notification.id.in_(notification_ids))
+    marked = query.update({'read_at': datetime.utcnow()}, synchronize_session=False)
+    if marked:
+        counters.increment(User, user_id, unread_notifications_count=-marked)
+    return marked
+
+
+def unread_count(user_id):
+    return db.session.query(User.unread_notifications_count).filter(User.id == user_id).scalar() or 0
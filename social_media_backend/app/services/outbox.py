@@ -0,0 +1,251 @@
+import logging
+import time
+from datetime import datetime, timedelta
+from flask import g, has_request_context
+from sqlalchemy import delete, func
+from app.extensions import db
+from app.models.outbox import OutboxDelivery, OutboxEvent
+from app.services.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_MAX_ATTEMPTS = 10
+DEFAULT_RETENTION = 24 * 60 * 60
+MAX_BACKOFF = 15 * 60
+PURGE_INTERVAL = 10 * 60
+THROUGHPUT_WINDOW = 60
+
+events_processed = registry.counter(
+    'outbox_events_processed_total', 'Outbox events whose handlers all succeeded',
+    labels=('topic',)
+)
+events_dead = registry.counter(
+    'outbox_events_dead_total', 'Outbox events given up on after too many attempts',
+    labels=('topic',)
+)
+handler_failures = registry.counter(
+    'outbox_handler_failures_total', 'Outbox handler runs that raised',
+    labels=('topic', 'handler')
+)
+handler_duration = registry.histogram(
+    'outbox_handler_duration_seconds', 'Time spent in each outbox handler',
+    labels=('topic', 'handler')
+)
+
+
+class Outbox:
+    """Transactional outbox for the side effects of domain changes
+    
+    emit() adds an event to the current session, so it is committed or
+    rolled back together with the change that caused it. A worker process
+    (``flask outbox-worker``) claims due events in batches and runs every
+    handler registered for the event's topic.
+    
+    Delivery is at least once. Each handler runs in a savepoint and its
+    writes are committed with an ``outbox_deliveries`` row, so a handler
+    that succeeded is not run again when another one fails; handlers must
+    still tolerate seeing an event twice, and must not commit themselves.
+    Failed events are retried with exponential backoff and marked dead
+    after ``max_attempts``.
+    
+    With ``inline`` set (development and tests) the events a request
+    emitted are dispatched right after it has been handled, in-process.
+    """
+    
+    def __init__(self):
+        self.batch_size = DEFAULT_BATCH_SIZE
+        self.max_attempts = DEFAULT_MAX_ATTEMPTS
+        self.retention = DEFAULT_RETENTION
+        self.inline = False
+        self._handlers = {}
+        self.dispatched = 0
+        self.failures = 0
+    
+    def init_app(self, app):
+        self.batch_size = app.config.get('OUTBOX_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+        self.max_attempts = app.config.get('OUTBOX_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS)
+        self.retention = app.config.get('OUTBOX_RETENTION', DEFAULT_RETENTION)
+        self.inline = app.config.get('OUTBOX_DISPATCH_INLINE', False)
+    
+        @app.after_request
+        def dispatch_inline(response):
+            if self.inline and g.pop('outbox_emitted', False):
+                try:
+                    self.drain()
+                except Exception:
+                    db.session.rollback()
+                    logger.exception('Failed to dispatch outbox events inline')
+            return response
+    
+    def handler(self, topic, name=None, batch=False):
+        """Register the decorated function as a handler of topic
+    
+        It is called with each event, or with batch=True once per claimed
+        batch with the list of that topic's events, so it can coalesce them.
+        """
+        def register(function):
+            self._handlers.setdefault(topic, []).append(
+                (name or f'{function.__module__}.{function.__name__}', function, batch)
+            )
+            return function
+        return register
+    
+    def emit(self, topic, **payload):
+        """Add an event to the current transaction"""
+        now = datetime.utcnow()
+        event = OutboxEvent(topic=topic, payload=payload, created_at=now, available_at=now)
+        db.session.add(event)
+        if has_request_context():
+            g.outbox_emitted = True
+        return event
+    
+    def dispatch(self, batch_size=None):
+        """Run the handlers of one batch of due events; returns how many were claimed"""
+        now = datetime.utcnow()
+        # Concurrent workers skip rows another one has locked (PostgreSQL)
+        events = OutboxEvent.query\
+            .filter(OutboxEvent.status == 'pending', OutboxEvent.available_at <= now)\
+            .order_by(OutboxEvent.id)\
+            .limit(batch_size or self.batch_size)\
+            .with_for_update(skip_locked=True)\
+            .all()
+        if not events:
+            db.session.rollback()
+            return 0
+    
+        delivered = set(
+            db.session.query(OutboxDelivery.event_id, OutboxDelivery.handler)
+            .filter(OutboxDelivery.event_id.in_([event.id for event in events]))
+        )
+        by_topic = {}
+        for event in events:
+            by_topic.setdefault(event.topic, []).append(event)
+        errors = {event.id: [] for event in events}
+        for topic, topic_events in by_topic.items():
+            for name, function, batch in self._handlers.get(topic, ()):
+                todo = [event for event in topic_events if (event.id, name) not in delivered]
+                for group in ([todo] if batch and todo else [[event] for event in todo]):
+                    error = self._run(topic, name, function, group if batch else group[0], group)
+                    if error is not None:
+                        for event in group:
+                            errors[event.id].append(f'{name}: {error}')
+        for event in events:
+            self._finish(event, errors[event.id], now)
+        db.session.commit()
+    
+        self.dispatched += len(events)
+        return len(events)
+    
+    def _run(self, topic, name, function, argument, events):
+        # The handler's writes and its delivery rows commit or roll back together
+        started = time.perf_counter()
+        try:
+            with db.session.begin_nested():
+                function(argument)
+                db.session.add_all([OutboxDelivery(event_id=event.id, handler=name) for event in events])
+        except Exception as e:
+            handler_failures.inc(topic=topic, handler=name)
+            logger.exception('Outbox handler %s failed on event(s) %s', name, [event.id for event in events])
+            return e
+        finally:
+            handler_duration.observe(time.perf_counter() - started, topic=topic, handler=name)
+        return None
+    
+    def _finish(self, event, errors, now):
+        if not errors:
+            event.status = 'done'
+            event.processed_at = now
+            events_processed.inc(topic=event.topic)
+            return
+    
+        self.failures += 1
+        event.attempts += 1
+        event.last_error = '\n'.join(errors)[:2000]
+        if event.attempts >= self.max_attempts:
+            event.status = 'dead'
+            events_dead.inc(topic=event.topic)
+            logger.error('Outbox event %s (%s) is dead after %d attempts', event.id, event.topic, event.attempts)
+        else:
+            event.available_at = now + timedelta(seconds=min(2 ** event.attempts, MAX_BACKOFF))
+    
+    def drain(self, batch_size=None):
+        """Dispatch until no event is due; returns how many were claimed"""
+        total = 0
+        while True:
+            claimed = self.dispatch(batch_size)
+            total += claimed
+            if not claimed:
+                return total
+    
+    def purge(self, retention=None):
+        """Delete events that were processed more than retention seconds ago"""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.retention if retention is None else retention)
+        expired = (OutboxEvent.status == 'done', OutboxEvent.processed_at < cutoff)
+        db.session.execute(
+            delete(OutboxDelivery).where(
+                OutboxDelivery.event_id.in_(db.session.query(OutboxEvent.id).filter(*expired))
+            )
+        )
+        purged = db.session.execute(delete(OutboxEvent).where(*expired)).rowcount
+        db.session.commit()
+        return purged
+    
+    def run(self, batch_size=None, interval=1.0, report=None, report_interval=60):
+        """Dispatch due events until interrupted, sleeping interval seconds when idle
+    
+        Every report_interval seconds report(message) is called with the
+        throughput and backlog since the previous report.
+        """
+        last_purge = last_report = time.monotonic()
+        reported = self.dispatched
+        while True:
+            try:
+                claimed = self.dispatch(batch_size)
+            except Exception:
+                db.session.rollback()
+                logger.exception('Failed to dispatch outbox events')
+                claimed = 0
+    
+            now = time.monotonic()
+            if now - last_purge >= PURGE_INTERVAL:
+                last_purge = now
+                try:
+                    self.purge()
+                except Exception:
+                    db.session.rollback()
+                    logger.exception('Failed to purge outbox events')
+            if report is not None and now - last_report >= report_interval:
+                stats = self.stats()
+                report(
+                    f'{self.dispatched - reported} event(s) in {now - last_report:.0f}s, '
+                    f"{stats['pending']} pending, {stats['dead']} dead"
+                )
+                last_report, reported = now, self.dispatched
+    
+            if not claimed:
+                time.sleep(interval)
+    
+    def stats(self):
+        """Backlog of the outbox table, shared by every process"""
+        now = datetime.utcnow()
+        rows = db.session.query(OutboxEvent.status, func.count(), func.min(OutboxEvent.created_at))\
+            .filter(OutboxEvent.status.in_(('pending', 'dead')))\
+            .group_by(OutboxEvent.status)\
+            .all()
+        by_status = {status: (count, oldest) for status, count, oldest in rows}
+        pending, oldest = by_status.get('pending', (0, None))
+        recent = db.session.query(func.count(OutboxEvent.id))\
+            .filter(OutboxEvent.processed_at >= now - timedelta(seconds=THROUGHPUT_WINDOW))\
+            .scalar()
+        return {
+            'pending': pending,
+            'dead': by_status.get('dead', (0, None))[0],
+            'oldest_pending_seconds': round((now - oldest).total_seconds(), 1) if oldest else 0,
+            'processed_last_minute': recent,
+            'dispatched': self.dispatched,
+            'failures': self.failures
+        }
+
+
+outbox = Outbox()
@@ -0,0 +1,93 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+import bcrypt
+from app.services.per_process import PerProcess
+
+DEFAULT_ROUNDS = 12
+DEFAULT_MAX_PENDING = 16
+DEFAULT_TIMEOUT = 10.0
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing pool is saturated and the caller should retry"""
+    pass
+
+
+def _hashpw(password, rounds):
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _checkpw(password, hashed):
+    return bcrypt.checkpw(password, hashed)
+
+
+class PasswordHasher:
+    """Runs bcrypt in a bounded process pool instead of request threads
+
+    At most ``max_pending`` hashes are queued or running at once; further
+    callers wait up to ``timeout`` seconds for a slot and then get
+    PasswordHasherBusy, so a login burst cannot occupy every worker thread.
+    Without a configured pool, hashing runs inline.
+    """
+    
+    def __init__(self, rounds=DEFAULT_ROUNDS):
+        self.rounds = rounds
+        self.workers = 0
+        self.max_pending = DEFAULT_MAX_PENDING
+        self.timeout = DEFAULT_TIMEOUT
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._executor = PerProcess(lambda: ProcessPoolExecutor(max_workers=self.workers))
+        self.rejected = 0
+    
+    def init_app(self, app):
+        self.rounds = app.config.get('BCRYPT_LOG_ROUNDS', DEFAULT_ROUNDS)
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS', 0)
+        self.max_pending = app.config.get('PASSWORD_HASH_MAX_PENDING', DEFAULT_MAX_PENDING)
+        self.timeout = app.config.get('PASSWORD_HASH_TIMEOUT', DEFAULT_TIMEOUT)
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+    
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        
+        if not self._slots.acquire(timeout=self.timeout):
+            self.rejected += 1
+            raise PasswordHasherBusy('Too many concurrent password checks, try again shortly')
+        try:
+            future = self._executor.get().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        # The slot is held until the hash finishes, even if the caller gives up
+        future.add_done_callback(lambda _: self._slots.release())
+        
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            self.rejected += 1
+            raise PasswordHasherBusy('Password check timed out, try again shortly')
+    
+    def hash(self, password):
+        return self._run(_hashpw, password.encode('utf-8'), self.rounds)
+    
+    def verify(self, password, hashed):
+        return self._run(_checkpw, password.encode('utf-8'), hashed.encode('utf-8'))
+    
+    def needs_rehash(self, hashed):
+        """Check if a hash was made with a different work factor"""
+        try:
+            return int(hashed.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+    
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'rounds': self.rounds,
+            'max_pending': self.max_pending,
+            'rejected': self.rejected
+        }
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,34 @@
+import os
+import threading
+
+
+class PerProcess:
+    """A lazily created object that each process gets its own copy of
+    
+    Threads and process pools do not survive a fork into pre-forked WSGI
+    workers, so get() calls factory() the first time it is used in a
+    process, and again if alive(value) says the previous one has stopped.
+    """
+    
+    def __init__(self, factory, alive=None):
+        self._factory = factory
+        self._alive = alive
+        self._lock = threading.Lock()
+        self._value = None
+        self._pid = None
+    
+    def get(self):
+        with self._lock:
+            if self._value is None or self._pid != os.getpid() or (self._alive is not None and not self._alive(self._value)):
+                self._value = self._factory()
+                self._pid = os.getpid()
+            return self._value
+
+
+def per_process_thread(target, name):
+    """Get a PerProcess that runs target in a daemon thread, restarted if it exits"""
+    def start():
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        return thread
+    return PerProcess(start, alive=threading.Thread.is_alive)
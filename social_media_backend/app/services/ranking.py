@@ -0,0 +1,84 @@
+import math
+from datetime import datetime
+from sqlalchemy import bindparam, event, select, update
+from app.extensions import db
+from app.models.post import Post
+from app.services.outbox import outbox
+
+# Scores are time-anchored instead of decayed: a post gains one point per
+# HOT_TIMESCALE seconds of age over HOT_EPOCH and one per tenfold
+# engagement, so older posts sink without ever being rewritten and a
+# score only changes when the post's own likes or comments do
+HOT_EPOCH = datetime(2024, 1, 1)
+HOT_TIMESCALE = 45000
+COMMENT_WEIGHT = 2
+REBUILD_BATCH_SIZE = 5000
+
+
+def hot_score(likes_count, comments_count, created_at):
+    """Rank of a post in the Explore feed; higher is hotter"""
+    engagement = max((likes_count or 0) + COMMENT_WEIGHT * (comments_count or 0), 1)
+    return math.log10(engagement) + (created_at - HOT_EPOCH).total_seconds() / HOT_TIMESCALE
+
+
+@event.listens_for(Post, 'before_insert')
+def _initial_hot_score(mapper, connection, post):
+    if post.created_at is None:
+        post.created_at = datetime.utcnow()
+    post.hot_score = hot_score(post.likes_count, post.comments_count, post.created_at)
+
+
+def refresh_hot_scores(post_ids):
+    """Recompute the stored score of posts whose counters just changed
+    
+    Runs in the caller's transaction and reads the counters it wrote, so
+    call it after the counter UPDATE and before the commit.
+    """
+    post_ids = sorted(set(post_ids))
+    if not post_ids:
+        return 0
+    
+    rows = db.session.execute(
+        select(Post.id, Post.likes_count, Post.comments_count, Post.created_at)
+        .where(Post.id.in_(post_ids))
+    ).all()
+    return _write_scores(rows)
+
+
+@outbox.handler('comment.created')
+@outbox.handler('comment.deleted')
+def refresh_commented_post(event):
+    """Rescore a post after its comment count changed"""
+    refresh_hot_scores([event.payload['post_id']])
+
+
+def _write_scores(rows):
+    if not rows:
+        return 0
+    posts = Post.__table__
+    stmt = update(posts)\
+        .where(posts.c.id == bindparam('post_id'))\
+        .values(hot_score=bindparam('score'), updated_at=posts.c.updated_at)
+    db.session.execute(stmt, [
+        {'post_id': post_id, 'score': hot_score(likes_count, comments_count, created_at)}
+        for post_id, likes_count, comments_count, created_at in rows
+    ])
+    return len(rows)
+
+
+def rebuild_hot_scores(batch_size=REBUILD_BATCH_SIZE):
+    """Recompute every post's score, committing per batch"""
+    updated = 0
+    last = 0
+    while True:
+        rows = db.session.execute(
+            select(Post.id, Post.likes_count, Post.comments_count, Post.created_at)
+            .where(Post.id > last)
+            .order_by(Post.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return updated
+        updated += _write_scores(rows)
+        db.session.commit()
+        last = rows[-1].id
@@ -0,0 +1,142 @@
+import time
+from array import array
+from collections import Counter
+from datetime import datetime
+from sqlalchemy import delete, insert
+from app.extensions import db
+from app.models.follow import Follow
+from app.models.suggestion import UserSuggestion
+
+DEFAULT_LIMIT = 50
+DEFAULT_MIN_MUTUALS = 1
+# Rows of A·A computed at once; bounds the size of the partial product
+DEFAULT_CHUNK_SIZE = 20000
+LOAD_CHUNK_SIZE = 100000
+
+
+def _load_edges():
+    followers = array('i')
+    followed = array('i')
+    rows = db.session.query(Follow.follower_id, Follow.followed_id)\
+        .order_by(Follow.follower_id, Follow.followed_id)\
+        .yield_per(LOAD_CHUNK_SIZE)
+    for follower_id, followed_id in rows:
+        followers.append(follower_id)
+        followed.append(followed_id)
+    return followers, followed
+
+
+def _top_candidates_sparse(followers, followed, limit, min_mutuals, chunk_size):
+    """Yield (user_id, [(candidate_id, mutuals)]) from sparse A·A, chunked by row"""
+    # Optional dependencies, only needed by the offline job
+    import numpy as np
+    from scipy import sparse
+    
+    rows = np.frombuffer(followers, dtype=np.int32)
+    cols = np.frombuffer(followed, dtype=np.int32)
+    size = int(max(rows.max(), cols.max())) + 1
+    adjacency = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.int32), (rows, cols)), shape=(size, size)
+    )
+    
+    for start in range(0, size, chunk_size):
+        block = adjacency[start:start + chunk_size]
+        # (A·A)[u, v] counts the accounts u follows that follow v
+        paths = (block @ adjacency).tocsr()
+        # Drop accounts u already follows, and u itself
+        paths = (paths - paths.multiply(block)).tocoo()
+        keep = (paths.row + start != paths.col) & (paths.data >= min_mutuals)
+        paths = sparse.csr_matrix(
+            (paths.data[keep], (paths.row[keep], paths.col[keep])), shape=paths.shape
+        )
+    
+        for offset in range(paths.shape[0]):
+            lo, hi = paths.indptr[offset], paths.indptr[offset + 1]
+            if lo == hi:
+                continue
+            scores = paths.data[lo:hi]
+            candidates = paths.indices[lo:hi]
+            if len(scores) > limit:
+                # Keep everything tied with the limit-th score, then cut
+                # after sorting so ties break the same way every run
+                cutoff = -np.partition(-scores, limit - 1)[limit - 1]
+                best = scores >= cutoff
+                scores, candidates = scores[best], candidates[best]
+            # Highest score first, then highest id, as the endpoint orders them
+            order = np.lexsort((-candidates, -scores))[:limit]
+            yield start + offset, [(int(candidates[i]), int(scores[i])) for i in order]
+
+
+def _top_candidates_python(followers, followed, limit, min_mutuals):
+    """Same result as the sparse version, for small graphs without scipy"""
+    following = {}
+    for follower_id, followed_id in zip(followers, followed):
+        following.setdefault(follower_id, set()).add(followed_id)
+    
+    for user_id, direct in following.items():
+        scores = Counter()
+        for middle in direct:
+            scores.update(following.get(middle, ()))
+        for excluded in direct | {user_id}:
+            scores.pop(excluded, None)
+        ranked = sorted(
+            ((candidate, score) for candidate, score in scores.items() if score >= min_mutuals),
+            key=lambda item: (-item[1], -item[0])
+        )
+        if ranked:
+            yield user_id, ranked[:limit]
+
+
+def compute_suggestions(limit=DEFAULT_LIMIT, min_mutuals=DEFAULT_MIN_MUTUALS,
+                        chunk_size=DEFAULT_CHUNK_SIZE, engine='auto'):
+    """Recompute friend-of-friend suggestions for every user
+    
+    Candidates are the accounts followed by the accounts a user follows,
+    scored by how many of them lead there, minus the accounts the user
+    already follows. With numpy and scipy installed (engine 'auto' or
+    'sparse') this is one sparse matrix product per chunk of users;
+    otherwise a pure Python count is used. The table is replaced in a
+    single transaction, so readers see either the old or the new set.
+    """
+    started = time.monotonic()
+    followers, followed = _load_edges()
+    stats = {'edges': len(followers), 'users': 0, 'suggestions': 0}
+    
+    if engine == 'auto':
+        try:
+            import scipy  # noqa: F401
+            engine = 'sparse'
+        except ImportError:
+            engine = 'python'
+    
+    if not followers:
+        candidates = iter(())
+    elif engine == 'sparse':
+        candidates = _top_candidates_sparse(followers, followed, limit, min_mutuals, chunk_size)
+    else:
+        candidates = _top_candidates_python(followers, followed, limit, min_mutuals)
+    
+    computed_at = datetime.utcnow()
+    db.session.execute(delete(UserSuggestion))
+    batch = []
+    for user_id, ranked in candidates:
+        stats['users'] += 1
+        batch.extend({
+            'user_id': user_id,
+            'suggested_user_id': candidate_id,
+            'score': score,
+            'computed_at': computed_at
+        } for candidate_id, score in ranked)
+        if len(batch) >= LOAD_CHUNK_SIZE:
+            db.session.execute(insert(UserSuggestion), batch)
+            stats['suggestions'] += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(UserSuggestion), batch)
+        stats['suggestions'] += len(batch)
+    db.session.commit()
+    
+    stats['engine'] = engine
+    stats['seconds'] = round(time.monotonic() - started, 2)
+    return stats
+
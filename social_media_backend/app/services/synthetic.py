@@ -0,0 +1,234 @@
+import random
+from array import array
+from datetime import datetime, timedelta
+from itertools import accumulate
+from flask import current_app
+from sqlalchemy import func, insert, select, union_all
+from app.extensions import db
+from app.models.comment import Comment
+from app.models.follow import Follow
+from app.models.like import Like
+from app.models.post import Post
+from app.models.timeline import TimelineEntry
+from app.models.user import User
+from app.services import counters, ranking
+from app.services.passwords import password_hasher
+from app.services.timeline import DEFAULT_FANOUT_THRESHOLD, TIMELINE_COLUMNS
+
+DEFAULT_PASSWORD = 'password123'
+DEFAULT_BATCH_SIZE = 5000
+
+# Approximate total row counts: 10k, 100k, 1M and 10M
+SCALES = {
+    'small': {'users': 200, 'avg_follows': 10, 'posts_per_user': 3},
+    'medium': {'users': 2000, 'avg_follows': 10, 'posts_per_user': 3},
+    'large': {'users': 20000, 'avg_follows': 10, 'posts_per_user': 3},
+    'xlarge': {'users': 200000, 'avg_follows': 10, 'posts_per_user': 3},
+}
+
+WORDS = (
+    'today', 'coffee', 'sunset', 'weekend', 'friends', 'city', 'music', 'new',
+    'finally', 'best', 'trip', 'morning', 'game', 'food', 'view', 'work',
+    'love', 'this', 'again', 'home', 'summer', 'night', 'photo', 'dog',
+)
+
+
+class SyntheticGraph:
+    """Generates a social graph with production-like skew
+    
+    Followers per user follow a Zipf law with exponent ``alpha`` over a
+    random popularity ranking, so a few accounts have most of the followers
+    and most have almost none. Following counts and posts per user are
+    heavy-tailed around their averages. A ``viral_fraction`` of posts gets
+    ``viral_boost`` times the usual likes and comments. Rows are written with
+    bulk INSERTs of ``batch_size`` rows, committed per batch.
+    """
+    
+    def __init__(self, users, avg_follows=10, posts_per_user=3, likes_per_post=5,
+                 comments_per_post=1, alpha=1.1, viral_fraction=0.01, viral_boost=100,
+                 hashtags=200, days=30, password=DEFAULT_PASSWORD,
+                 batch_size=DEFAULT_BATCH_SIZE, seed=None):
+        self.users = users
+        self.avg_follows = avg_follows
+        self.posts_per_user = posts_per_user
+        self.likes_per_post = likes_per_post
+        self.comments_per_post = comments_per_post
+        self.alpha = alpha
+        self.viral_fraction = viral_fraction
+        self.viral_boost = viral_boost
+        self.hashtags = [f'tag{i}' for i in range(hashtags)]
+        self.days = days
+        self.password = password
+        self.batch_size = batch_size
+        self.rng = random.Random(seed)
+        self.now = datetime.utcnow()
+        self.counts = {}
+    
+    def _insert(self, model, rows):
+        if rows:
+            db.session.execute(insert(model), rows)
+            db.session.commit()
+            self.counts[model.__tablename__] = self.counts.get(model.__tablename__, 0) + len(rows)
+    
+    def _batched(self, model, rows):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                self._insert(model, batch)
+                batch = []
+        self._insert(model, batch)
+    
+    def _timestamp(self, after=None):
+        start = after or self.now - timedelta(days=self.days)
+        return start + (self.now - start) * self.rng.random()
+    
+    def _heavy_tailed(self, mean):
+        # Pareto with shape 2 has mean 2, so scale it to the requested mean
+        return int(self.rng.paretovariate(2.0) * mean / 2.0)
+    
+    def _content(self):
+        words = self.rng.choices(WORDS, k=self.rng.randint(3, 12))
+        # Tags are Zipf-distributed too, so a few of them trend
+        for _ in range(self.rng.randint(0, 3)):
+            words.append('#' + self.hashtags[min(int(self.rng.paretovariate(1.2)) - 1, len(self.hashtags) - 1)])
+        return ' '.join(words)
+    
+    def _new_ids(self, model, after_id):
+        ids = array('i')
+        last = after_id
+        while True:
+            rows = db.session.execute(
+                select(model.id).where(model.id > last).order_by(model.id).limit(self.batch_size)
+            ).scalars().all()
+            if not rows:
+                return ids
+            ids.extend(rows)
+            last = rows[-1]
+    
+    def _max_id(self, model):
+        return db.session.query(func.max(model.id)).scalar() or 0
+    
+    def seed_users(self):
+        first_id = self._max_id(User)
+        # One hash for every account; hashing per row would dominate the run
+        password_hash = password_hasher.hash(self.password)
+        self._batched(User, ({
+            'username': f'user{first_id + i}',
+            'email': f'user{first_id + i}@example.com',
+            'password_hash': password_hash,
+            'bio': '',
+            'created_at': self._timestamp(),
+        } for i in range(1, self.users + 1)))
+        return self._new_ids(User, first_id)
+    
+    def seed_follows(self, user_ids):
+        ranked = list(user_ids)
+        self.rng.shuffle(ranked)
+        cum_weights = list(accumulate((rank + 1) ** -self.alpha for rank in range(len(ranked))))
+    
+        def rows():
+            for follower in user_ids:
+                wanted = min(self._heavy_tailed(self.avg_follows), len(ranked) - 1)
+                followed = set()
+                # Popular accounts are drawn repeatedly; give up on the
+                # remainder after a few rounds instead of looping forever
+                for _ in range(4):
+                    if len(followed) >= wanted:
+                        break
+                    followed.update(self.rng.choices(ranked, cum_weights=cum_weights, k=wanted - len(followed)))
+                    followed.discard(follower)
+                for followed_id in followed:
+                    yield {'follower_id': follower, 'followed_id': followed_id, 'created_at': self._timestamp()}
+    
+        self._batched(Follow, rows())
+    
+    def seed_posts(self, user_ids):
+        first_id = self._max_id(Post)
+    
+        def rows():
+            for author in user_ids:
+                for _ in range(self._heavy_tailed(self.posts_per_user)):
+                    created_at = self._timestamp()
+                    yield {
+                        'content': self._content(),
+                        'user_id': author,
+                        'created_at': created_at,
+                        'updated_at': created_at,
+                    }
+    
+        self._batched(Post, rows())
+        return first_id
+    
+    def seed_engagement(self, user_ids, first_post_id):
+        likes = []
+        comments = []
+        last = first_post_id
+        while True:
+            posts = db.session.execute(
+                select(Post.id, Post.created_at).where(Post.id > last).order_by(Post.id).limit(self.batch_size)
+            ).all()
+            if not posts:
+                break
+            last = posts[-1].id
+    
+            for post_id, created_at in posts:
+                boost = self.viral_boost if self.rng.random() < self.viral_fraction else 1
+                like_count = min(self._heavy_tailed(self.likes_per_post * boost), len(user_ids))
+                for index in self.rng.sample(range(len(user_ids)), like_count):
+                    likes.append({'user_id': user_ids[index], 'post_id': post_id, 'created_at': self._timestamp(created_at)})
+    
+                for _ in range(self._heavy_tailed(self.comments_per_post * boost)):
+                    commented_at = self._timestamp(created_at)
+                    comments.append({
+                        'content': ' '.join(self.rng.choices(WORDS, k=self.rng.randint(1, 8))),
+                        'user_id': self.rng.choice(user_ids),
+                        'post_id': post_id,
+                        'created_at': commented_at,
+                        'updated_at': commented_at,
+                    })
+    
+            if len(likes) >= self.batch_size:
+                self._batched(Like, likes)
+                likes = []
+            if len(comments) >= self.batch_size:
+                self._batched(Comment, comments)
+                comments = []
+    
+        self._batched(Like, likes)
+        self._batched(Comment, comments)
+    
+    def build_timelines(self, user_ids):
+        """Materialize timelines for the new users with set-based INSERTs"""
+        threshold = current_app.config.get('TIMELINE_FANOUT_THRESHOLD', DEFAULT_FANOUT_THRESHOLD)
+        first_id, last_id = user_ids[0], user_ids[-1]
+    
+        own = select(Post.user_id, Post.id, Post.user_id, Post.created_at)\
+            .where(Post.user_id.between(first_id, last_id))
+        followed = select(Follow.follower_id, Post.id, Post.user_id, Post.created_at)\
+            .join(Post, Post.user_id == Follow.followed_id)\
+            .join(User, User.id == Follow.followed_id)\
+            .where(
+                Follow.follower_id.between(first_id, last_id),
+                Follow.follower_id != Follow.followed_id,
+                User.follower_count <= threshold
+            )
+        result = db.session.execute(
+            insert(TimelineEntry).from_select(TIMELINE_COLUMNS, union_all(own, followed))
+        )
+        db.session.commit()
+        self.counts[TimelineEntry.__tablename__] = result.rowcount
+    
+    def run(self, timelines=True):
+        user_ids = self.seed_users()
+        if not user_ids:
+            return self.counts
+        self.seed_follows(user_ids)
+        first_post_id = self.seed_posts(user_ids)
+        self.seed_engagement(user_ids, first_post_id)
+        # Denormalized counters first: timelines need follower_count
+        counters.reconcile_counters()
+        ranking.rebuild_hot_scores(self.batch_size)
+        if timelines:
+            self.build_timelines(user_ids)
+        return self.counts
@@ -0,0 +1,209 @@
+from flask import current_app
+from sqlalchemy import delete, exists, insert, literal, select, union
+from sqlalchemy.orm import joinedload
+from app.extensions import db
+from app.models.follow import Follow
+from app.models.post import Post
+from app.models.timeline import TimelineEntry
+from app.models.user import User
+from app.services.outbox import outbox
+from app.utils.pagination import keyset_paginate
+from app.utils.sql import insert_ignore
+
+# Authors with more followers than this are merged into feeds on read
+# instead of being fanned out to every follower on write
+DEFAULT_FANOUT_THRESHOLD = 10000
+DEFAULT_BACKFILL_LIMIT = 200
+
+TIMELINE_COLUMNS = ['user_id', 'post_id', 'author_id', 'created_at']
+
+
+def fanout_threshold():
+    return current_app.config.get('TIMELINE_FANOUT_THRESHOLD', DEFAULT_FANOUT_THRESHOLD)
+
+
+def backfill_limit():
+    return current_app.config.get('TIMELINE_BACKFILL_LIMIT', DEFAULT_BACKFILL_LIMIT)
+
+
+def is_celebrity(user_id):
+    """Check if posts by this user skip fan-out"""
+    followers = db.session.query(User.follower_count)\
+        .filter(User.id == user_id)\
+        .scalar()
+    return (followers or 0) > fanout_threshold()
+
+
+def followed_celebrity_ids(user_id):
+    """Get ids of followed authors whose posts are merged on read"""
+    rows = db.session.query(Follow.followed_id)\
+        .join(User, User.id == Follow.followed_id)\
+        .filter(
+            Follow.follower_id == user_id,
+            User.follower_count > fanout_threshold()
+        ).all()
+    return [row[0] for row in rows]
+
+
+def _insert_entries(rows):
+    """INSERT ... SELECT timeline rows, skipping entries that already exist"""
+    stmt = insert_ignore(TimelineEntry, ['user_id', 'post_id'])
+    if stmt is None:
+        rows = rows.subquery()
+        user_id, post_id = list(rows.c)[:2]
+        rows = select(rows).where(~exists().where(
+            TimelineEntry.user_id == user_id,
+            TimelineEntry.post_id == post_id
+        ))
+        stmt = insert(TimelineEntry)
+    db.session.execute(stmt.from_select(TIMELINE_COLUMNS, rows))
+
+
+def add_own_post(post):
+    """Write a new post into its author's timeline"""
+    db.session.add(TimelineEntry(
+        user_id=post.user_id,
+        post_id=post.id,
+        author_id=post.user_id,
+        created_at=post.created_at
+    ))
+
+
+def fan_out_post(post):
+    """Write a post into its author's and followers' timelines
+    
+    Entries that are already there are skipped, so this can be repeated.
+    """
+    def rows(reader_id):
+        return select(reader_id, literal(post.id), literal(post.user_id), literal(post.created_at))
+    
+    _insert_entries(rows(User.id).where(User.id == post.user_id))
+    if is_celebrity(post.user_id):
+        return
+    _insert_entries(rows(Follow.follower_id).where(Follow.followed_id == post.user_id))
+
+
+def remove_post(post_id):
+    """Drop a deleted post from every timeline"""
+    db.session.execute(
+        delete(TimelineEntry).where(TimelineEntry.post_id == post_id)
+    )
+
+
+def backfill_follow(follower_id, followed_id):
+    """Copy a newly followed user's recent posts into the follower's timeline"""
+    if is_celebrity(followed_id):
+        return
+    
+    recent = select(
+        literal(follower_id),
+        Post.id,
+        Post.user_id,
+        Post.created_at
+    ).where(Post.user_id == followed_id)\
+     .order_by(Post.created_at.desc())\
+     .limit(backfill_limit())
+    
+    _insert_entries(recent)
+
+
+def purge_follow(follower_id, followed_id):
+    """Remove an unfollowed user's posts from the follower's timeline"""
+    db.session.execute(
+        delete(TimelineEntry).where(
+            TimelineEntry.user_id == follower_id,
+            TimelineEntry.author_id == followed_id
+        )
+    )
+
+
+@outbox.handler('post.created')
+def fan_out_created_post(event):
+    post = db.session.get(Post, event.payload['post_id'])
+    # Deleted before its fan-out ran
+    if post is not None:
+        fan_out_post(post)
+
+
+@outbox.handler('follow.changed')
+def sync_follow(event):
+    """Backfill or purge the follower's timeline to match the follow as it is now
+    
+    Reading the current state rather than trusting the event keeps a
+    follow and unfollow handled out of order from leaving stale entries.
+    """
+    follower_id, followed_id = event.payload['follower_id'], event.payload['followed_id']
+    following = db.session.query(
+        exists().where(Follow.follower_id == follower_id, Follow.followed_id == followed_id)
+    ).scalar()
+    if following:
+        backfill_follow(follower_id, followed_id)
+    else:
+        purge_follow(follower_id, followed_id)
+
+
+def timeline_query(user_id):
+    """Build a subquery of (post_id, created_at) rows for a home timeline"""
+    materialized = select(
+        TimelineEntry.post_id.label('post_id'),
+        TimelineEntry.created_at.label('created_at')
+    ).where(TimelineEntry.user_id == user_id)
+    
+    celebrity_ids = followed_celebrity_ids(user_id)
+    if not celebrity_ids:
+        return materialized.subquery()
+    
+    # UNION rather than UNION ALL also hides posts that were fanned out
+    # before their author crossed the threshold
+    merged = select(
+        Post.id.label('post_id'),
+        Post.created_at.label('created_at')
+    ).where(Post.user_id.in_(celebrity_ids))
+    return union(materialized, merged).subquery()
+
+
+def read_timeline(user_id, default_per_page=10):
+    """Get one page of a home timeline as (posts, page)"""
+    entries = timeline_query(user_id)
+    
+    page = keyset_paginate(
+        db.session.query(entries.c.post_id, entries.c.created_at),
+        [entries.c.created_at, entries.c.post_id],
+        default_per_page=default_per_page
+    )
+    
+    post_ids = [row.post_id for row in page.items]
+    if not post_ids:
+        return [], page
+    
+    posts_by_id = {
+        post.id: post
+        for post in Post.query.options(joinedload(Post.author)).filter(Post.id.in_(post_ids))
+    }
+    posts = [posts_by_id[post_id] for post_id in post_ids if post_id in posts_by_id]
+    return posts, page
+
+
+def rebuild_timeline(user_id):
+    """Recompute a user's materialized timeline from the follow graph"""
+    db.session.execute(
+        delete(TimelineEntry).where(TimelineEntry.user_id == user_id)
+    )
+    
+    followed_ids = select(Follow.followed_id).where(Follow.follower_id == user_id)
+    authors = Post.user_id.in_(followed_ids)
+    
+    celebrity_ids = followed_celebrity_ids(user_id)
+    if celebrity_ids:
+        authors = authors & Post.user_id.notin_(celebrity_ids)
+    
+    recent = select(
+        literal(user_id),
+        Post.id,
+        Post.user_id,
+        Post.created_at
+    ).where((Post.user_id == user_id) | authors)\
+     .order_by(Post.created_at.desc())\
+     .limit(backfill_limit())
+    
+    db.session.execute(insert(TimelineEntry).from_select(TIMELINE_COLUMNS, recent))
@@ -0,0 +1,225 @@
+import hashlib
+import math
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from flask import current_app
+from flask_jwt_extended import create_access_token, create_refresh_token
+from flask_jwt_extended.default_callbacks import default_revoked_token_callback
+from sqlalchemy import delete, event
+from app.extensions import db, jwt
+from app.models.revoked_token import RevokedToken
+from app.services.cache import MemoryBackend
+from app.utils.sql import insert_ignore
+
+DEFAULT_CAPACITY = 100000
+DEFAULT_ERROR_RATE = 0.001
+DEFAULT_SYNC_INTERVAL = 5.0
+DEFAULT_CACHE_SIZE = 10000
+# Claim naming the login a token descends from, kept across refreshes
+FAMILY_CLAIM = 'fam'
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings using double hashing"""
+    
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+    
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+    
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+    
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class TokenBlocklist:
+    """Revoked JWT ids persisted in revoked_tokens behind a Bloom filter
+
+    Every jwt_required request checks its jti here. A Bloom filter of all
+    unexpired revoked jtis answers "not revoked" without touching the
+    database; only filter hits (real revocations or rare false positives)
+    are confirmed with a query, and those answers are cached. New rows from
+    other workers are folded in every ``sync_interval`` seconds.
+    
+    Tokens from one login share a family id (the ``fam`` claim). Using a
+    refresh token a second time means it was copied, so the whole family is
+    revoked by a row whose jti is the family id.
+    """
+    
+    def __init__(self):
+        self.capacity = DEFAULT_CAPACITY
+        self.error_rate = DEFAULT_ERROR_RATE
+        self.sync_interval = DEFAULT_SYNC_INTERVAL
+        self._lock = threading.Lock()
+        self._bloom = None
+        self._last_id = 0
+        self._synced_at = 0.0
+        self._confirmed = MemoryBackend(DEFAULT_CACHE_SIZE)
+        self.stats_counters = {'checks': 0, 'bloom_negatives': 0, 'cache_hits': 0, 'db_lookups': 0}
+    
+    def init_app(self, app):
+        self.capacity = app.config.get('TOKEN_BLOCKLIST_CAPACITY', DEFAULT_CAPACITY)
+        self.error_rate = app.config.get('TOKEN_BLOCKLIST_ERROR_RATE', DEFAULT_ERROR_RATE)
+        self.sync_interval = app.config.get('TOKEN_BLOCKLIST_SYNC_INTERVAL', DEFAULT_SYNC_INTERVAL)
+        jwt.token_in_blocklist_loader(self._check_token)
+        jwt.revoked_token_loader(self._revoked_token)
+        if not event.contains(db.session, 'after_commit', self._after_commit):
+            event.listen(db.session, 'after_commit', self._after_commit)
+            event.listen(db.session, 'after_rollback', self._after_rollback)
+    
+    def _after_commit(self, session):
+        # Only revocations that reached the database are trusted in memory,
+        # so every worker and every restart agrees with this one
+        jtis = session.info.pop('revoked_jtis', None)
+        if not jtis:
+            return
+        with self._lock:
+            if self._bloom is not None:
+                for jti in jtis:
+                    self._bloom.add(jti)
+        for jti in jtis:
+            self._confirmed.set(jti, True, 3600)
+    
+    def _after_rollback(self, session):
+        session.info.pop('revoked_jtis', None)
+    
+    def _check_token(self, jwt_header, jwt_payload):
+        family = jwt_payload.get(FAMILY_CLAIM)
+        return self.is_revoked(jwt_payload['jti']) or (family is not None and self.is_revoked(family))
+    
+    def _revoked_token(self, jwt_header, jwt_payload):
+        # A rotated refresh token presented again: end its whole family
+        if jwt_payload.get('type') == 'refresh':
+            try:
+                if self.revoke_family(jwt_payload.get(FAMILY_CLAIM), int(jwt_payload['sub'])):
+                    db.session.commit()
+            except Exception:
+                db.session.rollback()
+        return default_revoked_token_callback(jwt_header, jwt_payload)
+    
+    def _rebuild(self):
+        bloom = BloomFilter(self.capacity, self.error_rate)
+        last_id = 0
+        rows = db.session.query(RevokedToken.id, RevokedToken.jti)\
+            .filter(RevokedToken.expires_at > datetime.utcnow())
+        for row_id, jti in rows:
+            bloom.add(jti)
+            last_id = max(last_id, row_id)
+        self._bloom = bloom
+        self._last_id = last_id
+    
+    def _sync(self):
+        # Fold in revocations made by other workers since the last sync
+        with self._lock:
+            if self._bloom is not None and time.monotonic() - self._synced_at < self.sync_interval:
+                return
+            self._synced_at = time.monotonic()
+            
+            if self._bloom is None or self._bloom.count > self.capacity:
+                self._rebuild()
+                return
+            
+            rows = db.session.query(RevokedToken.id, RevokedToken.jti)\
+                .filter(RevokedToken.id > self._last_id)\
+                .order_by(RevokedToken.id)
+            for row_id, jti in rows:
+                self._bloom.add(jti)
+                self._last_id = row_id
+    
+    def _count(self, name):
+        with self._lock:
+            self.stats_counters[name] += 1
+    
+    def is_revoked(self, jti):
+        self._sync()
+        self._count('checks')
+        
+        if jti not in self._bloom:
+            self._count('bloom_negatives')
+            return False
+        
+        cached = self._confirmed.get(jti)
+        if cached is not None:
+            self._count('cache_hits')
+            return cached
+        
+        self._count('db_lookups')
+        revoked = db.session.query(RevokedToken.id).filter_by(jti=jti).first() is not None
+        # Negative answers can go stale if another worker revokes the jti
+        self._confirmed.set(jti, revoked, 3600 if revoked else self.sync_interval)
+        return revoked
+    
+    def revoke(self, jti, token_type, user_id, expires_at):
+        """Persist a revocation; the caller commits the session
+        
+        The in-memory filter and cache learn about it once the commit succeeds.
+        Returns False if the jti was already revoked, by this or a concurrent
+        request, so single-use tokens can tell they lost a race.
+        """
+        values = {
+            'jti': jti,
+            'token_type': token_type,
+            'user_id': user_id,
+            'expires_at': expires_at,
+            'revoked_at': datetime.utcnow()
+        }
+        stmt = insert_ignore(RevokedToken, ['jti'])
+        if stmt is not None:
+            added = db.session.execute(stmt.values(**values)).rowcount > 0
+        elif RevokedToken.query.filter_by(jti=jti).first() is None:
+            db.session.add(RevokedToken(**values))
+            db.session.flush()
+            added = True
+        else:
+            added = False
+        db.session.info.setdefault('revoked_jtis', []).append(jti)
+        return added
+    
+    def revoke_family(self, family, user_id):
+        """Revoke every token issued with this family id; the caller commits"""
+        if family is None:
+            return False
+        expires_at = datetime.utcnow() + current_app.config.get('JWT_REFRESH_TOKEN_EXPIRES', timedelta(days=30))
+        return self.revoke(family, 'family', user_id, expires_at)
+    
+    def create_tokens(self, user_id, family=None):
+        """Issue an access and refresh token pair, in a new family unless given one"""
+        claims = {FAMILY_CLAIM: family or str(uuid.uuid4())}
+        return (
+            create_access_token(identity=str(user_id), additional_claims=claims),
+            create_refresh_token(identity=str(user_id), additional_claims=claims)
+        )
+    
+    def purge_expired(self):
+        """Delete revocations of tokens that have expired anyway"""
+        result = db.session.execute(
+            delete(RevokedToken).where(RevokedToken.expires_at <= datetime.utcnow())
+        )
+        db.session.commit()
+        with self._lock:
+            self._bloom = None
+        return result.rowcount
+    
+    def stats(self):
+        with self._lock:
+            stats = dict(self.stats_counters)
+        stats['bloom_entries'] = self._bloom.count if self._bloom is not None else 0
+        stats['bloom_bits'] = self._bloom.size if self._bloom is not None else 0
+        return stats
+
+
+token_blocklist = TokenBlocklist()
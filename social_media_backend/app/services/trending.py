@@ -0,0 +1,188 @@
+import heapq
+import math
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from app.extensions import db
+from app.models.outbox import OutboxEvent
+from app.services.outbox import outbox
+
+HASHTAG_RE = re.compile(r'(?<![\w#])#(\w{1,100})')
+
+DEFAULT_CAPACITY = 1000
+DEFAULT_HALF_LIFE = 6 * 60 * 60
+DEFAULT_SYNC_INTERVAL = 10
+DEFAULT_SETTLE_SECONDS = 2
+SYNC_CHUNK_SIZE = 1000
+HASHTAGS_TOPIC = 'hashtags.used'
+EPOCH = datetime(1970, 1, 1)
+
+
+def extract_hashtags(text):
+    """Get the distinct, lower-cased hashtags in a piece of text"""
+    if not text:
+        return set()
+    return {tag.lower() for tag in HASHTAG_RE.findall(text)}
+
+
+class DecayedSpaceSaving:
+    """Space-saving heavy hitters over exponentially time-decayed counts
+
+    Keeps at most ``capacity`` counters, so memory is bounded no matter how
+    many distinct tags are seen. Counts decay with ``half_life`` seconds,
+    which makes the top list a sliding view of recent activity. Weights
+    grow forward from a landmark time instead of decaying every counter,
+    so each update is O(log capacity).
+    """
+    
+    def __init__(self, capacity=DEFAULT_CAPACITY, half_life=DEFAULT_HALF_LIFE):
+        self.capacity = capacity
+        self.half_life = half_life
+        self._lock = threading.Lock()
+        self._landmark = time.time()
+        self._counters = {}
+        self._heap = []
+    
+    @property
+    def _rate(self):
+        return math.log(2) / self.half_life
+    
+    def _rescale(self, now):
+        # Move the landmark forward before the forward weights overflow
+        factor = math.exp(-self._rate * (now - self._landmark))
+        for counter in self._counters.values():
+            counter[0] *= factor
+            counter[1] *= factor
+        self._landmark = now
+        self._rebuild_heap()
+    
+    def _rebuild_heap(self):
+        self._heap = [(counter[0], key) for key, counter in self._counters.items()]
+        heapq.heapify(self._heap)
+    
+    def _pop_min(self):
+        # Heap entries go stale when a counter grows; skip those lazily
+        while self._heap:
+            score, key = heapq.heappop(self._heap)
+            counter = self._counters.get(key)
+            if counter is not None and counter[0] == score:
+                return key, counter
+        return None, None
+    
+    def add(self, key, timestamp=None, count=1):
+        now = timestamp if timestamp is not None else time.time()
+        with self._lock:
+            if self._rate * (now - self._landmark) > 50:
+                self._rescale(now)
+            weight = count * math.exp(self._rate * (now - self._landmark))
+            
+            counter = self._counters.get(key)
+            if counter is not None:
+                counter[0] += weight
+            elif len(self._counters) < self.capacity:
+                counter = self._counters[key] = [weight, 0.0]
+            else:
+                # Replace the smallest counter, inheriting its count as error
+                evicted_key, evicted = self._pop_min()
+                del self._counters[evicted_key]
+                counter = self._counters[key] = [evicted[0] + weight, evicted[0]]
+            
+            heapq.heappush(self._heap, (counter[0], key))
+            if len(self._heap) > 4 * self.capacity:
+                self._rebuild_heap()
+    
+    def top(self, n, now=None):
+        """Get the n heaviest keys as (key, decayed count, max overestimate)"""
+        now = now if now is not None else time.time()
+        with self._lock:
+            factor = math.exp(-self._rate * (now - self._landmark))
+            heaviest = heapq.nlargest(n, self._counters.items(), key=lambda item: item[1][0])
+            return [(key, counter[0] * factor, counter[1] * factor) for key, counter in heaviest]
+    
+    def clear(self):
+        with self._lock:
+            self._landmark = time.time()
+            self._counters = {}
+            self._heap = []
+
+
+trending_tags = DecayedSpaceSaving()
+_sync_lock = threading.Lock()
+# Last hashtag event folded into this process's counters (None before the
+# first sync) and when that sync ran
+_last_event_id = None
+_synced_at = 0.0
+_sync_interval = DEFAULT_SYNC_INTERVAL
+_settle_seconds = DEFAULT_SETTLE_SECONDS
+
+
+def init_app(app):
+    global _last_event_id, _sync_interval, _settle_seconds
+    _last_event_id = None
+    trending_tags.clear()
+    trending_tags.capacity = app.config.get('TRENDING_CAPACITY', DEFAULT_CAPACITY)
+    trending_tags.half_life = app.config.get('TRENDING_HALF_LIFE', DEFAULT_HALF_LIFE)
+    _sync_interval = app.config.get('TRENDING_SYNC_INTERVAL', DEFAULT_SYNC_INTERVAL)
+    _settle_seconds = app.config.get('TRENDING_SETTLE_SECONDS', DEFAULT_SETTLE_SECONDS)
+
+
+def record_tags(tags):
+    """Add hashtags used by a new or edited post to the current transaction
+    
+    They are written to the outbox table with the post, and every worker
+    counts them from there, so each sees the posts made on all of them.
+    """
+    if tags:
+        outbox.emit(HASHTAGS_TOPIC, tags=sorted(tags))
+
+
+def record_post(post):
+    record_tags(extract_hashtags(post.content))
+
+
+def sync():
+    """Fold hashtag events committed since the last sync into the counters
+    
+    The first sync replays the events of the last four half-lives that the
+    outbox still keeps (OUTBOX_RETENTION). Events younger than the settle
+    time are left for the next sync, since one with a lower id may not have
+    committed yet.
+    """
+    global _last_event_id, _synced_at
+    with _sync_lock:
+        if _last_event_id is not None and time.monotonic() - _synced_at < _sync_interval:
+            return
+        _synced_at = time.monotonic()
+    
+        now = datetime.utcnow()
+        query = db.session.query(OutboxEvent.id, OutboxEvent.payload, OutboxEvent.created_at)\
+            .filter(
+                OutboxEvent.topic == HASHTAGS_TOPIC,
+                OutboxEvent.created_at <= now - timedelta(seconds=_settle_seconds)
+            )
+        if _last_event_id is None:
+            _last_event_id = 0
+            query = query.filter(OutboxEvent.created_at >= now - timedelta(seconds=4 * trending_tags.half_life))
+        else:
+            query = query.filter(OutboxEvent.id > _last_event_id)
+    
+        for event_id, payload, created_at in query.order_by(OutboxEvent.id).yield_per(SYNC_CHUNK_SIZE):
+            timestamp = (created_at - EPOCH).total_seconds()
+            for tag in payload.get('tags', ()):
+                trending_tags.add(tag, timestamp)
+            _last_event_id = event_id
+
+
+def top_hashtags(limit=10):
+    """Get the trending tags with their decayed score, and the least it can be
+    
+    Scores are use counts decayed by age, not post counts; min_score leaves
+    out what a tag may have inherited from the counter it evicted.
+    """
+    sync()
+    return [{
+        'tag': tag,
+        'score': round(score, 2),
+        'min_score': round(max(score - error, 0), 2)
+    } for tag, score, error in trending_tags.top(limit)]
@@ -0,0 +1,150 @@
+import threading
+import time
+from bisect import bisect_left
+from flask import current_app
+from sqlalchemy import case, func, select
+from app.extensions import db
+from app.models.user import User
+
+DEFAULT_LIMIT = 20
+# Cap on candidates ranked per query so one-letter searches stay cheap
+MAX_CANDIDATES = 1000
+
+
+def _escape_like(text):
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class NGramIndex:
+    """In-process trigram index over usernames for databases without pg_trgm
+
+    Substring queries intersect the posting sets of the query's trigrams and
+    prefix queries shorter than three characters bisect a sorted name list.
+    """
+    
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._built_at = None
+        self._names = {}
+        self._postings = {}
+        self._sorted = []
+    
+    def _build(self):
+        names = {user_id: username.lower() for user_id, username in db.session.query(User.id, User.username)}
+        postings = {}
+        for user_id, name in names.items():
+            for gram in _trigrams(name):
+                postings.setdefault(gram, set()).add(user_id)
+        
+        self._names = names
+        self._postings = postings
+        self._sorted = sorted((name, user_id) for user_id, name in names.items())
+        self._built_at = time.monotonic()
+    
+    def _ensure_built(self):
+        if self._built_at is None or time.monotonic() - self._built_at > self.ttl:
+            self._build()
+    
+    def _discard(self, user_id):
+        name = self._names.pop(user_id, None)
+        if name is None:
+            return
+        for gram in _trigrams(name):
+            ids = self._postings.get(gram)
+            if ids is not None:
+                ids.discard(user_id)
+        position = bisect_left(self._sorted, (name, user_id))
+        if position < len(self._sorted) and self._sorted[position] == (name, user_id):
+            del self._sorted[position]
+    
+    def add(self, user_id, username):
+        """Index a new user or a changed username"""
+        with self._lock:
+            if self._built_at is None:
+                return
+            self._discard(user_id)
+            
+            name = username.lower()
+            self._names[user_id] = name
+            for gram in _trigrams(name):
+                self._postings.setdefault(gram, set()).add(user_id)
+            position = bisect_left(self._sorted, (name, user_id))
+            self._sorted.insert(position, (name, user_id))
+    
+    def remove(self, user_id):
+        with self._lock:
+            self._discard(user_id)
+    
+    def candidates(self, query):
+        """Get ids of users whose username contains the query"""
+        with self._lock:
+            self._ensure_built()
+            
+            if len(query) < 3:
+                matches = []
+                position = bisect_left(self._sorted, (query,))
+                while position < len(self._sorted) and len(matches) < MAX_CANDIDATES:
+                    name, user_id = self._sorted[position]
+                    if not name.startswith(query):
+                        break
+                    matches.append(user_id)
+                    position += 1
+                return matches
+            
+            postings = sorted((self._postings.get(gram, set()) for gram in _trigrams(query)), key=len)
+            ids = set.intersection(*postings) if postings else set()
+            matches = [user_id for user_id in ids if query in self._names[user_id]]
+            return matches[:MAX_CANDIDATES]
+
+
+ngram_index = NGramIndex()
+
+
+def _ranking(query):
+    """Order prefix hits first, then by follower count"""
+    prefix = case((func.lower(User.username).like(f'{_escape_like(query)}%', escape='\\'), 0), else_=1)
+    return [prefix, User.follower_count.desc(), User.username.asc()]
+
+
+def search_users(query, limit=DEFAULT_LIMIT):
+    """Search users by username, ranked prefix-first then by follower count
+
+    Queries containing '@' are treated as an exact email lookup so they hit
+    the unique email index instead of scanning.
+    """
+    if '@' in query:
+        return User.query.filter(User.email == query.strip()).limit(limit).all()
+    
+    query = query.strip().lower()
+    if not query:
+        return []
+    
+    if db.session.get_bind().dialect.name == 'postgresql':
+        if len(query) < 3:
+            # Too short for trigrams: a range scan of ix_users_username_prefix,
+            # capped like the in-process index so one letter stays cheap
+            candidates = select(User.id)\
+                .where(func.lower(User.username).like(f'{_escape_like(query)}%', escape='\\'))\
+                .limit(MAX_CANDIDATES)
+            matches = User.id.in_(candidates)
+        else:
+            matches = func.lower(User.username).like(f'%{_escape_like(query)}%', escape='\\')
+        return User.query.filter(matches)\
+            .order_by(*_ranking(query))\
+            .limit(limit)\
+            .all()
+    
+    ngram_index.ttl = current_app.config.get('USER_SEARCH_INDEX_TTL', ngram_index.ttl)
+    user_ids = ngram_index.candidates(query)
+    if not user_ids:
+        return []
+    
+    return User.query.filter(User.id.in_(user_ids))\
+        .order_by(*_ranking(query))\
+        .limit(limit)\
+        .all()
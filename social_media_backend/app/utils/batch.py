@@ -0,0 +1,40 @@
+from flask import current_app, request
+
+DEFAULT_BATCH_LOOKUP_MAX = 100
+
+
+class InvalidIds(ValueError):
+    pass
+
+
+def parse_ids(arg='ids'):
+    """Read ids from ?ids=1,2,3 (or repeated ?ids=), deduplicated in order"""
+    limit = current_app.config.get('BATCH_LOOKUP_MAX', DEFAULT_BATCH_LOOKUP_MAX)
+    
+    ids = []
+    seen = set()
+    for value in request.args.getlist(arg):
+        for part in value.split(','):
+            part = part.strip()
+            if not part:
+                continue
+            if not part.isdigit():
+                raise InvalidIds(f'Invalid id: {part}')
+            item_id = int(part)
+            if item_id not in seen:
+                seen.add(item_id)
+                ids.append(item_id)
+    
+    if not ids:
+        raise InvalidIds(f'Query parameter {arg} is required')
+    if len(ids) > limit:
+        raise InvalidIds(f'At most {limit} ids per request')
+    return ids
+
+
+def order_by_ids(items, ids):
+    """Arrange items in the requested id order and list the ids not found"""
+    by_id = {item.id: item for item in items}
+    found = [by_id[item_id] for item_id in ids if item_id in by_id]
+    missing = [item_id for item_id in ids if item_id not in by_id]
+    return found, missing
@@ -0,0 +1,28 @@
+from flask import request
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+def requested_fields(model, arg='fields'):
+    """Read a ?fields=a,b projection for model's serialized fields
+
+    Returns None when every field is wanted, otherwise a sorted tuple (so
+    it can be part of an ETag) that always includes the id.
+    """
+    value = request.args.get(arg)
+    if not value:
+        return None
+    
+    allowed = set(model.SERIALIZERS) | set(getattr(model, 'VIEWER_FIELDS', ()))
+    fields = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = fields - allowed
+    if unknown:
+        raise InvalidFields(f'Unknown field(s): {", ".join(sorted(unknown))}')
+    return tuple(sorted(fields | {'id'}))
+
+
+def wants(fields, name):
+    """Check if a projection from requested_fields includes name"""
+    return fields is None or name in fields
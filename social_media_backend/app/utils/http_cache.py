@@ -0,0 +1,65 @@
+import hashlib
+from flask import current_app, request
+
+
+def make_etag(*parts):
+    """Hash the parts that determine a representation into an ETag value"""
+    return hashlib.blake2b(repr(parts).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def user_version(user):
+    # Counter updates leave updated_at alone, so the counters are listed too
+    return (user.id, user.updated_at, user.post_count, user.follower_count, user.following_count)
+
+
+def post_version(post):
+    author = post.author
+    return (
+        post.id, post.updated_at, post.likes_count, post.comments_count,
+        author.id if author else None, author.updated_at if author else None
+    )
+
+
+def comment_version(comment):
+    return (comment.id, comment.updated_at, comment.author.id, comment.author.updated_at)
+
+
+def previews_version(previews):
+    """Version of the comment previews of a page, None when not requested"""
+    if previews is None:
+        return None
+    return sorted((post_id, [comment_version(comment) for comment in comments]) for post_id, comments in previews.items())
+
+
+def last_modified(*times):
+    """Latest of the given timestamps, ignoring missing ones"""
+    times = [value for value in times if value is not None]
+    return max(times) if times else None
+
+
+def not_modified(etag, weak=False, modified=None):
+    """Get a 304 response when If-None-Match already names this ETag
+    
+    Call it once the row versions and viewer state are known but before any
+    serialization. If-Modified-Since alone is not honored: counters change
+    without touching updated_at, and a deleted row does not move a list's
+    latest timestamp, so only the ETag reliably identifies a representation.
+    """
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    return with_validators(current_app.response_class(status=304), etag, weak, modified)
+
+
+def with_validators(response, etag, weak=False, modified=None):
+    """Attach ETag/Last-Modified and require revalidation on every use
+    
+    Representations depend on the viewer, so they are private to the
+    Authorization header they were produced for. Strong ETags are used for
+    single resources and weak ones for pages of a list.
+    """
+    response.set_etag(etag, weak=weak)
+    if modified is not None:
+        response.last_modified = modified
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.vary.add('Authorization')
+    return response
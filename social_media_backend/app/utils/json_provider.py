@@ -0,0 +1,82 @@
+import time
+from flask import g, has_request_context
+from flask.json.provider import DefaultJSONProvider
+
+
+def record_serialization_cpu(seconds):
+    """Add CPU time spent encoding the current response"""
+    if has_request_context():
+        g.serialization_cpu = g.get('serialization_cpu', 0.0) + seconds
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, recording encoding CPU time per request"""
+    
+    def response(self, *args, **kwargs):
+        started = time.thread_time()
+        response = super().response(*args, **kwargs)
+        record_serialization_cpu(time.thread_time() - started)
+        return response
+
+
+class OrjsonProvider(TimedJSONProvider):
+    """JSON provider backed by orjson, several times faster on large pages
+    
+    Output matches the default provider: same key sorting and the same
+    fallback encoding for dates, decimals and other non-JSON types.
+    """
+    
+    def __init__(self, app):
+        super().__init__(app)
+        # Optional dependency, only needed when JSON_PROVIDER selects it
+        import orjson
+        self._orjson = orjson
+    
+    def _options(self, indent=False):
+        options = self._orjson.OPT_NON_STR_KEYS | self._orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            options |= self._orjson.OPT_SORT_KEYS
+        if indent:
+            options |= self._orjson.OPT_INDENT_2
+        return options
+    
+    def dumps(self, obj, **kwargs):
+        return self._orjson.dumps(obj, default=self.default, option=self._options('indent' in kwargs)).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return self._orjson.loads(s)
+    
+    @staticmethod
+    def _response_obj(args, kwargs):
+        # Same rules as jsonify(): one argument as is, several as a list,
+        # keyword arguments as a dict
+        if args and kwargs:
+            raise TypeError('app.json.response() takes either args or kwargs, not both')
+        if not args and not kwargs:
+            return None
+        if len(args) == 1:
+            return args[0]
+        return list(args) if args else kwargs
+    
+    def response(self, *args, **kwargs):
+        started = time.thread_time()
+        obj = self._response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = self._orjson.dumps(obj, default=self.default, option=self._options(indent) | self._orjson.OPT_APPEND_NEWLINE)
+        response = self._app.response_class(body, mimetype=self.mimetype)
+        record_serialization_cpu(time.thread_time() - started)
+        return response
+
+
+def init_app(app):
+    """Install the JSON provider picked by JSON_PROVIDER (auto, orjson or default)"""
+    choice = app.config.get('JSON_PROVIDER', 'auto')
+    provider_class = TimedJSONProvider
+    if choice in ('auto', 'orjson'):
+        try:
+            import orjson  # noqa: F401
+            provider_class = OrjsonProvider
+        except ImportError:
+            if choice == 'orjson':
+                raise
+    app.json = provider_class(app)
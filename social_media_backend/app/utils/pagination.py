@@ -0,0 +1,116 @@
+import base64
+import json
+import math
+from datetime import datetime
+from flask import request
+from sqlalchemy import tuple_
+
+MAX_PER_PAGE = 100
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values):
+    """Encode sort key values into an opaque cursor string"""
+    raw = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(raw, separators=(',', ':')).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, keys):
+    """Decode a cursor string back into values typed like the key columns"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, UnicodeError):
+        raise InvalidCursor('Invalid cursor')
+
+    if not isinstance(raw, list) or len(raw) != len(keys):
+        raise InvalidCursor('Invalid cursor')
+
+    values = []
+    for key, value in zip(keys, raw):
+        try:
+            python_type = key.type.python_type
+        except NotImplementedError:
+            python_type = None
+
+        try:
+            if python_type is datetime:
+                value = datetime.fromisoformat(value)
+            elif python_type in (int, float):
+                value = python_type(value)
+        except (TypeError, ValueError):
+            raise InvalidCursor('Invalid cursor')
+        values.append(value)
+    return values
+
+
+class Page:
+    """One page of results plus the metadata list endpoints return"""
+
+    def __init__(self, items, per_page, next_cursor=None, total=None, page=None):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.total = total
+        self.page = page
+
+    @property
+    def has_more(self):
+        return self.next_cursor is not None
+
+    def meta(self):
+        data = {
+            'per_page': self.per_page,
+            'next_cursor': self.next_cursor,
+            'has_more': self.has_more
+        }
+        if self.total is not None:
+            data['total'] = self.total
+            data['pages'] = math.ceil(self.total / self.per_page) if self.per_page else 0
+        if self.page is not None:
+            data['current_page'] = self.page
+        return data
+
+
+def keyset_paginate(query, keys, default_per_page=10, descending=True, count=True):
+    """Paginate a query by page number or by an opaque keyset cursor
+
+    ``keys`` are the ORDER BY columns, most significant first, and must end in
+    a unique column. Requests with a ``cursor`` argument seek past the cursor
+    instead of using OFFSET; ``include_total=false`` skips the COUNT query.
+    With ``count=False`` the COUNT is skipped unless ``include_total=true``
+    is asked for, for queries over whole tables.
+    """
+    per_page = request.args.get('per_page', default_per_page, type=int)
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+    default_total = 'true' if count else 'false'
+    include_total = request.args.get('include_total', default_total).lower() not in ('false', '0', 'no')
+    cursor = request.args.get('cursor')
+
+    total = query.order_by(None).count() if include_total else None
+
+    ordered = query.order_by(*[key.desc() if descending else key.asc() for key in keys])
+
+    page = None
+    if cursor:
+        values = decode_cursor(cursor, keys)
+        if descending:
+            ordered = ordered.filter(tuple_(*keys) < tuple_(*values))
+        else:
+            ordered = ordered.filter(tuple_(*keys) > tuple_(*values))
+    elif 'cursor' not in request.args:
+        page = max(request.args.get('page', 1, type=int), 1)
+        ordered = ordered.offset((page - 1) * per_page)
+
+    rows = ordered.limit(per_page + 1).all()
+    items = rows[:per_page]
+
+    next_cursor = None
+    if len(rows) > per_page:
+        last = items[-1]
+        next_cursor = encode_cursor([getattr(last, key.key) for key in keys])
+
+    return Page(items, per_page, next_cursor=next_cursor, total=total, page=page)
@@ -0,0 +1,33 @@
+from sqlalchemy.dialects import postgresql, sqlite
+from app.extensions import db
+
+
+def insert_ignore(model, index_elements):
+    """Build INSERT ... ON CONFLICT DO NOTHING for the current database
+    
+    Returns None on databases without ON CONFLICT support so callers can fall
+    back to a select-then-insert.
+    """
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        return postgresql.insert(model).on_conflict_do_nothing(index_elements=index_elements)
+    if dialect == 'sqlite':
+        return sqlite.insert(model).on_conflict_do_nothing(index_elements=index_elements)
+    return None
+
+
+def upsert(model, index_elements, update):
+    """Build INSERT ... ON CONFLICT DO UPDATE for the current database
+    
+    update(excluded) returns the SET values for rows that already exist,
+    with excluded standing for the row that was proposed. Returns None on
+    databases without ON CONFLICT support.
+    """
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        stmt = postgresql.insert(model)
+    elif dialect == 'sqlite':
+        stmt = sqlite.insert(model)
+    else:
+        return None
+    return stmt.on_conflict_do_update(index_elements=index_elements, set_=update(stmt.excluded))
@@ -0,0 +1,144 @@
+"""Mixed login/feed load benchmark for password hashing offload
+
+Runs login clients and feed clients against one in-process app and reports
+logins/sec and feed latency percentiles. Compare inline hashing with the
+process pool:
+
+    python benchmarks/bench_auth.py --hash-workers 0
+    python benchmarks/bench_auth.py --hash-workers 2 --max-pending 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import insert
+from app import create_app
+from app.extensions import db
+from app.models.follow import Follow
+from app.models.post import Post
+from app.models.user import User
+from app.services import timeline
+from app.services.passwords import password_hasher
+
+PASSWORD = 'benchmark-password'
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def build_app(args, db_path):
+    return create_app('testing', {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}',
+        'BCRYPT_LOG_ROUNDS': args.rounds,
+        'PASSWORD_HASH_WORKERS': args.hash_workers,
+        'PASSWORD_HASH_MAX_PENDING': args.max_pending
+    })
+
+
+def seed(app, users, posts_per_user):
+    with app.app_context():
+        db.create_all()
+        password_hash = password_hasher.hash(PASSWORD)
+        db.session.execute(insert(User), [{
+            'username': f'bench{i}',
+            'email': f'bench{i}@example.com',
+            'password_hash': password_hash
+        } for i in range(users)])
+        db.session.commit()
+        
+        user_ids = [row[0] for row in db.session.query(User.id).order_by(User.id)]
+        db.session.execute(insert(Follow), [{
+            'follower_id': follower,
+            'followed_id': user_ids[(index + offset) % len(user_ids)]
+        } for index, follower in enumerate(user_ids) for offset in range(1, min(10, len(user_ids)))])
+        
+        for user_id in user_ids:
+            for n in range(posts_per_user):
+                post = Post(content=f'post {n} by {user_id}', user_id=user_id)
+                db.session.add(post)
+                db.session.flush()
+                timeline.fan_out_post(post)
+        db.session.commit()
+        
+        tokens = [create_access_token(identity=str(user_id)) for user_id in user_ids]
+    return tokens
+
+
+def run(args):
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    app = build_app(args, db_path)
+    tokens = seed(app, args.users, args.posts)
+    
+    results = {'login': [], 'login_busy': 0, 'login_errors': 0, 'feed': []}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+    
+    def login_client(index):
+        client = app.test_client()
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            response = client.post('/auth/login', json={
+                'username': f'bench{index % args.users}',
+                'password': PASSWORD
+            })
+            elapsed = time.perf_counter() - started
+            with lock:
+                if response.status_code == 200:
+                    results['login'].append(elapsed)
+                elif response.status_code == 503:
+                    results['login_busy'] += 1
+                else:
+                    results['login_errors'] += 1
+    
+    def feed_client(index):
+        client = app.test_client()
+        headers = {'Authorization': f'Bearer {tokens[index % len(tokens)]}'}
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            client.get('/posts/?include_total=false', headers=headers)
+            elapsed = time.perf_counter() - started
+            with lock:
+                results['feed'].append(elapsed)
+    
+    threads = [threading.Thread(target=login_client, args=(i,)) for i in range(args.login_clients)]
+    threads += [threading.Thread(target=feed_client, args=(i,)) for i in range(args.feed_clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    feed = results['feed']
+    print(f'hash workers      : {args.hash_workers or "inline"} (rounds={args.rounds}, max_pending={args.max_pending})')
+    print(f'logins/sec        : {len(results["login"]) / args.duration:.1f}')
+    print(f'logins rejected   : {results["login_busy"]} (503), errors: {results["login_errors"]}')
+    print(f'login p50/p99 (ms): {percentile(results["login"], 50) * 1000:.1f} / {percentile(results["login"], 99) * 1000:.1f}')
+    print(f'feed req/sec      : {len(feed) / args.duration:.1f}')
+    print(f'feed p50/p95/p99  : {percentile(feed, 50) * 1000:.1f} / {percentile(feed, 95) * 1000:.1f} / {percentile(feed, 99) * 1000:.1f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--login-clients', type=int, default=8)
+    parser.add_argument('--feed-clients', type=int, default=4)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--posts', type=int, default=5)
+    parser.add_argument('--rounds', type=int, default=12)
+    parser.add_argument('--hash-workers', type=int, default=2)
+    parser.add_argument('--max-pending', type=int, default=4)
+    run(parser.parse_args())
+
+
+if __name__ == '__main__':
+    main()
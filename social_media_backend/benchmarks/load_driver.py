@@ -0,0 +1,394 @@
+"""Load driver for every blueprint route with a production-like request mix
+
+Runs concurrent clients against one in-process app and reports throughput,
+p50/p95/p99 latency and SQL statements per request for each route. Without
+--database-url a temporary SQLite database is seeded with the synthetic
+graph generator (see `flask seed-graph`):
+
+    python benchmarks/load_driver.py --scale small --duration 20
+    python benchmarks/load_driver.py --database-url postgresql:///social_bench --no-seed
+
+Save a run with --output and gate a later one on it with --baseline; the
+driver exits non-zero when a route's p95 latency or SQL statements per
+request regress by more than --max-regression:
+
+    python benchmarks/load_driver.py --output baseline.json
+    python benchmarks/load_driver.py --baseline baseline.json
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_jwt_extended import create_access_token, create_refresh_token
+from sqlalchemy import event, select
+from app import create_app
+from app.extensions import db
+from app.models.post import Post
+from app.models.user import User
+from app.services.synthetic import DEFAULT_PASSWORD, SCALES, SyntheticGraph
+
+# Relative weight of each operation, roughly what a read-heavy feed app sees
+MIX = {
+    'GET /posts/': 30,
+    'GET /posts/<id>': 8,
+    'GET /posts/batch': 2,
+    'GET /posts/explore': 4,
+    'GET /posts/<id>/comments': 6,
+    'GET /comments/post/<id>': 2,
+    'GET /users/<id>': 8,
+    'GET /users/batch': 2,
+    'GET /users/suggestions': 2,
+    'GET /users/<id>/posts': 6,
+    'GET /users/?q=': 4,
+    'GET /follow/<id>/followers': 3,
+    'GET /follow/<id>/following': 2,
+    'GET /trending/': 3,
+    'GET /auth/me': 2,
+    'GET /notifications': 2,
+    'GET /notifications/unread-count': 4,
+    'POST /posts/<id>/like': 10,
+    'POST /posts/<id>/comments': 3,
+    'POST /comments/post/<id>': 1,
+    'PUT /comments/<id>': 0.5,
+    'DELETE /comments/<id>': 0.5,
+    'POST /posts/': 2,
+    'PUT /posts/<id>': 0.5,
+    'DELETE /posts/<id>': 0.3,
+    'POST /follow/user/<id>': 2,
+    'PUT /users/<id>': 0.5,
+    'POST /auth/login': 0.5,
+    'POST /auth/refresh': 0.5,
+    'POST /auth/logout': 0.2,
+    'POST /auth/register': 0.2,
+    'GET /system/health': 1,
+    'GET /system/db-pool': 0.1,
+    'GET /system/cache': 0.1,
+    'GET /system/like-buffer': 0.1,
+}
+
+SAMPLE_SIZE = 10000
+SEARCH_TERMS = ('user1', 'user2', 'ser3', 'er45', 'user9')
+
+_statements = threading.local()
+_registrations = itertools.count()
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def count_statements(app):
+    """Count SQL statements per thread; the test client runs requests inline"""
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        _statements.count = getattr(_statements, 'count', 0) + 1
+    
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+class Client:
+    """One simulated user issuing requests from the mix"""
+    
+    def __init__(self, app, user_id, usernames, post_ids, password, rng):
+        self.app = app
+        self.client = app.test_client()
+        self.user_id = user_id
+        self.usernames = usernames
+        self.user_ids = list(usernames)
+        self.post_ids = post_ids
+        self.password = password
+        self.rng = rng
+        self.own_posts = []
+        self.own_comments = []
+        with app.app_context():
+            self.token = create_access_token(identity=str(user_id))
+            self.refresh = create_refresh_token(identity=str(user_id))
+    
+    @property
+    def headers(self):
+        return {'Authorization': f'Bearer {self.token}'}
+    
+    def _user(self):
+        return self.rng.choice(self.user_ids)
+    
+    def _post(self):
+        # Recent posts get most of the traffic
+        index = min(int(self.rng.paretovariate(1.0)) - 1, len(self.post_ids) - 1)
+        return self.post_ids[index]
+    
+    def _fresh_headers(self):
+        with self.app.app_context():
+            return {'Authorization': f'Bearer {create_access_token(identity=str(self.user_id))}'}
+    
+    def request(self, operation):
+        """Issue one operation; returns the label it was recorded under and the response"""
+        c, h = self.client, self.headers
+        if operation == 'GET /posts/':
+            return operation, c.get('/posts/?include_total=false', headers=h)
+        if operation == 'GET /posts/<id>':
+            return operation, c.get(f'/posts/{self._post()}', headers=h)
+        if operation == 'GET /posts/explore':
+            return operation, c.get('/posts/explore', headers=h)
+        if operation == 'GET /posts/batch':
+            ids = ','.join(str(self._post()) for _ in range(20))
+            return operation, c.get(f'/posts/batch?ids={ids}', headers=h)
+        if operation == 'GET /posts/<id>/comments':
+            return operation, c.get(f'/posts/{self._post()}/comments?include_total=false', headers=h)
+        if operation == 'GET /comments/post/<id>':
+            return operation, c.get(f'/comments/post/{self._post()}?include_total=false', headers=h)
+        if operation == 'GET /users/<id>':
+            return operation, c.get(f'/users/{self._user()}', headers=h)
+        if operation == 'GET /users/batch':
+            ids = ','.join(str(self._user()) for _ in range(20))
+            return operation, c.get(f'/users/batch?ids={ids}', headers=h)
+        if operation == 'GET /users/suggestions':
+            return operation, c.get('/users/suggestions?include_total=false', headers=h)
+        if operation == 'GET /users/<id>/posts':
+            return operation, c.get(f'/users/{self._user()}/posts?include_total=false', headers=h)
+        if operation == 'GET /users/?q=':
+            return operation, c.get(f'/users/?q={self.rng.choice(SEARCH_TERMS)}', headers=h)
+        if operation == 'GET /follow/<id>/followers':
+            return operation, c.get(f'/follow/{self._user()}/followers?include_total=false', headers=h)
+        if operation == 'GET /follow/<id>/following':
+            return operation, c.get(f'/follow/{self._user()}/following?include_total=false', headers=h)
+        if operation == 'GET /trending/':
+            return operation, c.get('/trending/', headers=h)
+        if operation == 'GET /auth/me':
+            return operation, c.get('/auth/me', headers=h)
+        if operation == 'GET /notifications':
+            return operation, c.get('/notifications', headers=h)
+        if operation == 'GET /notifications/unread-count':
+            return operation, c.get('/notifications/unread-count', headers=h)
+        if operation == 'POST /posts/<id>/like':
+            return operation, c.post(f'/posts/{self._post()}/like', headers=h)
+        if operation == 'POST /posts/<id>/comments':
+            response = c.post(f'/posts/{self._post()}/comments', json={'content': 'nice one'}, headers=h)
+            self._remember(self.own_comments, response, 'comment')
+            return operation, response
+        if operation == 'POST /comments/post/<id>':
+            response = c.post(f'/comments/post/{self._post()}', json={'content': 'agreed'}, headers=h)
+            self._remember(self.own_comments, response, 'comment')
+            return operation, response
+        if operation == 'PUT /comments/<id>':
+            if not self.own_comments:
+                return self.request('POST /comments/post/<id>')
+            return operation, c.put(f'/comments/{self.rng.choice(self.own_comments)}', json={'content': 'edited'}, headers=h)
+        if operation == 'DELETE /comments/<id>':
+            if not self.own_comments:
+                return self.request('POST /comments/post/<id>')
+            return operation, c.delete(f'/comments/{self.own_comments.pop()}', headers=h)
+        if operation == 'POST /posts/':
+            response = c.post('/posts/', json={'content': f'load test #tag{self.rng.randint(0, 20)}'}, headers=h)
+            self._remember(self.own_posts, response, 'post')
+            return operation, response
+        if operation == 'PUT /posts/<id>':
+            if not self.own_posts:
+                return self.request('POST /posts/')
+            return operation, c.put(f'/posts/{self.rng.choice(self.own_posts)}', json={'content': 'edited #edit'}, headers=h)
+        if operation == 'DELETE /posts/<id>':
+            if not self.own_posts:
+                return self.request('POST /posts/')
+            return operation, c.delete(f'/posts/{self.own_posts.pop()}', headers=h)
+        if operation == 'POST /follow/user/<id>':
+            target = self._user()
+            if target == self.user_id:
+                return self.request('GET /users/<id>')
+            return operation, c.post(f'/follow/user/{target}', headers=h)
+        if operation == 'PUT /users/<id>':
+            return operation, c.put(f'/users/{self.user_id}', json={'bio': f'bio {self.rng.random()}'}, headers=h)
+        if operation == 'POST /auth/login':
+            return operation, c.post('/auth/login', json={'username': self.usernames[self._user()], 'password': self.password})
+        if operation == 'POST /auth/refresh':
+            return operation, c.post('/auth/refresh', headers={'Authorization': f'Bearer {self.refresh}'})
+        if operation == 'POST /auth/logout':
+            # Revoke a throwaway token so this client stays logged in
+            return operation, c.post('/auth/logout', headers=self._fresh_headers())
+        if operation == 'POST /auth/register':
+            name = f'load{os.getpid()}x{next(_registrations)}'
+            return operation, c.post('/auth/register', json={
+                'username': name,
+                'email': f'{name}@example.com',
+                'password': self.password
+            })
+        if operation.startswith('GET /system/'):
+            return operation, c.get(operation.split(' ', 1)[1], headers=h)
+        raise ValueError(f'Unknown operation {operation}')
+    
+    def _remember(self, ids, response, key):
+        if response.status_code == 201:
+            ids.append(response.get_json()[key]['id'])
+
+
+def seed(app, args):
+    with app.app_context():
+        db.create_all()
+        if args.no_seed:
+            return
+        preset = SCALES[args.scale]
+        counts = SyntheticGraph(
+            users=args.users or preset['users'],
+            avg_follows=preset['avg_follows'],
+            posts_per_user=preset['posts_per_user'],
+            password=args.password,
+            seed=args.seed
+        ).run()
+        print(f'seeded {sum(counts.values())} rows: ' + ', '.join(f'{table}={rows}' for table, rows in counts.items()))
+
+
+def sample_ids(app):
+    with app.app_context():
+        users = db.session.execute(
+            select(User.id, User.username).order_by(User.id).limit(SAMPLE_SIZE)
+        ).all()
+        post_ids = db.session.execute(
+            select(Post.id).order_by(Post.created_at.desc()).limit(SAMPLE_SIZE)
+        ).scalars().all()
+    if not users or not post_ids:
+        raise SystemExit('The database has no users or posts; seed it first')
+    return dict(users), post_ids
+
+
+def run(args):
+    database_url = args.database_url or f'sqlite:///{os.path.join(tempfile.mkdtemp(), "load.db")}'
+    app = create_app(args.config, {
+        'SQLALCHEMY_DATABASE_URI': database_url,
+        'LIKE_BUFFER_ENABLED': args.like_buffer,
+        # As in production, side effects wait in the outbox for a worker
+        # instead of running in the measured requests
+        'OUTBOX_DISPATCH_INLINE': False
+    })
+    seed(app, args)
+    usernames, post_ids = sample_ids(app)
+    user_ids = list(usernames)
+    count_statements(app)
+    
+    operations = list(MIX)
+    weights = [MIX[operation] for operation in operations]
+    results = {operation: {'latency': [], 'statements': [], 'errors': 0} for operation in operations}
+    lock = threading.Lock()
+    
+    def worker(index):
+        rng = random.Random(None if args.seed is None else args.seed + index)
+        client = Client(app, user_ids[index % len(user_ids)], usernames, post_ids, args.password, rng)
+        while time.perf_counter() < deadline:
+            _statements.count = 0
+            started = time.perf_counter()
+            label, response = client.request(rng.choices(operations, weights=weights)[0])
+            elapsed = time.perf_counter() - started
+            with lock:
+                result = results[label]
+                result['latency'].append(elapsed)
+                result['statements'].append(_statements.count)
+                if response.status_code >= 500:
+                    result['errors'] += 1
+    
+    deadline = time.perf_counter() + args.duration
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    return summarize(results, args.duration)
+
+
+def summarize(results, duration):
+    summary = {}
+    for operation, result in results.items():
+        latency, statements = result['latency'], result['statements']
+        if not latency:
+            continue
+        summary[operation] = {
+            'requests': len(latency),
+            'rps': round(len(latency) / duration, 2),
+            'p50_ms': round(percentile(latency, 50) * 1000, 2),
+            'p95_ms': round(percentile(latency, 95) * 1000, 2),
+            'p99_ms': round(percentile(latency, 99) * 1000, 2),
+            'sql_avg': round(sum(statements) / len(statements), 2),
+            'sql_max': max(statements),
+            'errors': result['errors']
+        }
+    
+    latency = [value for result in results.values() for value in result['latency']]
+    statements = [value for result in results.values() for value in result['statements']]
+    summary['total'] = {
+        'requests': len(latency),
+        'rps': round(len(latency) / duration, 2),
+        'p50_ms': round(percentile(latency, 50) * 1000, 2),
+        'p95_ms': round(percentile(latency, 95) * 1000, 2),
+        'p99_ms': round(percentile(latency, 99) * 1000, 2),
+        'sql_avg': round(sum(statements) / len(statements), 2) if statements else 0.0,
+        'sql_max': max(statements, default=0),
+        'errors': sum(result['errors'] for result in results.values())
+    }
+    return summary
+
+
+def report(summary):
+    print(f'{"route":<30} {"reqs":>7} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"sql/req":>8} {"sql max":>8} {"5xx":>5}')
+    for operation, row in summary.items():
+        print(f'{operation:<30} {row["requests"]:>7} {row["rps"]:>8.1f} {row["p50_ms"]:>8.1f} {row["p95_ms"]:>8.1f} '
+              f'{row["p99_ms"]:>8.1f} {row["sql_avg"]:>8.2f} {row["sql_max"]:>8} {row["errors"]:>5}')
+
+
+def regressions(summary, baseline, max_regression):
+    """Routes whose p95 latency or SQL statements per request grew too much"""
+    failures = []
+    for operation, row in summary.items():
+        before = baseline.get(operation)
+        if not before:
+            continue
+        for metric in ('p95_ms', 'sql_avg'):
+            if before[metric] and row[metric] > before[metric] * (1 + max_regression):
+                failures.append(f'{operation}: {metric} {before[metric]} -> {row[metric]}')
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--config', default='testing', help='Configuration name passed to create_app.')
+    parser.add_argument('--database-url', default=None, help='Run against this database instead of a temporary SQLite file.')
+    parser.add_argument('--no-seed', action='store_true', help='Use the data already in --database-url.')
+    parser.add_argument('--scale', choices=list(SCALES), default='small')
+    parser.add_argument('--users', type=int, default=None, help='Override the number of seeded users.')
+    parser.add_argument('--password', default=DEFAULT_PASSWORD, help='Password of the seeded accounts.')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--like-buffer', action='store_true', help='Coalesce like count writes as in production.')
+    parser.add_argument('--output', default=None, help='Write the summary to this JSON file.')
+    parser.add_argument('--baseline', default=None, help='Compare against a summary written by --output.')
+    parser.add_argument('--max-regression', type=float, default=0.2)
+    args = parser.parse_args()
+    
+    summary = run(args)
+    report(summary)
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2, sort_keys=True)
+    
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures = regressions(summary, json.load(f), args.max_regression)
+        for failure in failures:
+            print(f'REGRESSION {failure}')
+        if failures:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
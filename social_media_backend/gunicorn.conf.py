@@ -0,0 +1,27 @@
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+
+# Each worker process holds its own connection pool of up to
+# DB_POOL_SIZE + DB_MAX_OVERFLOW connections, so size these together with
+# the database's max_connections. Threads share their worker's pool.
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_class = 'gthread'
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then to bound memory growth
+max_requests = 5000
+max_requests_jitter = 500
+
+
+def post_fork(server, worker):
+    # Connections opened in the master must not be shared with forked workers
+    from app.extensions import db
+    app = worker.app.wsgi()
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
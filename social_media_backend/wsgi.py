@@ -0,0 +1,6 @@
+
+from app import create_app
+import os
+
+# Entry point for WSGI servers, e.g. `gunicorn -c gunicorn.conf.py wsgi:app`
+app = create_app(os.environ.get('FLASK_CONFIG', 'production'))